@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        # Registra los receptores que invalidan la caché de contenido
+        from . import signals  # noqa: F401
+        # Registra los manejadores de la cola de trabajos que no importan las señales
+        from . import grades  # noqa: F401
@@ -0,0 +1,117 @@
+"""
+Vistas async de las lecturas más frecuentes, para el servidor ASGI (SERVER_MODE = 'asgi', ver
+gunicorn.conf.py). Se montan en lugar de las rutas GET equivalentes de views.py cuando
+ASYNC_READ_VIEWS está activo:
+  - api/courses/                      (CourseView.list)
+  - api/class-contents/?class_id=     (ClassContentModelViewSet.list)
+  - api/classes/<class_id>/bundle/    (ClassBundleView)
+
+El ETag (aqueryset_validators) y la caché de contenido (acached_payload) se resuelven sin bloquear
+el bucle de eventos, así que un acierto de caché o un 304 no ocupan ningún hilo. Solo la
+serialización de un fallo de caché se ejecuta en el hilo de la petición con sync_to_async, con los
+mismos métodos que las vistas DRF: el cuerpo y la entrada de caché son los mismos en ambos modos.
+Los demás métodos de esas rutas (POST, HEAD, ...) se delegan en la vista DRF.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .bundles import build_class_bundle
+from .conditional import aconditional_response
+from .content_cache import CLASS_SCOPE, CATALOG_SCOPE, acached_payload
+from .models import ClassModel
+from .views import ClassBundleView, ClassContentModelViewSet, CourseView
+
+course_list_fallback = CourseView.as_view({'get': 'list', 'post': 'create'})
+class_content_list_fallback = ClassContentModelViewSet.as_view({'get': 'list', 'post': 'create'})
+class_bundle_fallback = ClassBundleView.as_view()
+
+
+def json_response(data, http_status=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=http_status, content_type='application/json')
+
+
+def viewset_for(viewset_class, request, action='list'):
+    """Instancia del viewset DRF preparada para `request`, para reutilizar sus métodos de listado"""
+    view = viewset_class(action=action, action_map={'get': action}, args=(), kwargs={}, format_kwarg=None, headers={})
+    view.request = view.initialize_request(request)
+    return view
+
+
+@csrf_exempt
+async def course_list(request):
+    if request.method != 'GET':
+        return await sync_to_async(course_list_fallback)(request)
+
+    try:
+        view = viewset_for(CourseView, request)
+
+        async def build():
+            return json_response(await acached_payload(request, CATALOG_SCOPE, None, sync_to_async(view.build_list)))
+
+        return await aconditional_response(request, view.get_queryset(), build)
+
+    except DRFValidationError as e:
+        # Mismo cuerpo que el manejador de excepciones de DRF en CourseView.list
+        return json_response(e.detail, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+async def class_content_list(request):
+    if request.method != 'GET':
+        return await sync_to_async(class_content_list_fallback)(request)
+
+    try:
+        view = viewset_for(ClassContentModelViewSet, request)
+        class_id = request.GET.get('class_id')
+
+        async def build():
+            build_body = sync_to_async(view.build_list_body)
+            if class_id is not None and class_id.isdigit():
+                return json_response(await acached_payload(request, CLASS_SCOPE, int(class_id), build_body))
+            return json_response(await build_body())
+
+        return await aconditional_response(request, view.get_queryset(), build)
+
+    except DRFValidationError as e:
+        return json_response({
+            'status': 'error',
+            'message': 'Error en los parámetros de la lista',
+            'campos_con_error': e.detail,
+            'tipo_error': 'validación'
+        }, status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return json_response({
+            'status': 'error',
+            'message': 'Error al obtener la lista de contenidos',
+            'detalle_error': str(e),
+        }, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+async def class_bundle(request, class_id):
+    if request.method != 'GET':
+        return await sync_to_async(class_bundle_fallback)(request, class_id=class_id)
+
+    try:
+        data = await acached_payload(request, CLASS_SCOPE, class_id, sync_to_async(
+            lambda: build_class_bundle(class_id, context={'request': request})
+        ))
+        return json_response({
+            'status': 'success',
+            'data': data
+        })
+    except ClassModel.DoesNotExist:
+        return json_response({
+            'status': 'error',
+            'message': 'Clase no encontrada',
+        }, status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return json_response({
+            'status': 'error',
+            'message': 'Error al obtener la clase completa',
+            'detalle_error': str(e),
+        }, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,217 @@
+"""
+Benchmark de los endpoints de dashboard/urls.py con el cliente de pruebas de Django.
+
+Por cada endpoint se mide la latencia (percentiles sobre N peticiones), el número de consultas SQL
+y el pico de memoria de una petición. Cada endpoint se mide en frío (caché de contenido vacía antes
+de cada petición) y en caliente. El resultado es un dict serializable a JSON; compare_results
+marca las regresiones frente a una ejecución anterior.
+"""
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .content_cache import get_cache
+from .models import ClassContentModel, LayoutModel, MultimediaBlockVideoModel
+
+# (nombre de la URL, kwargs -> clave del fixture, query string). Solo métodos GET.
+ENDPOINTS = [
+    ('courses-list', {}, ''),
+    ('courses-detail', {'pk': 'course_id'}, ''),
+    ('course_list', {}, ''),
+    ('classes-list', {}, ''),
+    ('classes-list', {}, '?course_id={course_id}'),
+    ('classes-list', {}, '?course_id={course_id}&page_size=20'),
+    ('classes-detail', {'pk': 'class_id'}, ''),
+    ('course-classes-list', {'course_id': 'course_id'}, ''),
+    ('class_detail', {'course_id': 'course_id', 'class_id': 'class_id'}, ''),
+    ('class-tasks', {'class_id': 'class_id'}, ''),
+    ('class-bundle', {'class_id': 'class_id'}, ''),
+    ('course-export', {'course_id': 'course_id'}, ''),
+    ('course-export', {'course_id': 'course_id'}, '?export_format=zip'),
+    ('class-contents-list', {}, '?class_id={class_id}'),
+    ('class-contents-list', {}, '?class_id={class_id}&page_size=20'),
+    ('class-contents-list', {}, '?class_id={class_id}&fields=id,content_type,tittle,order'),
+    ('class-contents-detail', {'pk': 'content_id'}, ''),
+    ('layoutmodel-list', {}, ''),
+    ('layoutmodel-detail', {'pk': 'layout_id'}, ''),
+    ('task-layout-detail', {'layout_id': 'layout_id'}, ''),
+    ('multiplechoicemodel-list', {}, ''),
+    ('trueorfalsemodel-list', {}, ''),
+    ('orderingtaskmodel-list', {}, ''),
+    ('categoriestaskmodel-list', {}, ''),
+    ('fillinthegapstaskmodel-list', {}, ''),
+    ('multimediablockvideos-list', {}, ''),
+    ('multimediablockvideos-list', {}, '?page_size=20'),
+    ('multimediablockvideos-detail', {'pk': 'video_id'}, ''),
+]
+
+PERCENTILES = (50, 90, 95, 99)
+MODES = ('cold', 'warm')
+
+
+def fixture_ids(course):
+    """Ids de ejemplo dentro del curso para rellenar las URLs"""
+    class_instance = course.classes.order_by('id').first()
+    return {
+        'course_id': course.id,
+        'class_id': class_instance.id,
+        'content_id': ClassContentModel.objects.filter(class_id=class_instance).order_by('order', 'id').values_list('id', flat=True).first(),
+        'layout_id': LayoutModel.objects.filter(class_model=class_instance).values_list('id', flat=True).first(),
+        'video_id': MultimediaBlockVideoModel.objects.filter(class_model=class_instance).values_list('id', flat=True).first(),
+    }
+
+
+def endpoint_urls(ids, only=None):
+    """Devuelve [(nombre, url)] para los endpoints; `only` filtra por nombre de URL"""
+    urls = []
+    for url_name, kwargs, query in ENDPOINTS:
+        if only and url_name not in only:
+            continue
+        path = reverse(url_name, kwargs={key: ids[value] for key, value in kwargs.items()})
+        query = query.format(**ids)
+        urls.append((f'{url_name}{query}', f'{path}{query}'))
+    return urls
+
+
+def percentile(sorted_values, value):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-value * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def _consume(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, url, iterations=20, warmup=2, cold=False):
+    """Mide un endpoint. En frío se vacía la caché de contenido antes de cada petición (fuera del tiempo)."""
+    cache = get_cache()
+    for _ in range(warmup):
+        _consume(client.get(url))
+
+    latencies = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        response = client.get(url)
+        size = _consume(response)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    # Consultas y memoria en una petición aparte: tracemalloc distorsiona la latencia
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            _consume(response)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'bytes': size,
+        'queries': len(queries.captured_queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'latency_ms': {
+            'min': round(latencies[0], 3),
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'max': round(latencies[-1], 3),
+            **{f'p{value}': round(percentile(latencies, value), 3) for value in PERCENTILES},
+        },
+    }
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Base de datos de prueba temporal con el motor y las opciones de la configurada (SQLite o
+    PostgreSQL). En SQLite va a un archivo en lugar de a memoria para que WAL, mmap y busy_timeout
+    se apliquen como en producción y otros procesos puedan abrirla.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings.get('NAME')
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(tmp, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield connection.settings_dict
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(course, iterations=20, warmup=2, only=None, sizes=None):
+    """Mide todos los endpoints sobre `course` y devuelve el resultado serializable a JSON"""
+    client = Client(raise_request_exception=False)
+    results = []
+    for name, url in endpoint_urls(fixture_ids(course), only=only):
+        for mode in MODES:
+            result = measure(client, url, iterations=iterations, warmup=warmup, cold=(mode == 'cold'))
+            results.append({'name': name, 'url': url, 'mode': mode, **result})
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'warmup': warmup,
+            'sizes': sizes or {},
+        },
+        'endpoints': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Compara dos ejecuciones y devuelve las regresiones: p95 más de `threshold` (proporción) por
+    encima de la base, más consultas SQL o un código de estado distinto.
+    """
+    previous = {(item['name'], item['mode']): item for item in baseline.get('endpoints', [])}
+    regressions = []
+    for item in current.get('endpoints', []):
+        base = previous.get((item['name'], item['mode']))
+        if base is None:
+            continue
+        reasons = []
+        if item['status'] != base['status']:
+            reasons.append(f"estado {base['status']} -> {item['status']}")
+        if item['queries'] > base['queries']:
+            reasons.append(f"consultas {base['queries']} -> {item['queries']}")
+        base_p95, p95 = base['latency_ms']['p95'], item['latency_ms']['p95']
+        if base_p95 and p95 > base_p95 * (1 + threshold):
+            reasons.append(f'p95 {base_p95:.2f} ms -> {p95:.2f} ms')
+        if reasons:
+            regressions.append({'name': item['name'], 'mode': item['mode'], 'reasons': reasons})
+    return regressions
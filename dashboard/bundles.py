@@ -0,0 +1,81 @@
+from django.db.models import Prefetch
+
+from .models import (
+    ClassModel, LayoutModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel,
+    CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel,
+    MediaModel, ClassContentModel,
+)
+from .serializers import (
+    ClassModelSerializer, LayoutModelSerializer, MultipleChoiceModelSerializer,
+    TrueOrFalseModelSerializer, OrderingTaskModelSerializer, CategoriesTaskModelSerializer,
+    FillInTheGapsTaskModelSerializer, VideoLayoutModelSerializer, TextBlockLayoutModelSerializer,
+    MediaModelSerializer, ClassContentModelSerializer,
+)
+
+# Tareas de la clase: (clave en la respuesta, modelo, serializer, tiene media M2M)
+TASK_SOURCES = [
+    ('multiple_choice_tasks', MultipleChoiceModel, MultipleChoiceModelSerializer, False),
+    ('true_or_false_tasks', TrueOrFalseModel, TrueOrFalseModelSerializer, True),
+    ('ordering_tasks', OrderingTaskModel, OrderingTaskModelSerializer, True),
+    ('categories_tasks', CategoriesTaskModel, CategoriesTaskModelSerializer, True),
+    ('fill_in_the_gaps_tasks', FillInTheGapsTaskModel, FillInTheGapsTaskModelSerializer, True),
+]
+
+# Número máximo de consultas SQL para cargar una clase completa, sin importar su tamaño:
+# clase + layouts + 5 tipos de tarea + 4 prefetch de media + videos + textos + contenidos
+MAX_BUNDLE_QUERIES = 14
+
+
+def load_class_bundle(class_id):
+    """
+    Carga una clase con todos sus layouts, tareas, bloques y media en un número fijo de consultas.
+    Lanza ClassModel.DoesNotExist si la clase no existe.
+    """
+    class_instance = ClassModel.objects.get(id=class_id)
+
+    bundle = {
+        'class': class_instance,
+        'layouts': list(LayoutModel.objects.filter(class_model=class_instance).order_by('id')),
+    }
+
+    media_by_id = {}
+    for key, model, _serializer, has_media in TASK_SOURCES:
+        queryset = model.objects.filter(class_model=class_instance).order_by('order', 'id')
+        if has_media:
+            queryset = queryset.prefetch_related(
+                Prefetch('media', queryset=MediaModel.objects.order_by('id'))
+            )
+        tasks = list(queryset)
+        if has_media:
+            # El prefetch ya trajo la media; se deduplica por id sin nuevas consultas
+            for task in tasks:
+                for media in task.media.all():
+                    media_by_id.setdefault(media.id, media)
+        bundle[key] = tasks
+
+    bundle['video_layouts'] = list(VideoLayoutModel.objects.filter(class_model=class_instance).order_by('id'))
+    bundle['text_blocks_layouts'] = list(TextBlockLayoutModel.objects.filter(lesson=class_instance).order_by('id'))
+    bundle['contents'] = list(ClassContentModel.objects.filter(class_id=class_instance).order_by('order', 'id'))
+    bundle['media'] = [media_by_id[media_id] for media_id in sorted(media_by_id)]
+    return bundle
+
+
+def serialize_class_bundle(bundle, context=None):
+    """Serializa el resultado de load_class_bundle sin lanzar consultas adicionales"""
+    context = context or {}
+    data = {
+        'class': ClassModelSerializer(bundle['class'], context=context).data,
+        'layouts': LayoutModelSerializer(bundle['layouts'], many=True, context=context).data,
+    }
+    for key, _model, serializer_class, _has_media in TASK_SOURCES:
+        data[key] = serializer_class(bundle[key], many=True, context=context).data
+    data['video_layouts'] = VideoLayoutModelSerializer(bundle['video_layouts'], many=True, context=context).data
+    data['text_blocks_layouts'] = TextBlockLayoutModelSerializer(bundle['text_blocks_layouts'], many=True, context=context).data
+    data['contents'] = ClassContentModelSerializer(bundle['contents'], many=True, context=context).data
+    data['media'] = MediaModelSerializer(bundle['media'], many=True, context=context).data
+    return data
+
+
+def build_class_bundle(class_id, context=None):
+    """Atajo: carga y serializa la clase completa"""
+    return serialize_class_bundle(load_class_bundle(class_id), context=context)
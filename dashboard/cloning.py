@@ -0,0 +1,160 @@
+"""
+Duplicado completo de un curso o de una clase.
+
+Todo se copia en una transacción con un bulk_create por modelo: el curso, sus clases, los hijos de
+cada clase (CLASS_CHILD_MODELS: layouts, tareas, bloques y contenidos) y la media de las tareas. Las
+FK se reasignan a las filas nuevas y los enlaces M2M `media` se copian apuntando a las copias de
+MediaModel (una por media original, aunque la compartan varias tareas). El número de consultas
+depende de la cantidad de modelos, no del tamaño del curso.
+
+Los archivos no se copian: las filas nuevas apuntan a los mismos blobs (storage.py) y se suma una
+referencia por cada fila nueva que los usa, así borrar el original no deja al duplicado sin media.
+"""
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+
+from .models import ClassModel, ClassContentModel, CourseModel, MediaModel
+from .outline import schedule_refresh
+from .search import SEARCH_SOURCES, index_objects
+from .signals import CLASS_CHILD_MODELS, invalidate_class, invalidate_course
+from .storage import multimedia_paths
+
+BATCH_SIZE = 500
+COPY_SUFFIX = ' (copia)'
+
+
+def _copy_fields(model):
+    """attname de los campos que se copian: todos los concretos menos la clave primaria"""
+    return [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+
+
+def _file_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+def _copy_name(name, max_length):
+    return (name[:max_length - len(COPY_SUFFIX)] + COPY_SUFFIX) if name else name
+
+
+class Cloner:
+    """Copia filas reasignando sus FK y cuenta los archivos que las copias comparten"""
+
+    def __init__(self):
+        self.files = Counter()
+        self.counts = Counter()
+        # La misma media enlazada desde tareas de distintos tipos se copia una sola vez
+        self.media_map = {}
+
+    def copy_rows(self, model, queryset, overrides):
+        """
+        Copia las filas de `queryset`; `overrides(row)` devuelve los campos a cambiar (las FK). Devuelve
+        {pk original: pk nuevo}.
+        """
+        fields = _copy_fields(model)
+        file_fields = _file_fields(model)
+        mapping = {}
+        batch, sources = [], []
+        for row in queryset.order_by('pk').values('pk', *fields).iterator(chunk_size=BATCH_SIZE):
+            source_pk = row.pop('pk')
+            row.update(overrides(row))
+            for name in file_fields:
+                if row[name]:
+                    self.files[row[name]] += 1
+            if model is ClassContentModel:
+                self.files.update(multimedia_paths(row['multimedia']))
+            batch.append(model(**row))
+            sources.append(source_pk)
+            if len(batch) == BATCH_SIZE:
+                self._flush(model, batch, sources, mapping)
+                batch, sources = [], []
+        if batch:
+            self._flush(model, batch, sources, mapping)
+        return mapping
+
+    def _flush(self, model, batch, sources, mapping):
+        created = model.objects.bulk_create(batch)
+        mapping.update(zip(sources, (item.pk for item in created)))
+        self.counts[model._meta.model_name] += len(created)
+
+    def copy_classes(self, queryset, overrides):
+        """Copia las clases de `queryset` con todo su contenido. Devuelve {id original: id nuevo}."""
+        class_map = self.copy_rows(ClassModel, queryset, overrides)
+        for model, attname in CLASS_CHILD_MODELS.items():
+            child_map = self.copy_rows(
+                model, model.objects.filter(**{f'{attname}__in': list(class_map)}),
+                lambda row, attname=attname: {attname: class_map[row[attname]]},
+            )
+            if hasattr(model, 'media'):
+                self.copy_media_links(model, child_map, {f'{model.media.field.m2m_field_name()}__{attname}__in': list(class_map)})
+        return class_map
+
+    def copy_media_links(self, model, task_map, source_filter):
+        """Copia la media de las tareas y sus enlaces M2M (los de `source_filter`) hacia las tareas nuevas"""
+        through = model.media.through
+        task_column = model.media.field.m2m_field_name() + '_id'
+        media_column = model.media.field.m2m_reverse_field_name() + '_id'
+        links = list(through.objects.filter(**source_filter).values_list(task_column, media_column))
+        if not links:
+            return
+        missing = {media_id for _task_id, media_id in links} - set(self.media_map)
+        if missing:
+            self.media_map.update(self.copy_rows(MediaModel, MediaModel.objects.filter(pk__in=missing), lambda row: {}))
+        through.objects.bulk_create([
+            through(**{task_column: task_map[task_id], media_column: self.media_map[media_id]})
+            for task_id, media_id in links
+        ], batch_size=BATCH_SIZE)
+        self.counts[through._meta.model_name] += len(links)
+
+    def add_file_references(self):
+        """Una referencia más en cada blob por cada fila nueva que lo usa (una consulta por blob)"""
+        if not hasattr(default_storage, 'add_reference'):
+            return
+        for name, count in self.files.items():
+            default_storage.add_reference(name, count=count)
+
+
+def _finish(cloner, class_map, course_ids):
+    cloner.add_file_references()
+    new_ids = list(class_map.values())
+    for kind, (model, fk, _fields) in SEARCH_SOURCES.items():
+        index_objects(kind, model.objects.filter(**{f'{fk}__in': new_ids}))
+    # bulk_create no dispara señales
+    for class_id in new_ids:
+        invalidate_class(class_id)
+    for course_id in course_ids:
+        invalidate_course(course_id)
+    schedule_refresh(class_ids=new_ids)
+
+
+def clone_course(course, course_name=None):
+    """Duplica el curso con todas sus clases. Devuelve (curso nuevo, filas copiadas por modelo)."""
+    cloner = Cloner()
+    name_length = CourseModel._meta.get_field('course_name').max_length
+    with transaction.atomic():
+        course_map = cloner.copy_rows(
+            CourseModel, CourseModel.objects.filter(pk=course.pk),
+            lambda row: {'course_name': course_name or _copy_name(row['course_name'], name_length)},
+        )
+        new_course_id = course_map[course.pk]
+        class_map = cloner.copy_classes(ClassModel.objects.filter(course=course), lambda row: {'course_id': new_course_id})
+        _finish(cloner, class_map, [new_course_id])
+    return CourseModel.objects.get(pk=new_course_id), dict(cloner.counts)
+
+
+def clone_class(class_instance, course=None, class_name=None):
+    """
+    Duplica una clase con todo su contenido, en `course` o en su mismo curso. Devuelve (clase nueva,
+    filas copiadas por modelo).
+    """
+    cloner = Cloner()
+    course_id = course.pk if course is not None else class_instance.course_id
+    name_length = ClassModel._meta.get_field('class_name').max_length
+    with transaction.atomic():
+        class_map = cloner.copy_classes(ClassModel.objects.filter(pk=class_instance.pk), lambda row: {
+            'course_id': course_id,
+            'class_name': class_name or _copy_name(row['class_name'], name_length),
+        })
+        _finish(cloner, class_map, [course_id])
+    return ClassModel.objects.get(pk=class_map[class_instance.pk]), dict(cloner.counts)
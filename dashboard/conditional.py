@@ -0,0 +1,95 @@
+"""
+Soporte de GET condicional (ETag / Last-Modified) calculado a partir de updated_at.
+
+Los validadores se obtienen con una sola consulta agregada (COUNT, MAX(updated_at), MAX(id)) sobre el
+queryset que alimenta la respuesta, sin serializar nada. Si el cliente ya tiene esa versión se
+responde 304 sin cuerpo. aqueryset_validators / aconditional_response son las variantes para las
+vistas async (ver async_views.py).
+
+Last-Modified solo se envía para una fila concreta (detalle). En un listado MAX(updated_at) no cambia
+cuando se borra una fila, así que un cliente que revalidara solo con If-Modified-Since recibiría un
+304 con la lista antigua; los listados se revalidan solo con el ETag, que incluye COUNT y MAX(id).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _aggregate(queryset):
+    return queryset.order_by(), dict(total=Count('id'), last_updated=Max('updated_at'), last_id=Max('id'))
+
+
+def _validators(request, stats):
+    last_updated = stats['last_updated']
+    # La ruta completa entra en el hash porque el cuerpo depende de los query params y del host
+    raw = '|'.join([
+        request.get_host(),
+        request.get_full_path(),
+        str(stats['total']),
+        last_updated.isoformat() if last_updated else '',
+        str(stats['last_id'] or 0),
+    ])
+    etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    last_modified = int(last_updated.timestamp()) if last_updated else None
+    return etag, last_modified
+
+
+def queryset_validators(request, queryset):
+    """Devuelve (etag, last_modified) para el queryset; last_modified es un timestamp o None"""
+    queryset, aggregates = _aggregate(queryset)
+    return _validators(request, queryset.aggregate(**aggregates))
+
+
+async def aqueryset_validators(request, queryset):
+    queryset, aggregates = _aggregate(queryset)
+    return _validators(request, await queryset.aaggregate(**aggregates))
+
+
+def _not_modified(request, etag, last_modified):
+    not_modified = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+    if not_modified is not None and not_modified.status_code == 304:
+        not_modified['ETag'] = quote_etag(etag)
+    return not_modified
+
+
+def _add_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_response(request, queryset, build, with_last_modified=False):
+    """
+    Responde 304 si el cliente ya tiene la versión actual del queryset; si no, devuelve `build()`
+    con la cabecera ETag añadida, y Last-Modified si `with_last_modified` (queryset de una sola fila).
+    """
+    etag, last_modified = queryset_validators(request, queryset)
+    if not with_last_modified:
+        last_modified = None
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    return _add_validators(build(), etag, last_modified)
+
+
+async def aconditional_response(request, queryset, build, with_last_modified=False):
+    """Igual que conditional_response, con `build` una corrutina"""
+    etag, last_modified = await aqueryset_validators(request, queryset)
+    if not with_last_modified:
+        last_modified = None
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    return _add_validators(await build(), etag, last_modified)
+
+
+def versioned_response(request, etag, build):
+    """Igual que conditional_response, con un ETag ya conocido (p. ej. el número de versión de una fila)"""
+    not_modified = _not_modified(request, etag, None)
+    if not_modified is not None:
+        return not_modified
+    return _add_validators(build(), etag, None)
@@ -0,0 +1,103 @@
+"""
+Caché de respuestas de lectura versionada por clase / curso.
+
+Cada clase y cada curso tienen un número de versión guardado en la caché. Las respuestas se guardan
+con la versión en la clave, de modo que al cambiar el contenido basta con incrementar la versión
+(ver dashboard/signals.py) y las entradas viejas simplemente dejan de consultarse y expiran solas.
+La caché (CONTENT_CACHE_BACKEND, por defecto en disco) la comparten todos los procesos: una
+escritura atendida por un worker de gunicorn, o un trabajo de run_jobs, invalida la versión que
+leen los demás. Con 'locmem' cada proceso tendría sus propias versiones.
+Las funciones con prefijo `a` son las variantes para las vistas async (ver async_views.py).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Alcances de versión
+CLASS_SCOPE = 'class'
+COURSE_SCOPE = 'course'
+CATALOG_SCOPE = 'catalog'  # Lista global de cursos
+GRADES_SCOPE = 'grades'  # Informe de calificaciones de Moodle por curso (ver grades.py)
+
+
+def get_cache():
+    return caches[getattr(settings, 'CONTENT_CACHE_ALIAS', 'content')]
+
+
+def _version_key(scope, pk):
+    return f'version:{scope}:{pk}'
+
+
+def _initial_version():
+    # Si la clave de versión se pierde (desalojo, reinicio) nunca se reutiliza una versión anterior
+    return time.time_ns()
+
+
+def get_version(scope, pk=None):
+    cache = get_cache()
+    key = _version_key(scope, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(scope, pk=None):
+    cache = get_cache()
+    key = _version_key(scope, pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(scope, pk=None):
+    """Invalida todas las respuestas cacheadas del alcance indicado"""
+    cache = get_cache()
+    key = _version_key(scope, pk)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def _response_key(request, scope, pk, version):
+    raw = f'{request.get_host()}{request.get_full_path()}'
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'response:{scope}:{pk}:{version}:{digest}'
+
+
+def response_key(request, scope, pk=None):
+    """Clave de la respuesta: alcance + versión + ruta completa (incluye query params y host)"""
+    return _response_key(request, scope, pk, get_version(scope, pk))
+
+
+def cached_payload(request, scope, pk, build):
+    """
+    Devuelve el payload cacheado para la petición o lo construye con `build()` y lo guarda.
+    `build` debe devolver datos serializables (dict / list).
+    """
+    cache = get_cache()
+    key = response_key(request, scope, pk)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, timeout=getattr(settings, 'CONTENT_CACHE_TIMEOUT', 60 * 60 * 24))
+    return payload
+
+
+async def acached_payload(request, scope, pk, build):
+    """Igual que cached_payload, con `build` una corrutina (la misma entrada sirve a ambas)"""
+    cache = get_cache()
+    key = _response_key(request, scope, pk, await aget_version(scope, pk))
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await build()
+        await cache.aset(key, payload, timeout=getattr(settings, 'CONTENT_CACHE_TIMEOUT', 60 * 60 * 24))
+    return payload
@@ -0,0 +1,229 @@
+"""
+Ejemplos válidos de content_details por tipo de contenido, con la forma de dashboard/json_example/.
+Se usan en pruebas, benchmarks y para generar cursos sintéticos.
+"""
+
+SAMPLE_CONTENT_DETAILS = {
+    # Overlay Tasks
+    'multiple_choice': {
+        'questions': [
+            {'question': '¿Cuál es la capital de Francia?', 'answers': [
+                {'text': 'París', 'is_correct': True},
+                {'text': 'Londres', 'is_correct': False},
+            ]},
+            {'question': '¿Cuál es el océano más grande?', 'answers': [
+                {'text': 'Océano Pacífico', 'is_correct': True},
+                {'text': 'Océano Índico', 'is_correct': False},
+            ]},
+        ]
+    },
+    'true_false': {
+        'questions': [
+            {'statement': 'La Tierra es plana.', 'state': 2},
+            {'statement': 'El agua hierve a 100 grados Celsius.', 'state': 1},
+            {'statement': 'Los gatos pueden volar.', 'state': 3},
+        ]
+    },
+    'fill_gaps': {
+        'passages': [
+            {'text': 'El __1__ es un elemento químico.', 'keywords': ['hidrogeno', 'helio', 'litio'], 'help_text': True},
+        ]
+    },
+    'word_bank': {
+        'word_bank': [
+            {'text': '__Texto__ con __palabras__ clave', 'keywords': [
+                {'word': 'palabra1', 'position': 1},
+                {'word': 'palabra2', 'position': 2},
+            ]},
+        ]
+    },
+    'drop_down_text': {
+        'drop_down_text': [
+            {'text': 'Texto 1 con __palabras__ clave', 'options': [
+                {'word': 'palabra1', 'correct': True},
+                {'word': 'palabra2', 'correct': False},
+            ]},
+        ]
+    },
+    'ordering': {
+        'ordering': [
+            {'text': 'Primero hierve el agua', 'indice': 1},
+            {'text': 'Agrega el té', 'indice': 2},
+        ]
+    },
+    'sorting': {
+        'sorting': [
+            {'categoria': 'Categoría 1', 'imagenes': ['ruta/a/la/imagen1.jpg', 'ruta/a/la/imagen2.jpg']},
+            {'categoria': 'Categoría 2', 'imagenes': ['ruta/a/la/imagen3.jpg']},
+        ]
+    },
+    'category': {
+        'categories': [
+            {'categoria': 'Categoría 1', 'text_items': ['Texto 1', 'Texto 2']},
+            {'categoria': 'Categoría 2', 'text_items': ['Texto 3', 'Texto 4']},
+        ]
+    },
+    'matching': {
+        'pairs': [
+            {'left': 'Texto 1', 'right': 'Texto 2'},
+            {'left': 'Texto 3', 'right': 'Texto 4'},
+        ]
+    },
+    # Interactive activities
+    'flashcards': {
+        'flashcards': [
+            {'front': 'Pregunta 1', 'img': 'ruta/a/la/imagen.jpg'},
+            {'front': 'Pregunta 2', 'img': 'ruta/a/la/imagen.jpg'},
+        ]
+    },
+    'table': {
+        'table': [
+            {'column': ['column1'], 'cell': ['cell1', 'cell2', 'cell3']},
+            {'column': ['column2'], 'cell': ['cell4', 'cell5', 'cell6']},
+        ]
+    },
+    'accordion': {
+        'accordion': [
+            {'title': 'Sección 1', 'content': 'Contenido de la sección 1', 'img': 'ruta/a/la/imagen.jpg'},
+            {'title': 'Sección 2', 'content': 'Contenido de la sección 2'},
+        ]
+    },
+    'tabs': {
+        'tabs': [
+            {'tab_title': 'Evento 1', 'content': 'Evento 1', 'img': 'ruta/a/la/imagen.jpg'},
+            {'tab_title': 'Evento 2', 'content': 'Evento 2'},
+        ]
+    },
+    'button_stack': {
+        'buttons': [
+            {'label': 'Botón 1', 'url': 'https://www.example.com', 'tittle': 'Título del botón 1', 'text': 'Texto 1'},
+        ]
+    },
+    'process': {
+        'steps': [
+            {'titulo': 'Proceso de Información', 'description': 'Descripción del proceso', 'steps': [
+                {'step_title': 'Paso 1', 'description': 'Descripción del paso 1'},
+                {'step_title': 'Paso 2', 'description': 'Descripción del paso 2'},
+            ]},
+        ]
+    },
+    'timeline': {
+        'tabs': [
+            {'point': 'punto 1', 'point_title': 'punto titulo 1', 'point_text': 'punto texto 1'},
+            {'point': 'punto 2', 'point_title': 'punto titulo 2', 'point_text': 'punto texto 2'},
+        ]
+    },
+    # Knowledge Check
+    'multiple_choice_knowledge_check': {
+        'questions': [
+            {'question': '¿Cuál es la capital de España?', 'answers': [
+                {'text': 'Madrid', 'is_correct': True},
+                {'text': 'París', 'is_correct': False},
+            ]},
+        ]
+    },
+    'true_false_knowledge_check': {
+        'questions': [
+            {'statement': 'La Tierra es plana.', 'stated': 'false'},
+            {'statement': 'El agua moja.', 'stated': 'true'},
+            {'statement': 'El texto no lo dice.', 'stated': 'not_stated'},
+        ]
+    },
+    'fill_gaps_knowledge_check': {
+        'passages': [
+            {'text': 'El __1__ es un elemento químico.', 'keywords': ['hidrogeno'], 'help_text': False},
+        ]
+    },
+    'word_bank_knowledge_check': {
+        'word_bank': [
+            {'text': '__Texto__ con __palabras__ clave', 'keywords': [
+                {'word': 'Texto', 'position': 1},
+                {'word': 'palabras', 'position': 2},
+            ]},
+        ]
+    },
+    'drop_down_text_knowledge_check': {
+        'drop_down_text': [
+            {'text': 'El __gato__ duerme', 'options': [
+                {'word': 'gato', 'correct': True},
+                {'word': 'mesa', 'correct': False},
+            ]},
+        ]
+    },
+    'ordering_knowledge_check': {
+        'ordering': [
+            {'text': 'Primero hierve el agua', 'indice': 1},
+            {'text': 'Agrega el té', 'indice': 2},
+            {'text': 'Sirve', 'indice': 3},
+        ]
+    },
+    'sorting_knowledge_check': {
+        'sorting': [
+            {'categoria': 'Frutas', 'imagenes': ['ruta/manzana.jpg', 'ruta/pera.jpg']},
+            {'categoria': 'Verduras', 'imagenes': ['ruta/zanahoria.jpg']},
+        ]
+    },
+    'categories_knowledge_check': {
+        'categories': [
+            {'categoria': 'Animales', 'text_items': ['perro', 'gato']},
+            {'categoria': 'Colores', 'text_items': ['rojo', 'azul']},
+        ]
+    },
+    'matching_knowledge_check': {
+        'pairs': [
+            {'left': 'dog', 'right': 'perro'},
+            {'left': 'cat', 'right': 'gato'},
+        ]
+    },
+    'word_order_knowledge_check': {
+        'sentences': [
+            {'text': 'El gato duerme', 'words': [
+                {'word': 'gato', 'position': 2},
+                {'word': 'El', 'position': 1},
+                {'word': 'duerme', 'position': 3},
+            ]},
+        ]
+    },
+    'picture_matching_knowledge_check': {
+        'pairs': [
+            {'image': 'ruta/imagen1.jpg', 'description': 'Un gato dormido'},
+            {'image': 'ruta/imagen2.jpg', 'description': 'Un perro corriendo'},
+        ]
+    },
+    'picture_labeling_knowledge_check': {
+        'pairs': [
+            {'image': 'ruta/imagen_principal.jpg', 'labels': ['cerebro', 'corazón', 'pulmón']},
+        ]
+    },
+    # Text Blocks
+    'text_block': {
+        'textos': [
+            {'texto': 'Texto 1', 'column': 1},
+            {'texto': 'Texto 2', 'column': 2},
+        ]
+    },
+    'text_article': {
+        'texto_block': [{'texto': 'Texto 1'}, {'texto': 'Texto 2'}],
+        'multimedia': [{'media_type': 'image', 'img_position': 'right', 'file': 'ruta/a/la/imagen.jpg'}],
+    },
+    'text_quote': {
+        'quote': [{'slice_1': 'Texto 1'}, {'slice_2': 'Texto 2'}],
+    },
+    'text_highlighted': {
+        'text_block': [{'text': 'Aquí se recibirá un bloque de texto a través de un JSON.'}],
+    },
+    'info_box': {
+        'info_box': [{'type_card': 'attention'}, {'type_card': 'grammar'}, {'type_card': 'tip'}],
+    },
+    'icon_list': {
+        'numeric_list': [
+            {'list_item_1': 'text 1', 'icon': 'icon_1'},
+            {'list_item_2': 'text 2', 'icon': 'icon_2'},
+        ]
+    },
+    # Multimedia: el contenido va en los campos de archivo / multimedia
+    'video': None,
+    'audio': None,
+    'video_embed': None,
+    'attachment': None,
+}
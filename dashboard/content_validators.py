@@ -0,0 +1,195 @@
+"""
+Validadores de content_details por tipo de contenido.
+
+Cada esquema se compila una sola vez al importar el módulo en una función check(value, path, errors)
+hecha de closures anidadas, de modo que validar un bloque no interpreta ningún esquema en tiempo de
+ejecución: solo isinstance y accesos a dict. Todos los tipos de ClassContentModel.CONTENT_TYPES
+deben tener su validador (se comprueba al importar).
+
+Los objetos admiten claves extra; solo se exigen las claves que usan los reproductores.
+"""
+from .models import ClassContentModel
+
+
+def _join(path, key):
+    return f'{path}.{key}' if path else key
+
+
+def text():
+    def check(value, path, errors):
+        if not isinstance(value, str):
+            errors.append(f'{path}: debe ser texto')
+    return check
+
+
+def integer(choices=None):
+    choices = frozenset(choices) if choices else None
+
+    def check(value, path, errors):
+        if not isinstance(value, int) or isinstance(value, bool):
+            errors.append(f'{path}: debe ser un número entero')
+        elif choices is not None and value not in choices:
+            errors.append(f'{path}: debe ser uno de {sorted(choices)}')
+    return check
+
+
+def boolean():
+    def check(value, path, errors):
+        if not isinstance(value, bool):
+            errors.append(f'{path}: debe ser true o false')
+    return check
+
+
+def choice(*options):
+    options = frozenset(options)
+
+    def check(value, path, errors):
+        if value not in options:
+            errors.append(f'{path}: debe ser uno de {sorted(options)}')
+    return check
+
+
+def any_json():
+    def check(value, path, errors):
+        if not isinstance(value, (dict, list)):
+            errors.append(f'{path}: debe ser un objeto o array JSON')
+    return check
+
+
+def list_of(item, min_items=1):
+    def check(value, path, errors):
+        if not isinstance(value, list):
+            errors.append(f'{path}: debe ser una lista')
+            return
+        if len(value) < min_items:
+            errors.append(f'{path}: debe tener al menos {min_items} elemento(s)')
+        for index, element in enumerate(value):
+            item(element, f'{path}[{index}]', errors)
+    return check
+
+
+def obj(required=None, optional=None):
+    required = tuple((required or {}).items())
+    optional = tuple((optional or {}).items())
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f'{path or "content_details"}: debe ser un objeto JSON')
+            return
+        for key, validator in required:
+            if key in value:
+                validator(value[key], _join(path, key), errors)
+            else:
+                errors.append(f'{_join(path, key)}: campo obligatorio')
+        for key, validator in optional:
+            if key in value and value[key] is not None:
+                validator(value[key], _join(path, key), errors)
+    return check
+
+
+def any_of(*validators):
+    """Válido si cumple alguno de los esquemas; si no, se reportan los errores del primero"""
+    def check(value, path, errors):
+        first_errors = None
+        for validator in validators:
+            attempt = []
+            validator(value, path, attempt)
+            if not attempt:
+                return
+            if first_errors is None:
+                first_errors = attempt
+        errors.extend(first_errors)
+    return check
+
+
+# Piezas comunes
+_choice_questions = obj({'questions': list_of(obj(
+    {'question': text(), 'answers': list_of(obj({'text': text(), 'is_correct': boolean()}))},
+))})
+# V/F: 'state' 1 (true), 2 (false), 3 (not stated) o 'stated' en texto (knowledge check)
+_true_false_questions = obj({'questions': list_of(any_of(
+    obj({'statement': text(), 'state': integer(choices=[1, 2, 3])}),
+    obj({'statement': text(), 'stated': choice('true', 'false', 'not_stated')}),
+))})
+_passages = obj({'passages': list_of(obj(
+    {'text': text(), 'keywords': list_of(text())}, {'help_text': boolean()},
+))})
+_word_bank = obj({'word_bank': list_of(obj(
+    {'text': text(), 'keywords': list_of(obj({'word': text(), 'position': integer()}))},
+))})
+_drop_down = obj({'drop_down_text': list_of(obj(
+    {'text': text(), 'options': list_of(obj({'word': text(), 'correct': boolean()}))},
+))})
+_ordering = obj({'ordering': list_of(obj({'text': text(), 'indice': integer()}))})
+_sorting = obj({'sorting': list_of(obj({'categoria': text(), 'imagenes': list_of(text())}))})
+_categories = obj({'categories': list_of(obj({'categoria': text(), 'text_items': list_of(text())}))})
+_pairs = obj({'pairs': list_of(obj({'left': text(), 'right': text()}))})
+_table_column = obj({'column': list_of(text()), 'cell': list_of(text(), min_items=0)})
+_optional_json = any_json()
+
+SCHEMAS = {
+    # Overlay Tasks
+    'multiple_choice': _choice_questions,
+    'true_false': _true_false_questions,
+    'fill_gaps': _passages,
+    'word_bank': _word_bank,
+    'drop_down_text': _drop_down,
+    'ordering': _ordering,
+    'sorting': _sorting,
+    'category': _categories,
+    'matching': _pairs,
+    # Interactive activities
+    'flashcards': obj({'flashcards': list_of(obj({'front': text()}, {'back': text(), 'img': text()}))}),
+    'table': obj({'table': any_of(list_of(_table_column), _table_column)}),
+    'accordion': obj({'accordion': list_of(obj({'title': text(), 'content': text()}, {'img': text()}))}),
+    'tabs': obj({'tabs': list_of(obj({'tab_title': text(), 'content': text()}, {'img': text()}))}),
+    'button_stack': obj({'buttons': list_of(obj({'label': text()}, {'url': text(), 'tittle': text(), 'text': text()}))}),
+    'process': obj({'steps': list_of(obj(optional={'steps': list_of(obj(), min_items=0)}))}),
+    'timeline': obj({'tabs': list_of(obj({'point_title': text()}, {'point': text(), 'point_text': text(), 'img': text()}))}),
+    # Knowledge Check
+    'multiple_choice_knowledge_check': _choice_questions,
+    'true_false_knowledge_check': _true_false_questions,
+    'fill_gaps_knowledge_check': _passages,
+    'word_bank_knowledge_check': _word_bank,
+    'drop_down_text_knowledge_check': _drop_down,
+    'ordering_knowledge_check': _ordering,
+    'sorting_knowledge_check': _sorting,
+    'categories_knowledge_check': _categories,
+    'matching_knowledge_check': _pairs,
+    'word_order_knowledge_check': obj({'sentences': list_of(obj(
+        {'text': text(), 'words': list_of(obj({'word': text(), 'position': integer()}))},
+    ))}),
+    'picture_matching_knowledge_check': obj({'pairs': list_of(obj({'image': text(), 'description': text()}))}),
+    'picture_labeling_knowledge_check': obj({'pairs': list_of(obj({'image': text(), 'labels': list_of(text())}))}),
+    # Text Blocks
+    'text_block': obj({'textos': list_of(obj({'texto': text()}, {'column': integer()}))}),
+    'text_article': obj({'texto_block': list_of(obj({'texto': text()}))}, {'multimedia': list_of(obj(), min_items=0)}),
+    'text_quote': obj({'quote': list_of(obj())}, {'multimedia': list_of(obj(), min_items=0)}),
+    'text_highlighted': obj({'text_block': list_of(obj({'text': text()}))}),
+    'info_box': obj({'info_box': list_of(obj({'type_card': text()}))}),
+    'icon_list': obj({'numeric_list': list_of(obj({'icon': text()}))}),
+    # Multimedia: el contenido principal va en los campos de archivo, content_details es libre
+    'video': _optional_json,
+    'audio': _optional_json,
+    'video_embed': _optional_json,
+    'attachment': _optional_json,
+}
+
+_missing = set(dict(ClassContentModel.CONTENT_TYPES)) - set(SCHEMAS)
+if _missing:
+    raise RuntimeError(f'Faltan validadores de content_details para: {sorted(_missing)}')
+
+
+def validate_content_details(content_type, value):
+    """
+    Valida content_details para el tipo indicado y devuelve la lista de errores (vacía si es válido).
+    None siempre es válido: el campo es opcional en el modelo.
+    """
+    if value is None:
+        return []
+    validator = SCHEMAS.get(content_type)
+    if validator is None:
+        return [f'Tipo de contenido no válido: {content_type}']
+    errors = []
+    validator(value, '', errors)
+    return errors
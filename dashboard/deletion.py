@@ -0,0 +1,93 @@
+"""
+Borrado de cursos y clases completos con un DELETE por tabla.
+
+`instance.delete()` de Django carga en memoria cada fila que cae en cascada (contenidos, tareas,
+bloques, enlaces de media, documentos de búsqueda...) para enviar sus señales, y la borra por lotes
+de ids: en un curso grande son miles de filas y cientos de consultas. delete_classes / delete_courses
+recorren las relaciones de los modelos y borran cada tabla con un DELETE ... WHERE fk IN
+(subconsulta), de las hojas hacia la raíz. De las filas solo se leen las rutas de sus archivos,
+que se anotan para la limpieza diferida (file_cleanup.py).
+
+Como no hay señales por fila, aquí se hace lo que harían los receptores: invalidar la caché y
+quitar las clases del índice de su curso (outline.py). Además se borra la media (MediaModel) que
+solo usaban las tareas borradas, que el cascade de Django dejaba huérfana.
+"""
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+from .file_cleanup import queryset_files, record_files
+from .models import ClassModel, CourseModel, MediaModel
+from .outline import schedule_refresh
+from .signals import MEDIA_TASK_MODELS, invalidate_class, invalidate_course
+
+
+def _delete_tree(model, queryset, deleted, files):
+    """Borra `queryset` después de las filas que dependen de él (CASCADE) o lo anulan (SET_NULL)"""
+    for relation in get_candidate_relations_to_delete(model._meta):
+        field = relation.field
+        dependents = relation.related_model._base_manager.filter(**{f'{field.name}__in': queryset})
+        on_delete = field.remote_field.on_delete
+        if on_delete is models.CASCADE:
+            _delete_tree(relation.related_model, dependents, deleted, files)
+        elif on_delete is models.SET_NULL:
+            dependents.update(**{field.name: None})
+        elif on_delete is not models.DO_NOTHING:
+            raise ValueError(f'{relation.related_model.__name__}.{field.name}: on_delete no admitido en el borrado por tablas')
+    files.extend(queryset_files(model, queryset))
+    # DELETE directo, sin el Collector (que leería las filas para enviar señales)
+    count = queryset._raw_delete(queryset.db)
+    if count:
+        deleted[model._meta.model_name] += count
+
+
+def _linked_media(classes):
+    media_ids = set()
+    for model in MEDIA_TASK_MODELS:
+        through = model.media.through
+        media_ids.update(through.objects.filter(
+            **{f'{model.media.field.m2m_field_name()}__class_model__in': classes},
+        ).values_list(f'{model.media.field.m2m_reverse_field_name()}_id', flat=True))
+    return media_ids
+
+
+def _unlinked(media_ids):
+    """Media de `media_ids` que ya no enlaza ninguna tarea"""
+    queryset = MediaModel.objects.filter(pk__in=list(media_ids))
+    for model in MEDIA_TASK_MODELS:
+        queryset = queryset.filter(**{f'{model.media.field.related_query_name()}__isnull': True})
+    return MediaModel.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+
+
+def _delete(model, pks):
+    pks = list(pks)
+    queryset = model.objects.filter(pk__in=pks)
+    classes = queryset if model is ClassModel else ClassModel.objects.filter(course__in=pks)
+    deleted, files = Counter(), []
+    with transaction.atomic():
+        class_rows = list(classes.values_list('pk', 'course_id'))
+        media_ids = _linked_media([class_id for class_id, _course_id in class_rows])
+        _delete_tree(model, queryset, deleted, files)
+        if media_ids:
+            _delete_tree(MediaModel, _unlinked(media_ids), deleted, files)
+        record_files(files)
+
+        for class_id, _course_id in class_rows:
+            invalidate_class(class_id)
+        for course_id in {course_id for _class_id, course_id in class_rows} | (set(pks) if model is CourseModel else set()):
+            invalidate_course(course_id)
+        if model is ClassModel:
+            # El índice de un curso borrado cae con él; el de las clases sueltas se actualiza
+            schedule_refresh(removed=[(course_id, class_id) for class_id, course_id in class_rows])
+    return dict(deleted)
+
+
+def delete_classes(class_ids):
+    """Borra las clases con todo su contenido. Devuelve {modelo: filas borradas}."""
+    return _delete(ClassModel, class_ids)
+
+
+def delete_courses(course_ids):
+    """Borra los cursos con todas sus clases. Devuelve {modelo: filas borradas}."""
+    return _delete(CourseModel, course_ids)
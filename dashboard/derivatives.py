@@ -0,0 +1,151 @@
+"""
+Derivados de imágenes (miniaturas y WebP) para portadas e imágenes de contenido.
+
+Al guardar una imagen en uno de los campos de IMAGE_FIELDS se encola un trabajo (ver jobs.py) que
+genera una versión WebP por cada ancho de IMAGE_DERIVATIVE_WIDTHS, junto al original:
+<original>.w320.webp. El resultado se guarda en el campo <campo>_variants del modelo y los
+serializers lo exponen como srcset, así los listados descargan kilobytes en lugar de la imagen original.
+"""
+import io
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .jobs import enqueue, job
+from .models import (
+    CourseModel, ClassModel, ClassContentModel, MultimediaBlockVideoModel,
+    MultimediaBlockVideoEmbedModel, MultimediaBlockAttachmentModel,
+)
+
+logger = logging.getLogger(__name__)
+
+# Modelo -> campos de imagen con derivados (cada uno tiene su <campo>_variants)
+IMAGE_FIELDS = {
+    CourseModel: ['cover'],
+    ClassModel: ['cover'],
+    ClassContentModel: ['image'],
+    MultimediaBlockVideoModel: ['cover'],
+    MultimediaBlockVideoEmbedModel: ['cover'],
+    MultimediaBlockAttachmentModel: ['cover'],
+}
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def variant_name(source_name, width):
+    return f'{os.path.splitext(source_name)[0]}.w{width}.webp'
+
+
+def schedule_derivatives(instance, field_name):
+    """Encola la generación de derivados para instance.<field_name>"""
+    enqueue('image_derivatives', {
+        'model': instance._meta.label,
+        'pk': instance.pk,
+        'field': field_name,
+        'source': getattr(instance, field_name).name,
+    })
+
+
+@job('image_derivatives')
+def derivatives_job(model, pk, field, source):
+    generate_derivatives(apps.get_model(model), pk, field, source)
+
+
+def build_variants(storage, source_name, widths=None, quality=None):
+    """
+    Genera los WebP de `source_name` y devuelve el manifiesto que se guarda en <campo>_variants.
+    Los derivados que ya existen no se vuelven a codificar (p. ej. un blob compartido por varias filas).
+    """
+    widths = sorted(widths or settings.IMAGE_DERIVATIVE_WIDTHS)
+    quality = quality or settings.IMAGE_DERIVATIVE_QUALITY
+
+    with storage.open(source_name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    original_width, original_height = image.size
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    # Nunca se amplía: los anchos mayores que el original se sustituyen por el ancho original
+    targets = sorted({min(width, original_width) for width in widths})
+    variants = []
+    for width in targets:
+        height = max(1, round(original_height * width / original_width))
+        name = variant_name(source_name, width)
+        if not storage.exists(name):
+            buffer = io.BytesIO()
+            image.resize((width, height), Image.LANCZOS).save(buffer, 'WEBP', quality=quality, method=4)
+            _save_variant(storage, name, buffer.getvalue())
+        variants.append({'name': name, 'width': width, 'height': height, 'format': 'webp'})
+
+    return {
+        'source': source_name,
+        'width': original_width,
+        'height': original_height,
+        'variants': variants,
+    }
+
+
+def _save_variant(storage, name, data):
+    if hasattr(storage, 'save_alongside'):
+        storage.save_alongside(name, ContentFile(data))
+    else:
+        storage.save(name, ContentFile(data))
+
+
+def generate_derivatives(model, pk, field_name, source=None):
+    """
+    Genera los derivados de la imagen actual de la fila y guarda el manifiesto con update(), solo si
+    la imagen no cambió mientras tanto. Devuelve el manifiesto o None.
+    """
+    from .signals import invalidate_instance
+
+    field = model._meta.get_field(field_name)
+    current = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+    if not current or (source is not None and current != source):
+        return None
+
+    try:
+        manifest = build_variants(field.storage, current)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning('No se pudieron generar derivados de %s: %s', current, e)
+        return None
+
+    values = {variants_field(field_name): manifest}
+    # update() no toca auto_now: se actualiza a mano para que ETag / Last-Modified cambien
+    if any(model_field.name == 'updated_at' for model_field in model._meta.concrete_fields):
+        values['updated_at'] = timezone.now()
+    updated = model.objects.filter(pk=pk, **{field_name: current}).update(**values)
+    if updated:
+        invalidate_instance(model.objects.get(pk=pk))
+    return manifest
+
+
+def variants_payload(manifest, storage, request=None):
+    """Representación pública del manifiesto: URLs, srcset y miniatura"""
+    if not manifest or not manifest.get('variants'):
+        return None
+
+    def url(name):
+        value = storage.url(name)
+        return request.build_absolute_uri(value) if request is not None else value
+
+    variants = [
+        {'url': url(item['name']), 'width': item['width'], 'height': item['height'], 'format': item['format']}
+        for item in manifest['variants']
+    ]
+    return {
+        'thumbnail': variants[0]['url'],
+        'srcset': ', '.join(f"{item['url']} {item['width']}w" for item in variants),
+        'width': manifest['width'],
+        'height': manifest['height'],
+        'variants': variants,
+    }
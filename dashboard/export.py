@@ -0,0 +1,184 @@
+"""
+Exportación completa de un curso en NDJSON o en un zip (course.ndjson + archivos multimedia).
+
+Cada línea es un registro con el formato de los fixtures de Django:
+    {"model": "dashboard.classmodel", "pk": 3, "fields": {...}}
+Los registros se leen con iterator(chunk_size=...) y el zip se escribe por partes, así que la memoria
+usada no depende del tamaño del curso (solo se guardan las rutas de los archivos a incluir).
+"""
+import io
+import json
+import logging
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FileField, Q
+
+from .models import (
+    CourseModel, ClassModel, LayoutModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel,
+    CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel,
+    MultimediaBlockVideoModel, MultimediaBlockAudioModel, MultimediaBlockVideoEmbedModel,
+    MultimediaBlockAttachmentModel, MediaModel, ClassContentModel,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+COPY_BUFFER_SIZE = 1024 * 1024
+NDJSON_NAME = 'course.ndjson'
+MEDIA_PREFIX = 'media/'
+
+# Modelos que cuelgan de una clase y el lookup que los relaciona con el curso
+CLASS_CHILD_SOURCES = [
+    (LayoutModel, 'class_model__course_id'),
+    (MultipleChoiceModel, 'class_model__course_id'),
+    (TrueOrFalseModel, 'class_model__course_id'),
+    (OrderingTaskModel, 'class_model__course_id'),
+    (CategoriesTaskModel, 'class_model__course_id'),
+    (FillInTheGapsTaskModel, 'class_model__course_id'),
+    (VideoLayoutModel, 'class_model__course_id'),
+    (TextBlockLayoutModel, 'lesson__course_id'),
+    (MultimediaBlockVideoModel, 'class_model__course_id'),
+    (MultimediaBlockAudioModel, 'class_model__course_id'),
+    (MultimediaBlockVideoEmbedModel, 'class_model__course_id'),
+    (MultimediaBlockAttachmentModel, 'class_model__course_id'),
+    (ClassContentModel, 'class_id__course_id'),
+]
+
+# Tareas con M2M a MediaModel
+MEDIA_TASK_MODELS = [TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel]
+
+
+def _through_rows(task_model, course_id):
+    """Filas de la tabla intermedia task <-> media para las tareas del curso"""
+    m2m = task_model._meta.get_field('media')
+    through = m2m.remote_field.through
+    lookup = f'{m2m.m2m_field_name()}__class_model__course_id'
+    return through, through.objects.filter(**{lookup: course_id}), m2m.m2m_reverse_field_name()
+
+
+def course_querysets(course_id):
+    """(modelo, queryset) en el orden en que deben importarse"""
+    sources = [
+        (CourseModel, CourseModel.objects.filter(pk=course_id)),
+        (ClassModel, ClassModel.objects.filter(course_id=course_id)),
+    ]
+
+    media_filter = Q()
+    through_sources = []
+    for task_model in MEDIA_TASK_MODELS:
+        through, rows, media_field = _through_rows(task_model, course_id)
+        media_filter |= Q(pk__in=rows.values(f'{media_field}_id'))
+        through_sources.append((through, rows))
+    sources.append((MediaModel, MediaModel.objects.filter(media_filter)))
+
+    for model, lookup in CLASS_CHILD_SOURCES:
+        sources.append((model, model.objects.filter(**{lookup: course_id})))
+    return sources + through_sources
+
+
+def _record_fields(model):
+    """(nombre en el registro, columna) para cada campo concreto excepto la pk"""
+    return [(field.name, field.attname) for field in model._meta.concrete_fields if not field.primary_key]
+
+
+def _file_columns(model):
+    return [field.attname for field in model._meta.concrete_fields if isinstance(field, FileField)]
+
+
+def iter_course_records(course_id, chunk_size=DEFAULT_CHUNK_SIZE, media_paths=None):
+    """
+    Genera los registros del curso. Si se pasa `media_paths` (un set) se añaden ahí las rutas
+    de los archivos referenciados.
+    """
+    for model, queryset in course_querysets(course_id):
+        fields = _record_fields(model)
+        file_columns = _file_columns(model)
+        columns = ['pk'] + [attname for _name, attname in fields]
+        for row in queryset.order_by('pk').values(*columns).iterator(chunk_size=chunk_size):
+            if media_paths is not None:
+                for column in file_columns:
+                    if row[column]:
+                        media_paths.add(row[column])
+                for item in row.get('multimedia') or []:
+                    path = item.get('file_info', {}).get('path') if isinstance(item, dict) else None
+                    if path:
+                        media_paths.add(path)
+            yield {
+                'model': model._meta.label_lower,
+                'pk': row['pk'],
+                'fields': {name: row[attname] for name, attname in fields},
+            }
+
+
+def iter_course_ndjson(course_id, chunk_size=DEFAULT_CHUNK_SIZE, media_paths=None):
+    for record in iter_course_records(course_id, chunk_size=chunk_size, media_paths=media_paths):
+        yield (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se vacía con drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entry(name, compress_type):
+    info = zipfile.ZipInfo(name)
+    info.compress_type = compress_type
+    return info
+
+
+def iter_course_zip(course_id, chunk_size=DEFAULT_CHUNK_SIZE, storage=None):
+    """Genera el zip por partes: primero course.ndjson y luego cada archivo bajo media/"""
+    storage = storage or default_storage
+    sink = _ChunkSink()
+    media_paths = set()
+
+    with zipfile.ZipFile(sink, 'w') as archive:
+        with archive.open(_entry(NDJSON_NAME, zipfile.ZIP_DEFLATED), 'w', force_zip64=True) as entry:
+            for line in iter_course_ndjson(course_id, chunk_size=chunk_size, media_paths=media_paths):
+                entry.write(line)
+                data = sink.drain()
+                if data:
+                    yield data
+
+        for path in sorted(media_paths):
+            if not storage.exists(path):
+                logger.warning(f"Archivo referenciado no encontrado al exportar: {path}")
+                continue
+            # Los archivos multimedia ya vienen comprimidos: se guardan sin volver a comprimir
+            with storage.open(path, 'rb') as source, \
+                    archive.open(_entry(MEDIA_PREFIX + path, zipfile.ZIP_STORED), 'w', force_zip64=True) as entry:
+                while True:
+                    chunk = source.read(COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+    # Directorio central del zip, escrito al cerrar
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,253 @@
+"""
+Limpieza diferida de los archivos de las filas borradas.
+
+Borrar una fila no borra sus archivos dentro de la petición: sus rutas (campos de archivo, listas
+`multimedia` de ClassContentModel y derivados WebP de los manifiestos <campo>_variants) se anotan
+en FileCleanupModel en la misma transacción y se encola el trabajo 'file_cleanup', que las borra
+por lotes con default_storage.delete. Con ContentAddressedStorage cada ruta anotada resta una
+referencia y el blob solo desaparece con la última, así un curso duplicado (cloning.py) conserva la
+media que comparte con el original. El contador no es la única garantía: antes de quitar la última
+referencia se comprueba que ninguna fila siga usando la ruta, y si alguna la usa se corrige el
+contador en lugar de borrar el archivo (o, si es un derivado, simplemente no se borra).
+Si la transacción se revierte, las anotaciones se revierten con ella.
+
+find_orphan_files hace la conciliación inversa: recorre MEDIA_ROOT y CHUNKED_UPLOAD_DIR buscando
+archivos que ninguna fila referencia, p. ej. los que dejó un worker caído entre reclamar una ruta y
+borrarla, o los reemplazados sin pasar por delete().
+"""
+import logging
+import os
+import time
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import F, Max, Q
+
+from .jobs import enqueue, job
+from .models import ChunkedUploadModel, ClassContentModel, FileCleanupModel, MediaBlobModel
+from .storage import DERIVATIVE_SUFFIX, _referenced_names, is_blob, multimedia_paths
+
+logger = logging.getLogger(__name__)
+
+
+class CleanupIncomplete(Exception):
+    pass
+
+
+def file_field_names(model):
+    return [field.attname for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+def variant_field_names(model):
+    """Campos <campo de archivo>_variants con el manifiesto de derivados (derivatives.py)"""
+    names = {field.attname for field in model._meta.concrete_fields}
+    return [f'{attname}_variants' for attname in file_field_names(model) if f'{attname}_variants' in names]
+
+
+def variant_paths(manifest):
+    """Rutas de los derivados WebP de un manifiesto <campo>_variants"""
+    if not isinstance(manifest, dict):
+        return []
+    return [variant['name'] for variant in manifest.get('variants') or [] if variant.get('name')]
+
+
+def instance_files(instance):
+    """Rutas de archivo que usa `instance`, derivados de imagen incluidos"""
+    names = [getattr(instance, attname).name for attname in file_field_names(type(instance))]
+    if isinstance(instance, ClassContentModel):
+        names.extend(multimedia_paths(instance.multimedia))
+    for attname in variant_field_names(type(instance)):
+        names.extend(variant_paths(getattr(instance, attname)))
+    return [name for name in names if name]
+
+
+def queryset_files(model, queryset):
+    """Rutas de archivo que usan las filas de `queryset`, derivados incluidos y con repeticiones (una consulta)"""
+    files = file_field_names(model)
+    variants = variant_field_names(model)
+    columns = files + variants
+    if model is ClassContentModel:
+        columns.append('multimedia')
+    if not columns:
+        return
+    for row in queryset.values_list(*columns).iterator():
+        if model is ClassContentModel:
+            *row, multimedia = row
+            yield from multimedia_paths(multimedia)
+        for manifest in row[len(files):]:
+            yield from variant_paths(manifest)
+        yield from (name for name in row[:len(files)] if name)
+
+
+def record_files(names):
+    """Anota las rutas para borrarlas al confirmar la transacción. Devuelve cuántas se anotaron."""
+    rows = [FileCleanupModel(name=name) for name in names]
+    if not rows:
+        return 0
+    FileCleanupModel.objects.bulk_create(rows, batch_size=settings.FILE_CLEANUP_BATCH_SIZE)
+    enqueue('file_cleanup')
+    return len(rows)
+
+
+@job('file_cleanup')
+def file_cleanup_job():
+    deleted, failed = sweep_files()
+    if failed:
+        # El trabajo se reintenta con la espera de la cola y vuelve a probar las que fallaron
+        raise CleanupIncomplete(f'{failed} archivos no se pudieron borrar')
+
+
+def sweep_files(batch_size=None):
+    """
+    Borra del storage las rutas anotadas, por lotes. Cada ruta se reclama borrando su fila antes de
+    tocar el archivo, así dos workers no restan dos veces la misma referencia; si el borrado falla
+    se vuelve a anotar con el error. Devuelve (archivos borrados, fallidos).
+    """
+    batch_size = batch_size or settings.FILE_CLEANUP_BATCH_SIZE
+    pending = FileCleanupModel.objects.filter(attempts__lt=settings.FILE_CLEANUP_MAX_ATTEMPTS)
+    # Las rutas que fallen en este barrido se reanotan con ids mayores y esperan al siguiente
+    last_pk = pending.aggregate(last=Max('pk'))['last'] or 0
+    deleted = failed = 0
+    cursor = 0
+    while True:
+        rows = list(pending.filter(pk__gt=cursor, pk__lte=last_pk).order_by('pk').values_list('pk', 'name', 'attempts')[:batch_size])
+        if not rows:
+            return deleted, failed
+        cursor = rows[-1][0]
+        claimed = _claim(rows)
+        in_use = _reference_counts({name for _pk, name, _attempts in claimed})
+        retry = []
+        for _pk, name, attempts in claimed:
+            if name in in_use:
+                # Otra fila sigue usando el archivo: no se borra
+                if is_blob(name) and not DERIVATIVE_SUFFIX.search(name):
+                    _release_shared_blob(name, in_use[name])
+                continue
+            try:
+                default_storage.delete(name)
+                deleted += 1
+            except Exception as error:
+                logger.warning('No se pudo borrar %s: %s', name, error)
+                retry.append(FileCleanupModel(name=name, attempts=attempts + 1, last_error=str(error)))
+        if retry:
+            FileCleanupModel.objects.bulk_create(retry)
+            failed += len(retry)
+
+
+def _claim(rows):
+    """Las filas de `rows` que este proceso consiguió borrar (las demás ya las reclamó otro)"""
+    with transaction.atomic():
+        return [row for row in rows if FileCleanupModel.objects.filter(pk=row[0]).delete()[0]]
+
+
+def _release_shared_blob(name, in_use):
+    """
+    Resta la referencia de un blob que todavía usan `in_use` filas, sin dejar el contador por debajo
+    de ellas. Si se quedaría corto (filas que copiaron la ruta sin sumar una referencia), se corrige
+    a `in_use` en lugar de restar: el archivo nunca se borra aquí.
+    """
+    if MediaBlobModel.objects.filter(name=name, ref_count__gt=in_use).update(ref_count=F('ref_count') - 1):
+        return
+    logger.warning('El blob %s sigue en uso por %s filas: se corrige su contador', name, in_use)
+    if not MediaBlobModel.objects.filter(name=name).update(ref_count=in_use):
+        default_storage.add_reference(name, count=in_use)
+
+
+def _reference_counts(names, chunk_size=100):
+    """
+    Cuántas veces usa cada ruta de `names` alguna fila (campos de archivo, listas `multimedia` y
+    manifiestos de derivados).
+    Solo aparecen las que siguen en uso: los archivos anteriores a ContentAddressedStorage no
+    cuentan referencias, y una copia o una importación puede compartir un blob sin haberla sumado.
+    """
+    if not names:
+        return Counter()
+    names = list(names)
+    counts = Counter()
+    for model in apps.get_app_config('dashboard').get_models():
+        for attname in file_field_names(model):
+            counts.update(model.objects.filter(**{f'{attname}__in': names}).values_list(attname, flat=True).iterator())
+    wanted = set(names)
+    # Un derivado lo comparten las filas cuya imagen es el mismo blob (p. ej. un curso duplicado)
+    variant_names = [name for name in names if DERIVATIVE_SUFFIX.search(name)]
+    for model in apps.get_app_config('dashboard').get_models():
+        for attname in variant_field_names(model):
+            for start in range(0, len(variant_names), chunk_size):
+                query = reduce(or_, (Q(**{f'{attname}__icontains': name}) for name in variant_names[start:start + chunk_size]))
+                for manifest in model.objects.filter(query).values_list(attname, flat=True).iterator():
+                    counts.update(path for path in variant_paths(manifest) if path in wanted)
+    for start in range(0, len(names), chunk_size):
+        # Un LIKE por ruta filtra las filas candidatas; la coincidencia exacta se comprueba en Python
+        query = reduce(or_, (Q(multimedia__icontains=name) for name in names[start:start + chunk_size]))
+        for multimedia in ClassContentModel.objects.filter(query).values_list('multimedia', flat=True).iterator():
+            counts.update(path for path in multimedia_paths(multimedia) if path in wanted)
+    return counts
+
+
+def find_orphan_files(min_age):
+    """
+    Concilia el storage con la base de datos. Devuelve un dict con:
+      - orphans: [(ruta, bytes)] de MEDIA_ROOT que ninguna fila usa (ni como derivado de una imagen).
+      - partials: [(ruta absoluta, bytes)] de CHUNKED_UPLOAD_DIR sin una subida en curso.
+      - missing: rutas que alguna fila usa y no existen.
+    Se ignoran los archivos modificados hace menos de `min_age` (timedelta): pueden ser de una subida
+    cuya fila todavía no se confirmó. Requiere un storage en disco (FileSystemStorage).
+    """
+    cutoff = time.time() - min_age.total_seconds()
+    referenced = set(_referenced_names())
+    referenced.update(MediaBlobModel.objects.values_list('name', flat=True).iterator())
+    # Las rutas anotadas las borrará el barrido; no se adelantan
+    pending = set(FileCleanupModel.objects.values_list('name', flat=True).iterator())
+    stems = {os.path.splitext(name)[0] for name in referenced}
+
+    root = default_storage.location
+    on_disk = set()
+    orphans = []
+    for name, path in _walk(root):
+        on_disk.add(name)
+        if name in referenced or name in pending:
+            continue
+        derivative = DERIVATIVE_SUFFIX.search(name)
+        if derivative and name[:derivative.start()] in stems:
+            continue
+        stat = os.stat(path)
+        if stat.st_mtime < cutoff:
+            orphans.append((name, stat.st_size))
+
+    uploading = {str(pk) for pk in ChunkedUploadModel.objects.filter(status='uploading').values_list('pk', flat=True)}
+    partials = []
+    for name, path in _walk(settings.CHUNKED_UPLOAD_DIR):
+        stat = os.stat(path)
+        if os.path.splitext(name)[0] not in uploading and stat.st_mtime < cutoff:
+            partials.append((path, stat.st_size))
+
+    return {'orphans': orphans, 'partials': partials, 'missing': sorted(referenced - on_disk)}
+
+
+def _walk(root):
+    """(ruta relativa con /, ruta absoluta) de cada archivo bajo `root`"""
+    if not os.path.isdir(root):
+        return
+    for directory, _directories, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, root).replace(os.sep, '/'), path
+
+
+def delete_orphan_files(report):
+    """Borra los huérfanos y parciales de un informe de find_orphan_files. Devuelve (archivos, bytes)."""
+    paths = [(default_storage.path(name), size) for name, size in report['orphans']] + report['partials']
+    count = freed = 0
+    for path, size in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        count += 1
+        freed += size
+    return count, freed
@@ -0,0 +1,127 @@
+"""
+Informe de calificaciones de un curso a partir de Moodle.
+
+Las calificaciones de todos los alumnos se piden en paralelo (MoodleAPI.get_course_grades_bulk, como
+máximo MOODLE_MAX_WORKERS llamadas a la vez) y el informe agregado se guarda en la caché de contenido
+con la versión del curso en la clave (alcance GRADES_SCOPE):
+  - Si no hay informe (primera lectura, tras invalidarlo o al expirar) se encola su construcción y
+    la petición responde sin esperar: con cientos de alumnos son decenas de segundos de llamadas.
+  - Si el informe tiene más de GRADES_REFRESH_AFTER segundos se sirve igualmente y se encola su
+    actualización (trabajo 'refresh_grade_report', ver jobs.py); la entrada expira a GRADES_CACHE_TTL.
+  - invalidate_grades(course_id) descarta el informe de un curso.
+El informe lo construye el proceso de run_jobs y lo sirven los de gunicorn, así que la caché de
+contenido tiene que ser compartida entre procesos (CONTENT_CACHE_BACKEND 'file' o 'redis').
+"""
+import time
+
+from django.conf import settings
+
+from .content_cache import GRADES_SCOPE, bump_version, get_cache, get_version
+from .jobs import enqueue, job
+from .models import MoodleCourseSyncModel
+from .moodle_sync import shared_client
+
+
+class CourseNotSynced(LookupError):
+    """El curso aún no existe en Moodle (ver moodle_sync.py)"""
+
+
+def remote_course_id(course_id):
+    remote_id = MoodleCourseSyncModel.objects.filter(course_id=course_id).values_list('remote_id', flat=True).first()
+    if remote_id is None:
+        raise CourseNotSynced(course_id)
+    return remote_id
+
+
+def _report_key(course_id):
+    return f'grades:{course_id}:{get_version(GRADES_SCOPE, course_id)}'
+
+
+def _percentage(grade, grademax):
+    if grade is None or not grademax:
+        return None
+    return round(float(grade) / float(grademax) * 100, 2)
+
+
+def build_report(usergrades):
+    """Agrega las calificaciones: una fila por alumno y estadísticas por elemento calificable"""
+    students = []
+    items = {}
+    for usergrade in sorted(usergrades, key=lambda usergrade: usergrade.get('userfullname') or ''):
+        student = {'user_id': usergrade['userid'], 'fullname': usergrade.get('userfullname'), 'total': None, 'items': []}
+        for item in usergrade.get('gradeitems', []):
+            grade = item.get('graderaw')
+            entry = {
+                'id': item['id'],
+                'name': item.get('itemname'),
+                'grade': grade,
+                'percentage': _percentage(grade, item.get('grademax')),
+            }
+            if item.get('itemtype') == 'course':
+                student['total'] = entry
+                continue
+            student['items'].append(entry)
+            stats = items.setdefault(item['id'], {
+                'id': item['id'], 'name': item.get('itemname'), 'grademax': item.get('grademax'), 'grades': [],
+            })
+            if grade is not None:
+                stats['grades'].append(float(grade))
+        students.append(student)
+
+    summary = []
+    for stats in items.values():
+        grades = stats.pop('grades')
+        summary.append({
+            **stats,
+            'count': len(grades),
+            'average': round(sum(grades) / len(grades), 2) if grades else None,
+            'min': min(grades) if grades else None,
+            'max': max(grades) if grades else None,
+        })
+    return {'students': students, 'items': summary}
+
+
+def refresh_report(course_id, moodle=None):
+    """Pide las calificaciones a Moodle, construye el informe y lo guarda en caché. Devuelve la entrada."""
+    moodle = moodle or shared_client()
+    remote_id = remote_course_id(course_id)
+    # La versión se lee antes de consultar Moodle: si el curso se invalida mientras tanto, el
+    # informe se guarda bajo la versión anterior y no se sirve
+    key = _report_key(course_id)
+    user_ids = [user['id'] for user in moodle.get_enrolled_users(remote_id)]
+    usergrades = moodle.get_course_grades_bulk(remote_id, user_ids)
+    entry = {'report': build_report(usergrades.values()), 'fetched_at': time.time()}
+    get_cache().set(key, entry, timeout=settings.GRADES_CACHE_TTL)
+    return entry
+
+
+def get_report(course_id):
+    """
+    Devuelve (entrada, actualizándose). Una entrada desactualizada se sirve y se actualiza en segundo
+    plano; si no hay ninguna, se encola su construcción y la entrada es None.
+    """
+    entry = get_cache().get(_report_key(course_id))
+    if entry is None:
+        remote_course_id(course_id)
+        schedule_refresh(course_id)
+        return None, True
+    stale = time.time() - entry['fetched_at'] > settings.GRADES_REFRESH_AFTER
+    if stale:
+        schedule_refresh(course_id)
+    return entry, stale
+
+
+def schedule_refresh(course_id):
+    enqueue('refresh_grade_report', {'course_id': course_id})
+
+
+def invalidate_grades(course_id):
+    bump_version(GRADES_SCOPE, course_id)
+
+
+@job('refresh_grade_report')
+def refresh_grade_report_job(course_id):
+    try:
+        refresh_report(course_id)
+    except CourseNotSynced:
+        pass
@@ -0,0 +1,356 @@
+"""
+Corrección de las actividades con respuesta: knowledge checks, tareas de superposición y modelos de
+tarea (opción múltiple, V/F, ordenar, categorías y completar huecos).
+
+La clave de cada actividad se compila una vez a una AnswerKey: una lista de huecos, cada uno con su
+respuesta correcta codificada como entero y que vale un punto. Una entrega es la lista de respuestas
+en el orden de los huecos, que es el de content_details:
+  - choice: pregunta de opción múltiple; índice de la opción elegida o lista de índices. La clave es
+    la máscara de bits de las opciones correctas y hay que marcar exactamente esas.
+  - true_false: 'true' / 'false' / 'not_stated', true / false o 1 / 2 / 3 (como `state`).
+  - index: índice del elemento elegido (categoría de un ítem, pareja, ítem en cada posición al
+    ordenar, opción de un desplegable); el id del ítem en OrderingTaskModel.
+  - text: palabra escrita (huecos, banco de palabras, etiquetas). Se compara sin distinguir
+    mayúsculas ni espacios repetidos, pero con acentos: la ortografía también se evalúa.
+
+score_batch corrige miles de entregas por llamada: las respuestas se codifican (los textos con el
+vocabulario de la clave) en una matriz entregas ×
+huecos y la comparación, los puntos y el acierto por hueco se calculan con NumPy. La matriz se
+construye por columnas: los enteros se convierten de una vez y de los textos se codifica cada
+respuesta distinta una sola vez; si todos los huecos son de tipo index se convierte
+la lista de entregas entera sin recorrerla en Python.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+from .models import (
+    ClassContentModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel,
+    FillInTheGapsTaskModel,
+)
+
+CHOICE = 'choice'
+TRUE_FALSE = 'true_false'
+INDEX = 'index'
+TEXT = 'text'
+
+# Código de una respuesta vacía o inválida: nunca coincide con la clave
+MISSING = -1
+# Opciones por pregunta: su máscara de bits cabe en un int64
+MAX_CHOICES = 62
+MAX_CODE = 2 ** 63 - 1
+TRUE_FALSE_CODES = {'true': 1, 'false': 2, 'not_stated': 3}
+GAP_MARKER = re.compile(r'__(\d+)__')
+
+
+class NotGradable(ValueError):
+    """La actividad no tiene respuestas que corregir o su clave no es válida"""
+
+
+@lru_cache(maxsize=65536)
+def normalize(text):
+    return ' '.join(unicodedata.normalize('NFC', text).casefold().split())
+
+
+def _encode_index(value):
+    # bool es int: True/False cuentan como 1/0, igual que al convertir la matriz con NumPy
+    return value if isinstance(value, int) and 0 <= value <= MAX_CODE else MISSING
+
+
+def _encode_choice(value):
+    indices = [value] if isinstance(value, int) else value
+    if not isinstance(indices, list):
+        return MISSING
+    mask = 0
+    for index in indices:
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < MAX_CHOICES:
+            return MISSING
+        mask |= 1 << index
+    return mask
+
+
+def _encode_true_false(value):
+    if isinstance(value, bool):
+        return 1 if value else 2
+    if isinstance(value, int):
+        return value if value in (1, 2, 3) else MISSING
+    if isinstance(value, str):
+        return TRUE_FALSE_CODES.get(value.strip().lower(), MISSING)
+    return MISSING
+
+
+# Codificación vectorizada de una columna de respuestas enteras, equivalente a la de cada _encode_*
+_INT_COLUMN = {
+    INDEX: lambda values: np.where(values >= 0, values, MISSING),
+    CHOICE: lambda values: np.where(
+        (values >= 0) & (values < MAX_CHOICES), np.left_shift(1, np.clip(values, 0, MAX_CHOICES - 1)), MISSING,
+    ),
+    TRUE_FALSE: lambda values: np.where(np.isin(values, (1, 2, 3)), values, MISSING),
+    TEXT: lambda values: np.full(len(values), MISSING),
+}
+
+
+class AnswerKey:
+    """Clave compilada: tipo y respuesta correcta de cada hueco"""
+
+    def __init__(self, slots):
+        """`slots`: [(tipo, respuesta)] con la respuesta ya en su forma de clave (máscara, código, índice o texto)"""
+        if not slots:
+            raise NotGradable('La actividad no tiene respuestas que corregir')
+        self.types = tuple(kind for kind, _answer in slots)
+        self.answers = tuple(answer for _kind, answer in slots)
+        self.vocabulary = {}
+        codes = []
+        for kind, answer in slots:
+            if kind == TEXT:
+                codes.append(self.vocabulary.setdefault(normalize(answer), len(self.vocabulary)))
+            else:
+                codes.append(answer)
+        self.codes = np.array(codes, dtype=np.int64)
+        self._code_list = codes
+        self._encoders = [self._encoder(kind) for kind in self.types]
+        self._index_only = all(kind == INDEX for kind in self.types)
+
+    def __len__(self):
+        return len(self.types)
+
+    def _encoder(self, kind):
+        if kind == TEXT:
+            vocabulary = self.vocabulary
+            return lambda value: vocabulary.get(normalize(value), MISSING) if isinstance(value, str) else MISSING
+        return {CHOICE: _encode_choice, TRUE_FALSE: _encode_true_false, INDEX: _encode_index}[kind]
+
+    def correct_answers(self):
+        """Una entrega con todas las respuestas correctas"""
+        answers = []
+        for kind, answer in zip(self.types, self.answers):
+            if kind == CHOICE:
+                indices = [index for index in range(MAX_CHOICES) if answer >> index & 1]
+                answers.append(indices[0] if len(indices) == 1 else indices)
+            else:
+                answers.append(answer)
+        return answers
+
+    def encode(self, answers):
+        return [encode(value) for encode, value in zip(self._encoders, answers)]
+
+    def check(self, answers):
+        """Lanza ValueError si `answers` no es una lista con una respuesta por hueco"""
+        if not isinstance(answers, list) or len(answers) != len(self):
+            raise ValueError(f'Debe ser una lista de {len(self)} respuestas')
+
+    def score(self, answers):
+        """Corrige una entrega sin NumPy: {points, max_points, score, correct}"""
+        self.check(answers)
+        correct = [code == key for code, key in zip(self.encode(answers), self._code_list)]
+        points = sum(correct)
+        return {'points': points, 'max_points': len(self), 'score': round(points / len(self), 4), 'correct': correct}
+
+    def matrix(self, submissions):
+        """Matriz entregas × huecos con los códigos de las respuestas"""
+        if set(map(type, submissions)) - {list} or set(map(len, submissions)) - {len(self)}:
+            for index, submission in enumerate(submissions):
+                try:
+                    self.check(submission)
+                except ValueError as error:
+                    raise ValueError(f'[{index}]: {error}') from None
+        if self._index_only and submissions:
+            try:
+                matrix = np.array(submissions)
+            except (TypeError, ValueError, OverflowError):
+                matrix = None
+            if matrix is not None and matrix.dtype.kind == 'i' and matrix.shape == (len(submissions), len(self)):
+                # Los negativos nunca coinciden con la clave, igual que MISSING
+                return matrix.astype(np.int64, copy=False)
+        matrix = np.empty((len(submissions), len(self)), dtype=np.int64)
+        for slot, column in enumerate(zip(*submissions)):
+            matrix[:, slot] = self._encode_column(slot, column)
+        return matrix
+
+    def _encode_column(self, slot, column):
+        """Códigos de las respuestas de todas las entregas a un hueco"""
+        kind = self.types[slot]
+        value_types = set(map(type, column))
+        if value_types == {str}:
+            # Pocas respuestas distintas entre miles de entregas: se codifica cada una una sola vez
+            encode = self._encoders[slot]
+            codes = {value: encode(value) for value in set(column)}
+            return np.fromiter(map(codes.__getitem__, column), dtype=np.int64, count=len(column))
+        if value_types == {int}:
+            try:
+                values = np.array(column, dtype=np.int64)
+            except OverflowError:
+                pass
+            else:
+                return _INT_COLUMN[kind](values)
+        return [self._encoders[slot](value) for value in column]
+
+    def score_batch(self, submissions, details=False):
+        """
+        Corrige una lista de entregas. Devuelve {results, mean_score, slot_accuracy}: cada resultado
+        con points, max_points y score (y correct por hueco si `details`), y el acierto medio por hueco.
+        """
+        correct = self.matrix(submissions) == self.codes
+        points = correct.sum(axis=1)
+        scores = np.round(points / len(self), 4)
+        results = [
+            {'points': row_points, 'max_points': len(self), 'score': row_score}
+            for row_points, row_score in zip(points.tolist(), scores.tolist())
+        ]
+        if details:
+            for result, row in zip(results, correct.tolist()):
+                result['correct'] = row
+        return {
+            'results': results,
+            'mean_score': round(float(scores.mean()), 4) if len(results) else None,
+            'slot_accuracy': np.round(correct.mean(axis=0), 4).tolist() if len(results) else [],
+        }
+
+
+# Claves de content_details por tipo de contenido
+
+def _choice_slots(questions):
+    slots = []
+    for question in questions:
+        if len(question['answers']) > MAX_CHOICES:
+            raise NotGradable(f'Una pregunta admite como máximo {MAX_CHOICES} opciones')
+        mask = 0
+        for index, answer in enumerate(question['answers']):
+            if answer.get('is_correct'):
+                mask |= 1 << index
+        slots.append((CHOICE, mask))
+    return slots
+
+
+def _true_false_slots(questions):
+    return [
+        (TRUE_FALSE, question['state'] if 'state' in question else TRUE_FALSE_CODES[question['stated']])
+        for question in questions
+    ]
+
+
+def _passage_slots(passages):
+    slots = []
+    for passage in passages:
+        gaps = [int(number) for number in GAP_MARKER.findall(passage['text'])]
+        # Sin marcadores numerados, una palabra por hueco en orden
+        answers = [passage['keywords'][gap - 1] for gap in gaps] if gaps else passage['keywords']
+        slots.extend((TEXT, answer) for answer in answers)
+    return slots
+
+
+def _positioned_slots(groups, key, kind):
+    """Un hueco por posición de cada grupo; la respuesta es la palabra o el índice del elemento en esa posición"""
+    slots = []
+    for group in groups:
+        items = sorted(enumerate(group[key]), key=lambda item: item[1]['position'])
+        slots.extend((kind, item['word'] if kind == TEXT else index) for index, item in items)
+    return slots
+
+
+def _drop_down_slots(items):
+    slots = []
+    for item in items:
+        correct = [index for index, option in enumerate(item['options']) if option.get('correct')]
+        if not correct:
+            raise NotGradable('Un desplegable no tiene opción correcta')
+        slots.append((INDEX, correct[0]))
+    return slots
+
+
+def _ordering_slots(items, position_key):
+    order = sorted(range(len(items)), key=lambda index: items[index][position_key])
+    return [(INDEX, index) for index in order]
+
+
+def _category_slots(categories, items_key):
+    return [(INDEX, category_index) for category_index, category in enumerate(categories) for _item in category[items_key]]
+
+
+def _pair_slots(pairs):
+    return [(INDEX, index) for index in range(len(pairs))]
+
+
+def _label_slots(pairs):
+    return [(TEXT, label) for pair in pairs for label in pair['labels']]
+
+
+_CONTENT_SLOTS = {
+    'multiple_choice': lambda details: _choice_slots(details['questions']),
+    'true_false': lambda details: _true_false_slots(details['questions']),
+    'fill_gaps': lambda details: _passage_slots(details['passages']),
+    'word_bank': lambda details: _positioned_slots(details['word_bank'], 'keywords', TEXT),
+    'drop_down_text': lambda details: _drop_down_slots(details['drop_down_text']),
+    'ordering': lambda details: _ordering_slots(details['ordering'], 'indice'),
+    'sorting': lambda details: _category_slots(details['sorting'], 'imagenes'),
+    'category': lambda details: _category_slots(details['categories'], 'text_items'),
+    'matching': lambda details: _pair_slots(details['pairs']),
+}
+CONTENT_SLOTS = {
+    **_CONTENT_SLOTS,
+    **{f'{content_type}_knowledge_check': slots for content_type, slots in _CONTENT_SLOTS.items() if content_type != 'category'},
+    'categories_knowledge_check': _CONTENT_SLOTS['category'],
+    'word_order_knowledge_check': lambda details: _positioned_slots(details['sentences'], 'words', INDEX),
+    'picture_matching_knowledge_check': lambda details: _pair_slots(details['pairs']),
+    'picture_labeling_knowledge_check': lambda details: _label_slots(details['pairs']),
+}
+
+
+def _compile(build, value):
+    try:
+        return AnswerKey(build(value))
+    except NotGradable:
+        raise
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError, OverflowError) as error:
+        raise NotGradable(f'La clave de respuestas no es válida: {error!r}') from error
+
+
+def compile_content(content_type, content_details):
+    """AnswerKey de un bloque de contenido. Lanza NotGradable si el tipo no se corrige o la clave no es válida."""
+    build = CONTENT_SLOTS.get(content_type)
+    if build is None:
+        raise NotGradable(f'El tipo de contenido {content_type} no tiene respuestas que corregir')
+    return _compile(build, content_details)
+
+
+# Claves de los modelos de tarea: modelo -> (campo con la clave, compilador)
+
+def _multiple_choice_task_slots(question):
+    return _choice_slots(question['questions'] if 'questions' in question else [question])
+
+
+def _item_id(item):
+    if not isinstance(item['id'], int) or isinstance(item['id'], bool):
+        raise TypeError('los id de los ítems deben ser enteros')
+    return item['id']
+
+
+TASK_KEYS = {
+    MultipleChoiceModel: ('question', _multiple_choice_task_slots),
+    TrueOrFalseModel: ('questions', lambda value: _true_false_slots(value['questions'])),
+    OrderingTaskModel: ('items', lambda value: [(INDEX, _item_id(item)) for item in value['items']]),
+    CategoriesTaskModel: ('categories', lambda value: _category_slots(value['categories'], 'items')),
+    FillInTheGapsTaskModel: ('keywords', lambda value: [(TEXT, keyword) for keyword in value]),
+}
+
+# Recurso de la URL -> modelo (mismos nombres que las rutas del router)
+GRADING_TARGETS = {
+    'class-contents': ClassContentModel,
+    'multiplechoice': MultipleChoiceModel,
+    'trueorfalse': TrueOrFalseModel,
+    'orderingtasks': OrderingTaskModel,
+    'categoriestasks': CategoriesTaskModel,
+    'fillinthegaps': FillInTheGapsTaskModel,
+}
+
+
+def load_key(model, pk):
+    """AnswerKey de la actividad, o None si no existe. Lanza NotGradable si no tiene nada que corregir."""
+    if model is ClassContentModel:
+        row = ClassContentModel.objects.filter(pk=pk).values_list('content_type', 'content_details').first()
+        return compile_content(*row) if row is not None else None
+    field, build = TASK_KEYS[model]
+    value = model.objects.filter(pk=pk).values_list(field, flat=True).first()
+    return _compile(build, value) if value is not None else None
@@ -0,0 +1,250 @@
+"""
+Importación masiva de ClassContentModel desde NDJSON.
+
+Cada línea es un objeto con la forma de los ejemplos de dashboard/json_example/ (class_id o
+class_model, content_type, tittle, instructions, content_details, multimedia, ...). Las filas se
+validan en una sola pasada y se insertan con bulk_create en lotes transaccionales; una fila inválida
+se reporta con su número de línea sin abortar el resto del lote.
+
+Las rutas de archivo (FILE_FIELDS y `file_info.path` de multimedia) deben existir ya en el storage.
+Las filas importadas que apuntan a un blob suman sus referencias en la misma transacción del lote,
+como las copias de cloning.py: así el blob no se borra mientras alguna las use.
+"""
+import json
+import logging
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from .content_validators import validate_content_details
+from .models import ClassModel, ClassContentModel
+from .outline import schedule_refresh
+from .search import index_objects
+from .signals import invalidate_class
+from .storage import is_blob, multimedia_paths
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+CONTENT_TYPES = dict(ClassContentModel.CONTENT_TYPES)
+MEDIA_TYPES = dict(ClassContentModel.MEDIA_TYPES)
+
+# Campos de texto que se copian tal cual si vienen en la fila
+TEXT_FIELDS = ['tittle', 'instructions', 'video_transcription', 'audio_transcription', 'embed_video']
+# Campos de archivo: en la importación son rutas ya existentes en el storage
+FILE_FIELDS = ['image', 'video', 'audio', 'pdf']
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.class_ids = set()
+
+    def add_error(self, line, errors):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+        }
+
+
+def validate_multimedia(value):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        return ['El campo multimedia debe ser una lista']
+    errors = []
+    for index, item in enumerate(value):
+        if not isinstance(item, dict):
+            errors.append(f'Elemento {index}: debe ser un objeto JSON')
+        elif item.get('media_type') not in MEDIA_TYPES:
+            errors.append(f"Elemento {index}: tipo de medio no válido: {item.get('media_type')}")
+    return errors
+
+
+def _blob_exists(name):
+    # Solo se comprueban los blobs: son los que cuentan referencias
+    return not isinstance(name, str) or not is_blob(name) or default_storage.exists(name)
+
+
+def _blob_references(rows):
+    """Cuántas filas de `rows` usan cada blob (campos de archivo y multimedia)"""
+    names = []
+    for values in rows:
+        names.extend(values.get(field) for field in FILE_FIELDS)
+        names.extend(multimedia_paths(values.get('multimedia')))
+    return Counter(name for name in names if isinstance(name, str) and is_blob(name))
+
+
+def add_file_references(rows):
+    """Una referencia más en cada blob por cada fila importada que lo usa (una consulta por blob)"""
+    if not hasattr(default_storage, 'add_reference'):
+        return
+    for name, count in _blob_references(rows).items():
+        default_storage.add_reference(name, count=count)
+
+
+def parse_row(data, default_class_id=None):
+    """
+    Normaliza y valida una fila. Devuelve (kwargs para ClassContentModel, errores por campo).
+    La existencia de la clase se comprueba después, por lote.
+    """
+    if not isinstance(data, dict):
+        return None, {'general': ['Cada línea debe ser un objeto JSON']}
+
+    errors = {}
+    class_id = data.get('class_id', data.get('class_model', default_class_id))
+    try:
+        class_id = int(class_id)
+    except (TypeError, ValueError):
+        errors['class_id'] = ['Debe indicar el id numérico de la clase']
+
+    content_type = data.get('content_type')
+    if content_type not in CONTENT_TYPES:
+        errors['content_type'] = [f'Tipo de contenido no válido: {content_type}']
+
+    content_details = data.get('content_details')
+    if 'content_type' not in errors:
+        details_errors = validate_content_details(content_type, content_details)
+        if details_errors:
+            errors['content_details'] = details_errors
+
+    multimedia_errors = validate_multimedia(data.get('multimedia'))
+    if multimedia_errors:
+        errors['multimedia'] = multimedia_errors
+    else:
+        missing = [path for path in multimedia_paths(data.get('multimedia')) if not _blob_exists(path)]
+        if missing:
+            errors['multimedia'] = [f'El archivo no existe en el storage: {path}' for path in missing]
+    for field in FILE_FIELDS:
+        if isinstance(data.get(field), str) and not _blob_exists(data[field]):
+            errors[field] = [f'El archivo no existe en el storage: {data[field]}']
+
+    order = data.get('order')
+    if order is not None and (not isinstance(order, int) or isinstance(order, bool) or order < 0):
+        errors['order'] = ['Debe ser un entero positivo']
+
+    if errors:
+        return None, errors
+
+    values = {
+        'class_id_id': class_id,
+        'content_type': content_type,
+        'content_details': content_details,
+        'multimedia': data.get('multimedia'),
+        'order': order,
+        'stats': bool(data.get('stats', False)),
+    }
+    # Los ejemplos usan tanto 'tittle' como 'title'
+    if 'tittle' not in data and 'title' in data:
+        values['tittle'] = data['title']
+    for field in TEXT_FIELDS + FILE_FIELDS:
+        if data.get(field) is not None:
+            values[field] = data[field]
+    return values, {}
+
+
+class ContentImporter:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, default_class_id=None):
+        self.batch_size = batch_size
+        self.default_class_id = default_class_id
+        self.report = ImportReport()
+        # Siguiente order libre por clase, para las filas que no lo indican
+        self._next_order = {}
+
+    def run(self, lines):
+        batch = []
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                try:
+                    line = line.decode('utf-8')
+                except UnicodeDecodeError as e:
+                    self.report.add_error(line_number, {'general': [f'La línea no está en UTF-8: {e}']})
+                    continue
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.report.add_error(line_number, {'general': [f'JSON no válido: {e}']})
+                continue
+
+            values, errors = parse_row(data, self.default_class_id)
+            if errors:
+                self.report.add_error(line_number, errors)
+                continue
+            batch.append((line_number, values))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+
+        # bulk_create no dispara señales: se invalida la caché y el índice de las clases afectadas
+        for class_id in self.report.class_ids:
+            invalidate_class(class_id)
+        schedule_refresh(class_ids=self.report.class_ids)
+        return self.report
+
+    def _assign_orders(self, rows):
+        missing = {values['class_id_id'] for _line, values in rows if values['order'] is None} - set(self._next_order)
+        if missing:
+            current = ClassContentModel.objects.filter(class_id__in=missing).values('class_id').annotate(last=Max('order'))
+            for item in current:
+                self._next_order[item['class_id']] = item['last'] + 1
+            for class_id in missing:
+                self._next_order.setdefault(class_id, 0)
+        for _line, values in rows:
+            if values['order'] is None:
+                class_id = values['class_id_id']
+                values['order'] = self._next_order[class_id]
+                self._next_order[class_id] += 1
+
+    def flush(self, batch):
+        class_ids = {values['class_id_id'] for _line, values in batch}
+        existing = set(ClassModel.objects.filter(pk__in=class_ids).values_list('pk', flat=True))
+
+        rows = []
+        for line_number, values in batch:
+            if values['class_id_id'] not in existing:
+                self.report.add_error(line_number, {'class_id': [f"La clase {values['class_id_id']} no existe"]})
+            else:
+                rows.append((line_number, values))
+        if not rows:
+            return
+
+        self._assign_orders(rows)
+        try:
+            with transaction.atomic():
+                created = ClassContentModel.objects.bulk_create([ClassContentModel(**values) for _line, values in rows])
+                add_file_references([values for _line, values in rows])
+                # bulk_create tampoco pasa por las señales de búsqueda: se indexa el lote completo
+                index_objects('content', ClassContentModel.objects.filter(pk__in=[item.pk for item in created]))
+            self._record_created(rows)
+        except IntegrityError:
+            # Algo falló en la base de datos: se reintenta fila a fila para aislar las que fallan
+            logger.warning('Lote de importación rechazado, reintentando fila a fila')
+            for line_number, values in rows:
+                try:
+                    with transaction.atomic():
+                        ClassContentModel.objects.create(**values)
+                        add_file_references([values])
+                    self._record_created([(line_number, values)])
+                except IntegrityError as e:
+                    self.report.add_error(line_number, {'general': [str(e)]})
+
+    def _record_created(self, rows):
+        self.report.created += len(rows)
+        self.report.class_ids.update(values['class_id_id'] for _line, values in rows)
+
+
+def import_class_contents(lines, batch_size=DEFAULT_BATCH_SIZE, default_class_id=None):
+    """Importa un iterable de líneas NDJSON y devuelve un ImportReport"""
+    return ContentImporter(batch_size=batch_size, default_class_id=default_class_id).run(lines)
@@ -0,0 +1,25 @@
+"""
+Funciones que ejecutan los procesos del pool de `manage.py run_jobs`.
+
+Los procesos se crean con spawn e importan este módulo antes de configurar Django, así que aquí no
+se importan modelos a nivel de módulo.
+"""
+import signal
+
+import django
+from django.db import connections
+
+
+def init_worker():
+    # Ctrl+C llega a todo el grupo de procesos; el proceso principal decide cuándo parar
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+
+def execute(job_id, worker_id):
+    from .jobs import run_job
+
+    try:
+        return run_job(job_id, worker_id)
+    finally:
+        connections.close_all()
@@ -0,0 +1,184 @@
+"""
+Cola de trabajos en base de datos para el procesamiento de media.
+
+Las rutas de guardado solo insertan un JobModel (dentro de la misma transacción que la fila que lo
+origina) y la petición responde en milisegundos; `manage.py run_jobs` los ejecuta en un pool de
+procesos. Cada trabajo:
+  - Se reclama con un UPDATE condicional (sin SELECT FOR UPDATE, que SQLite no tiene): si dos
+    workers compiten por la misma fila, solo uno la actualiza.
+  - Tiene un plazo de visibilidad (locked_until). Si el worker muere, al vencer el plazo otro worker
+    lo retoma; el intento perdido cuenta para max_attempts.
+  - Se reintenta con espera exponencial (JOB_RETRY_BACKOFF · 2^(intento-1), con jitter y tope en
+    JOB_RETRY_BACKOFF_MAX) hasta agotar max_attempts, y entonces queda en failed con el error.
+
+Los manejadores se registran con @job('nombre') y reciben el payload como argumentos con nombre.
+Con JOB_QUEUE_EAGER = True los trabajos se ejecutan en el mismo proceso al confirmar la
+transacción (pruebas y desarrollo sin worker).
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import JobModel
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class JobNotRegistered(LookupError):
+    pass
+
+
+def job(kind, visibility_timeout=None):
+    """Registra `func` como manejador de los trabajos `kind`"""
+    def decorator(func):
+        HANDLERS[kind] = (func, visibility_timeout)
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, delay=0, max_attempts=None):
+    """
+    Encola un trabajo y lo devuelve. Si ya hay uno pendiente idéntico (mismo tipo y payload) no se
+    duplica: guardar dos veces la misma fila antes de que el worker llegue genera un solo trabajo.
+    """
+    if kind not in HANDLERS:
+        raise JobNotRegistered(kind)
+    payload = payload or {}
+    existing = JobModel.objects.filter(kind=kind, payload=payload, status='pending').first()
+    if existing is not None:
+        return existing
+
+    created = JobModel.objects.create(
+        kind=kind,
+        payload=payload,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if settings.JOB_QUEUE_EAGER:
+        transaction.on_commit(lambda: run_eager(created.pk))
+    return created
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _visibility_timeout(kind):
+    timeout = HANDLERS.get(kind, (None, None))[1]
+    return timeout or settings.JOB_VISIBILITY_TIMEOUT
+
+
+def claim_jobs(worker_id, limit=1):
+    """
+    Reclama hasta `limit` trabajos listos (pendientes cuyo run_after pasó, o en ejecución con el
+    plazo de visibilidad vencido) para `worker_id`. Devuelve la lista de ids reclamados.
+    """
+    now = timezone.now()
+    # Ejecuciones vencidas que ya agotaron sus intentos: no se vuelven a reclamar
+    JobModel.objects.filter(
+        status='running', locked_until__lt=now, attempts__gte=F('max_attempts'),
+    ).update(status='failed', locked_until=None, last_error='Se agotó el plazo de visibilidad', updated_at=now)
+
+    ready = Q(status='pending', run_after__lte=now) | Q(status='running', locked_until__lt=now)
+    candidates = JobModel.objects.filter(ready).order_by('run_after', 'id').values_list(
+        'pk', 'kind', 'status', 'locked_until',
+    )[:limit * 2]
+
+    claimed = []
+    for pk, kind, status, locked_until in candidates:
+        won = JobModel.objects.filter(pk=pk, status=status, locked_until=locked_until).update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=_visibility_timeout(kind)),
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        if won:
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def retry_delay(attempts):
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** max(attempts - 1, 0), settings.JOB_RETRY_BACKOFF_MAX)
+    # Jitter: los trabajos que fallaron juntos no se reintentan todos a la vez
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_job(job_id, worker_id):
+    """
+    Ejecuta un trabajo reclamado por `worker_id` y registra el resultado. Si otro worker lo retomó
+    mientras tanto (plazo vencido), el resultado de este se descarta. Devuelve el estado final.
+    """
+    current = JobModel.objects.filter(pk=job_id, status='running', locked_by=worker_id).first()
+    if current is None:
+        return None
+    owned = JobModel.objects.filter(pk=job_id, status='running', locked_by=worker_id)
+
+    try:
+        handler = HANDLERS[current.kind][0]
+    except KeyError:
+        owned.update(status='failed', locked_until=None, last_error=f'Tipo de trabajo no registrado: {current.kind}', updated_at=timezone.now())
+        return 'failed'
+
+    try:
+        handler(**current.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if current.attempts >= current.max_attempts:
+            logger.error('Trabajo %s #%s fallido tras %s intentos', current.kind, job_id, current.attempts)
+            owned.update(status='failed', locked_until=None, last_error=error, updated_at=now)
+            return 'failed'
+        logger.warning('Trabajo %s #%s falló (intento %s), se reintentará', current.kind, job_id, current.attempts)
+        owned.update(
+            status='pending', locked_until=None, locked_by=None, last_error=error, updated_at=now,
+            run_after=now + timedelta(seconds=retry_delay(current.attempts)),
+        )
+        return 'pending'
+
+    owned.update(status='done', locked_until=None, updated_at=timezone.now())
+    return 'done'
+
+
+def run_eager(job_id):
+    """Reclama y ejecuta un trabajo concreto en este proceso (JOB_QUEUE_EAGER)"""
+    worker_id = f'eager:{worker_name()}'
+    now = timezone.now()
+    claimed = JobModel.objects.filter(pk=job_id, status='pending').update(
+        status='running', locked_by=worker_id, attempts=F('attempts') + 1, updated_at=now,
+        locked_until=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT),
+    )
+    if claimed:
+        return run_job(job_id, worker_id)
+    return None
+
+
+def run_pending(worker_id=None, limit=None):
+    """Ejecuta en este proceso los trabajos listos, uno a uno, hasta vaciar la cola. Devuelve cuántos."""
+    worker_id = worker_id or worker_name()
+    count = 0
+    while limit is None or count < limit:
+        claimed = claim_jobs(worker_id, 1)
+        if not claimed:
+            break
+        run_job(claimed[0], worker_id)
+        count += 1
+    return count
+
+
+def purge_jobs(max_age):
+    """Elimina los trabajos terminados (done) más antiguos que `max_age`. Devuelve cuántos."""
+    deleted, _ = JobModel.objects.filter(status='done', updated_at__lt=timezone.now() - max_age).delete()
+    return deleted
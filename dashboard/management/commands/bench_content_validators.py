@@ -0,0 +1,23 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from dashboard.content_samples import SAMPLE_CONTENT_DETAILS
+from dashboard.content_validators import validate_content_details
+
+
+class Command(BaseCommand):
+    help = 'Mide el coste de validar content_details por tipo de contenido (µs por bloque)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000, help='Validaciones por tipo')
+
+    def handle(self, *args, **options):
+        number = options['number']
+        total = 0.0
+        for content_type, details in SAMPLE_CONTENT_DETAILS.items():
+            elapsed = min(timeit.repeat(lambda: validate_content_details(content_type, details), number=number, repeat=3))
+            per_block = elapsed / number * 1e6
+            total += per_block
+            self.stdout.write(f'{content_type:<36} {per_block:8.2f} µs')
+        self.stdout.write(self.style.SUCCESS(f'Promedio: {total / len(SAMPLE_CONTENT_DETAILS):.2f} µs por bloque'))
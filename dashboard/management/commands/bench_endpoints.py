@@ -0,0 +1,80 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from dashboard.benchmark import benchmark_database, compare_results, run_benchmark
+from dashboard.synthetic import generate_courses, write_media_files
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera cursos sintéticos en una base de datos de prueba temporal y mide latencia, '
+        'consultas SQL y memoria de cada endpoint; escribe el resultado en JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=1)
+        parser.add_argument('--classes', type=int, default=5, help='Clases por curso')
+        parser.add_argument('--contents', type=int, default=40, help='Contenidos por clase')
+        parser.add_argument('--media', type=int, default=10, help='Objetos de media por clase')
+        parser.add_argument('--tasks', type=int, default=3, help='Tareas de cada tipo por clase')
+        parser.add_argument('--iterations', type=int, default=20, help='Peticiones medidas por endpoint y modo')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Nombre de URL a medir (repetible)')
+        parser.add_argument('--output', '-o', help="Archivo JSON de resultados ('-' para stdout)")
+        parser.add_argument('--compare', help='Resultado JSON anterior contra el que buscar regresiones')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Aumento de p95 tolerado (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        sizes = {key: options[key] for key in ('courses', 'classes', 'contents', 'media', 'tasks')}
+        if sizes['courses'] < 1 or sizes['classes'] < 1:
+            raise CommandError('Se necesita al menos un curso con una clase')
+
+        # Nunca se escribe en la base de datos ni en el MEDIA_ROOT reales: ambos son temporales
+        setup_test_environment()
+        try:
+            with benchmark_database(), tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                courses = generate_courses(**sizes, media_files=write_media_files())
+                results = run_benchmark(
+                    courses[0], iterations=options['iterations'], warmup=options['warmup'],
+                    only=options['endpoints'], sizes=sizes,
+                )
+        finally:
+            teardown_test_environment()
+
+        # Con -o - la tabla y los mensajes van a stderr para que stdout sea JSON válido
+        out = self.stderr if options['output'] == '-' else self.stdout
+        self.print_table(results, out)
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump(results, target, indent=2)
+            out.write(f"Resultados guardados en {options['output']}")
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as source:
+                baseline = json.load(source)
+            if baseline['meta'].get('database', results['meta']['database']) != results['meta']['database']:
+                raise CommandError(
+                    f"{options['compare']} se midió con {baseline['meta']['database']}, no con {results['meta']['database']}"
+                )
+            regressions = compare_results(baseline, results, threshold=options['threshold'])
+            for regression in regressions:
+                self.stderr.write(f"{regression['name']} [{regression['mode']}]: {', '.join(regression['reasons'])}")
+            if regressions:
+                raise CommandError(f'{len(regressions)} regresiones frente a {options["compare"]}')
+            out.write(self.style.SUCCESS('Sin regresiones'))
+
+    def print_table(self, results, out):
+        out.write(f"{'endpoint':<72} {'modo':<5} {'st':>3} {'sql':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'pico KB':>9}")
+        for item in results['endpoints']:
+            latency = item['latency_ms']
+            out.write(
+                f"{item['name'][:72]:<72} {item['mode']:<5} {item['status']:>3} {item['queries']:>4} "
+                f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} {item['peak_memory_kb']:>9.1f}"
+            )
@@ -0,0 +1,96 @@
+import json
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.content_samples import SAMPLE_CONTENT_DETAILS
+from dashboard.grading import CHOICE, CONTENT_SLOTS, TEXT, TRUE_FALSE, compile_content
+
+
+def scaled(content_type, details, slots):
+    """content_details con la lista principal repetida hasta tener al menos `slots` huecos"""
+    per_copy = len(compile_content(content_type, details))
+    copies = max(1, math.ceil(slots / per_copy))
+    return {key: value * copies if isinstance(value, list) else value for key, value in details.items()}
+
+
+def wrong_answer(kind, answer):
+    """Una respuesta incorrecta a partir de la correcta"""
+    if kind == CHOICE:
+        return answer + 1 if isinstance(answer, int) else []
+    if kind == TRUE_FALSE:
+        return answer % 3 + 1
+    if kind == TEXT:
+        return f'{answer}x'
+    return answer + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la corrección de entregas por tipo de actividad: entregas por segundo corrigiendo una a una '
+        '(AnswerKey.score) y en lote con NumPy (AnswerKey.score_batch)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=5000, help='Entregas por lote')
+        parser.add_argument('--slots', type=int, default=20, help='Huecos aproximados por actividad')
+        parser.add_argument('--accuracy', type=float, default=0.7, help='Proporción de respuestas correctas')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medición (se toma la mejor)')
+        parser.add_argument('--output', '-o', help="Archivo JSON de resultados ('-' para stdout)")
+
+    def handle(self, *args, **options):
+        if options['submissions'] < 1 or options['slots'] < 1:
+            raise CommandError('Se necesita al menos una entrega y un hueco')
+        out = self.stderr if options['output'] == '-' else self.stdout
+        rng = random.Random(0)
+        results = []
+        out.write(f"{'tipo':<36} {'huecos':>7} {'una a una/s':>13} {'en lote/s':>13} {'x':>6}")
+        for content_type, details in SAMPLE_CONTENT_DETAILS.items():
+            if content_type not in CONTENT_SLOTS:
+                continue
+            started = time.perf_counter()
+            key = compile_content(content_type, scaled(content_type, details, options['slots']))
+            compile_us = (time.perf_counter() - started) * 1e6
+            submissions = self.submissions(key, options['submissions'], options['accuracy'], rng)
+
+            single = self.best(lambda: [key.score(submission) for submission in submissions], options['repeat'])
+            batch = self.best(lambda: key.score_batch(submissions), options['repeat'])
+            item = {
+                'content_type': content_type,
+                'slots': len(key),
+                'compile_us': round(compile_us, 1),
+                'single_per_s': round(len(submissions) / single),
+                'batch_per_s': round(len(submissions) / batch),
+                'speedup': round(single / batch, 1),
+            }
+            results.append(item)
+            out.write(
+                f"{content_type:<36} {item['slots']:>7} {item['single_per_s']:>13,} {item['batch_per_s']:>13,} {item['speedup']:>6.1f}"
+            )
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump(results, target, indent=2)
+            out.write(f"Resultados guardados en {options['output']}")
+
+    def submissions(self, key, count, accuracy, rng):
+        correct = key.correct_answers()
+        return [
+            [
+                answer if rng.random() < accuracy else wrong_answer(kind, answer)
+                for kind, answer in zip(key.types, correct)
+            ]
+            for _ in range(count)
+        ]
+
+    def best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
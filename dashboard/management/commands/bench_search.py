@@ -0,0 +1,122 @@
+import itertools
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from dashboard.benchmark import benchmark_database, percentile
+from dashboard.models import ClassContentModel, ClassModel, CourseModel
+from dashboard.search import fts5_available, index_objects, search
+
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ru', 'sa', 'te', 'vi', 'zo', 'cor', 'tan', 'mer', 'sil']
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la búsqueda de texto completo sobre un corpus sintético de bloques de contenido en una base '
+        'de datos temporal: tiempo de indexado y latencia de consultas frecuentes, raras, por prefijo y por frase'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blocks', type=int, default=200000, help='Bloques de contenido a indexar')
+        parser.add_argument('--classes', type=int, default=500)
+        parser.add_argument('--words', type=int, default=60, help='Palabras por bloque')
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=50, help='Consultas medidas por tipo')
+        parser.add_argument('--output', '-o', help="Archivo JSON de resultados ('-' para stdout)")
+
+    def handle(self, *args, **options):
+        if options['blocks'] < 1 or options['classes'] < 1:
+            raise CommandError('Se necesita al menos un bloque y una clase')
+        out = self.stderr if options['output'] == '-' else self.stdout
+        rng = random.Random(0)
+        words = vocabulary(options['vocabulary'], rng)
+        # Frecuencias de Zipf, como en un texto real: pocas palabras muy comunes y muchas raras
+        weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+        with benchmark_database():
+            out.write(f"Generando {options['blocks']} bloques...")
+            started = time.perf_counter()
+            self.seed(options, words, weights, rng)
+            generated = time.perf_counter() - started
+            out.write(f'Generados en {generated:.1f} s; indexando...')
+            started = time.perf_counter()
+            with transaction.atomic():
+                documents = index_objects('content', ClassContentModel.objects.all(), batch_size=5000)
+            indexed = time.perf_counter() - started
+            out.write(f'{documents} documentos indexados en {indexed:.1f} s')
+
+            course_id = CourseModel.objects.values_list('pk', flat=True).first()
+            queries = {
+                'frecuente': [words[rng.randrange(5)] for _ in range(options['iterations'])],
+                'rara': [words[rng.randrange(len(words) // 2, len(words))] for _ in range(options['iterations'])],
+                'dos palabras': [f'{rng.choice(words[:50])} {rng.choice(words[:500])}' for _ in range(options['iterations'])],
+                'prefijo': [rng.choice(words[:200])[:3] for _ in range(options['iterations'])],
+                'frase': [f'"{rng.choice(words[:20])} {rng.choice(words[:20])}"' for _ in range(options['iterations'])],
+            }
+            results = {
+                'database': connection.vendor,
+                'engine': self.engine(),
+                'blocks': documents,
+                'index_s': round(indexed, 2),
+                'queries': [self.measure(name, items) for name, items in queries.items()]
+                + [self.measure('frecuente en un curso', queries['frecuente'], course_id=course_id)],
+            }
+
+        out.write(f"{'consulta':<22} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'resultados':>11}")
+        for item in results['queries']:
+            out.write(f"{item['name']:<22} {item['p50']:>9.2f} {item['p95']:>9.2f} {item['max']:>9.2f} {item['hits']:>11.1f}")
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump(results, target, indent=2)
+            out.write(f"Resultados guardados en {options['output']}")
+
+    def seed(self, options, words, weights, rng):
+        courses = CourseModel.objects.bulk_create([
+            CourseModel(course_name=f'Curso {index}') for index in range(max(1, options['classes'] // 20))
+        ])
+        classes = ClassModel.objects.bulk_create([
+            ClassModel(class_name=f'Clase {index}', course=courses[index % len(courses)]) for index in range(options['classes'])
+        ])
+        batch = []
+        for index in range(options['blocks']):
+            text = ' '.join(rng.choices(words, cum_weights=weights, k=options['words']))
+            batch.append(ClassContentModel(
+                class_id=classes[index % len(classes)], content_type='text_block', order=index,
+                tittle=' '.join(rng.choices(words, cum_weights=weights, k=3)), content_details={'text': f'<p>{text}</p>'},
+            ))
+            if len(batch) == 5000:
+                ClassContentModel.objects.bulk_create(batch)
+                batch = []
+        ClassContentModel.objects.bulk_create(batch)
+
+    def engine(self):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return 'fts5' if connection.vendor == 'sqlite' and fts5_available() else 'like'
+
+    def measure(self, name, queries, **filters):
+        timings, hits = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            hits += len(search(query, limit=20, **filters))
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'name': name,
+            'p50': round(percentile(timings, 50), 2),
+            'p95': round(percentile(timings, 95), 2),
+            'max': round(timings[-1], 2),
+            'hits': hits / len(queries),
+        }
@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import reverse
+
+from dashboard.benchmark import benchmark_database
+from dashboard.server_benchmark import MODES, bench_mode, mode_available
+from dashboard.synthetic import generate_courses
+from pmback.database import database_url
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el servidor WSGI (workers síncronos) con el ASGI (uvicorn + vistas async) bajo un flujo '
+        'de clientes lentos, sobre una base de datos sintética temporal del motor configurado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help='Peticiones en total')
+        parser.add_argument('--arrival-rate', type=float, default=25, help='Clientes nuevos por segundo (0 = todos a la vez)')
+        parser.add_argument('--slow-fraction', type=float, default=0.2, help='Fracción de clientes lentos (0-1)')
+        parser.add_argument('--send-delay', type=float, default=2.0, help='Segundos que un cliente lento tarda en enviar la petición')
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn en cada modo')
+        parser.add_argument('--mode', action='append', dest='modes', choices=MODES, help='Modo a medir (repetible; por defecto ambos)')
+        parser.add_argument('--courses', type=int, default=3)
+        parser.add_argument('--classes', type=int, default=5, help='Clases por curso')
+        parser.add_argument('--contents', type=int, default=40, help='Contenidos por clase')
+        parser.add_argument('--output', '-o', help="Archivo JSON de resultados ('-' para stdout)")
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['workers'] < 1:
+            raise CommandError('Se necesita al menos un cliente y un worker')
+        if not 0 <= options['slow_fraction'] <= 1:
+            raise CommandError('--slow-fraction debe estar entre 0 y 1')
+        modes = options['modes'] or list(MODES)
+        out = self.stderr if options['output'] == '-' else self.stdout
+
+        # Base de datos temporal compartida por los servidores; la real nunca se toca
+        with benchmark_database() as database:
+            paths = self.seed(options)
+            # Los servidores abren la base de datos de prueba con su propia conexión
+            connections.close_all()
+            env = {'DATABASE_URL': database_url(database)}
+            results = {'database': connection.vendor, 'paths': paths, 'modes': []}
+            for mode in modes:
+                if not mode_available(mode):
+                    out.write(self.style.WARNING(f'{mode}: omitido, falta uvicorn-worker (pip install -r requirements.txt)'))
+                    continue
+                out.write(f"{mode}: {options['clients']} clientes, {options['workers']} workers...")
+                results['modes'].append(bench_mode(
+                    mode, paths, options['clients'], options['workers'], send_delay=options['send_delay'],
+                    slow_fraction=options['slow_fraction'], arrival_rate=options['arrival_rate'] or None, env=env,
+                ))
+
+        self.print_table(results['modes'], out)
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump(results, target, indent=2)
+            out.write(f"Resultados guardados en {options['output']}")
+
+    def seed(self, options):
+        """Genera los cursos y devuelve las rutas a medir"""
+        courses = generate_courses(courses=options['courses'], classes=options['classes'], contents=options['contents'], media=5, tasks=1)
+        class_id = courses[0].classes.order_by('id').values_list('id', flat=True).first()
+        return [
+            reverse('courses-list'),
+            f"{reverse('class-contents-list')}?class_id={class_id}",
+            reverse('class-bundle', kwargs={'class_id': class_id}),
+        ]
+
+    def print_table(self, results, out):
+        out.write(
+            f"{'modo':<5} {'workers':>7} {'clientes':>8} {'ok':>5} {'err':>4} {'total s':>8} {'req/s':>8} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'rápidos p50':>12} {'rápidos p95':>12}"
+        )
+        for item in results:
+            latency = item['latency_ms']
+            fast = item['fast_latency_ms'] or {'p50': 0.0, 'p95': 0.0}
+            out.write(
+                f"{item['mode']:<5} {item['workers']:>7} {item['clients']:>8} {item['ok']:>5} {item['errors']:>4} "
+                f"{item['elapsed_s']:>8.2f} {item['requests_per_s']:>8.2f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+                f"{latency['max']:>9.2f} {fast['p50']:>12.2f} {fast['p95']:>12.2f}"
+            )
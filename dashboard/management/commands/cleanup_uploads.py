@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from dashboard.uploads import delete_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas por partes abandonadas y sus archivos parciales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None, help='Antigüedad mínima (por defecto CHUNKED_UPLOAD_EXPIRATION_HOURS)')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['hours']) if options['hours'] is not None else None
+        count = delete_expired_uploads(max_age)
+        self.stdout.write(self.style.SUCCESS(f'{count} subidas eliminadas'))
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.export import DEFAULT_CHUNK_SIZE, iter_course_ndjson, iter_course_zip
+from dashboard.models import CourseModel
+
+
+class Command(BaseCommand):
+    help = 'Exporta un curso completo (clases, contenidos, tareas y media) como NDJSON o zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('--output', '-o', default='-', help="Archivo de salida ('-' para stdout)")
+        parser.add_argument('--format', choices=['zip', 'ndjson'], default='zip', dest='export_format')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        course_id = options['course_id']
+        if not CourseModel.objects.filter(pk=course_id).exists():
+            raise CommandError(f'El curso {course_id} no existe')
+
+        if options['export_format'] == 'zip':
+            chunks = iter_course_zip(course_id, chunk_size=options['chunk_size'])
+        else:
+            chunks = iter_course_ndjson(course_id, chunk_size=options['chunk_size'])
+
+        if options['output'] == '-':
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
+            return
+
+        total = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                total += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Curso {course_id} exportado en {options['output']} ({total} bytes)"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.derivatives import IMAGE_FIELDS, generate_derivatives, variants_field
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas y WebP de las portadas e imágenes que aún no los tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerar también las que ya tienen derivados')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_names in IMAGE_FIELDS.items():
+            for field_name in field_names:
+                queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                if not options['force']:
+                    queryset = queryset.filter(**{f'{variants_field(field_name)}__isnull': True})
+                for pk in queryset.values_list('pk', flat=True).iterator():
+                    if generate_derivatives(model, pk, field_name):
+                        total += 1
+        self.stdout.write(self.style.SUCCESS(f'{total} imágenes procesadas'))
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from dashboard.importer import DEFAULT_BATCH_SIZE, import_class_contents
+
+
+class Command(BaseCommand):
+    help = 'Importa contenidos de clase desde un archivo NDJSON (una fila por línea) con inserciones en lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo NDJSON ('-' para stdin)")
+        parser.add_argument('--class-id', type=int, default=None, help='Clase para las filas que no la indican')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            report = import_class_contents(sys.stdin, batch_size=options['batch_size'], default_class_id=options['class_id'])
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                report = import_class_contents(source, batch_size=options['batch_size'], default_class_id=options['class_id'])
+
+        for error in report.errors:
+            self.stderr.write(f"Línea {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(f'{report.created} contenidos importados, {len(report.errors)} con errores'))
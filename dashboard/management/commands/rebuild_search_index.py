@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo a partir del contenido de las clases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que 0')
+        counts = rebuild_index(batch_size=options['batch_size'])
+        for kind, count in counts.items():
+            self.stdout.write(f'{kind}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'{sum(counts.values())} documentos indexados'))
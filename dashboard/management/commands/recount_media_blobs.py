@@ -0,0 +1,12 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las referencias de los blobs de media y elimina los que ya no usa ninguna fila'
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'recount_references'):
+            raise CommandError('El storage por defecto no es ContentAddressedStorage')
+        updated, deleted = default_storage.recount_references()
+        self.stdout.write(self.style.SUCCESS(f'{updated} blobs actualizados, {deleted} eliminados'))
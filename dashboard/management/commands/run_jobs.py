@@ -0,0 +1,83 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard.job_worker import execute, init_worker
+from dashboard.jobs import claim_jobs, purge_jobs, run_pending, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de trabajos en segundo plano (derivados, análisis y transcripción de media, calificaciones de Moodle y limpieza de archivos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Procesos del pool (por defecto JOB_WORKERS; 0 = en este proceso)')
+        parser.add_argument('--once', action='store_true', help='Terminar cuando no queden trabajos listos')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--purge-days', type=int, default=7, help='Antigüedad de los trabajos terminados que se eliminan al arrancar')
+
+    def handle(self, *args, **options):
+        workers = settings.JOB_WORKERS if options['workers'] is None else options['workers']
+        worker_id = worker_name()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        purged = purge_jobs(timedelta(days=options['purge_days']))
+        if purged:
+            self.stdout.write(f'{purged} trabajos terminados eliminados')
+
+        if workers <= 0:
+            processed = self.run_inline(worker_id, options)
+        else:
+            processed = self.run_pool(worker_id, workers, options)
+        self.stdout.write(self.style.SUCCESS(f'{processed} trabajos procesados'))
+
+    def stop(self, signum, frame):
+        # Se terminan los trabajos en curso; los que no lleguen a terminar los retoma otro worker
+        self.stopping = True
+
+    def run_inline(self, worker_id, options):
+        processed = 0
+        while not self.stopping:
+            count = run_pending(worker_id, limit=1)
+            processed += count
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        return processed
+
+    def run_pool(self, worker_id, workers, options):
+        processed = 0
+        in_flight = set()
+        # Procesos nuevos (spawn): cada uno abre su propia conexión, nada se hereda del principal
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+            while not self.stopping or in_flight:
+                free = workers - len(in_flight)
+                claimed = claim_jobs(worker_id, free) if free and not self.stopping else []
+                for job_id in claimed:
+                    in_flight.add(pool.submit(execute, job_id, worker_id))
+
+                if not in_flight:
+                    if options['once'] or self.stopping:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                # Con el pool lleno se espera a que termine alguno; si no, se vuelve a mirar la cola
+                timeout = None if len(in_flight) >= workers else options['poll_interval']
+                done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    processed += 1
+                    if future.exception() is not None:
+                        self.stderr.write(f'Error en el worker: {future.exception()}')
+        return processed
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from dashboard.file_cleanup import delete_orphan_files, find_orphan_files
+
+
+def megabytes(size):
+    return size / 1024 ** 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Concilia MEDIA_ROOT con la base de datos: archivos que ninguna fila usa, archivos parciales de '
+        'subidas abandonadas y rutas referenciadas que no existen'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Borrar los archivos huérfanos y parciales encontrados')
+        parser.add_argument('--min-age-hours', type=float, default=24, help='Ignorar archivos modificados hace menos de estas horas')
+
+    def handle(self, *args, **options):
+        report = find_orphan_files(timedelta(hours=options['min_age_hours']))
+        verbose = options['verbosity'] > 1
+        for label, key in (('huérfanos', 'orphans'), ('parciales', 'partials')):
+            items = report[key]
+            self.stdout.write(f'{len(items)} archivos {label} ({megabytes(sum(size for _path, size in items)):.1f} MB)')
+            if verbose:
+                for path, size in items:
+                    self.stdout.write(f'  {path} ({size} bytes)')
+        if report['missing']:
+            self.stdout.write(self.style.WARNING(f"{len(report['missing'])} rutas referenciadas no existen"))
+            if verbose:
+                for name in report['missing']:
+                    self.stdout.write(f'  {name}')
+
+        if options['delete']:
+            count, freed = delete_orphan_files(report)
+            self.stdout.write(self.style.SUCCESS(f'{count} archivos borrados ({megabytes(freed):.1f} MB liberados)'))
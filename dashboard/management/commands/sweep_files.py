@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.file_cleanup import sweep_files
+
+
+class Command(BaseCommand):
+    help = 'Borra del storage los archivos de filas borradas anotados para limpieza (sin esperar al worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Rutas por lote (por defecto FILE_CLEANUP_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        deleted, failed = sweep_files(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} archivos borrados'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} archivos no se pudieron borrar; se reintentarán'))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.moodle_sync import get_client, pending_classes, pending_courses, run_sync
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía a Moodle los cursos y clases nuevos o modificados desde la última sincronización. '
+        'Se puede programar (cron) y, si se interrumpe, la siguiente ejecución continúa donde quedó.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids', help='Limitar a este curso (se puede repetir)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Cursos por llamada (por defecto MOODLE_SYNC_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar cuántos registros están pendientes sin enviar nada')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            courses = pending_courses(options['course_ids']).count()
+            classes = pending_classes(options['course_ids']).count()
+            self.stdout.write(f'Pendientes: {courses} cursos, {classes} clases (más las de los cursos aún no creados)')
+            return
+
+        if not settings.MOODLE_BASE_URL or not settings.MOODLE_TOKEN:
+            raise CommandError('Configure MOODLE_BASE_URL y MOODLE_TOKEN')
+
+        with get_client() as moodle:
+            stats = run_sync(moodle, options['batch_size'], options['course_ids'])
+        self.stdout.write(
+            f"Cursos: {stats['courses_created']} creados, {stats['courses_updated']} actualizados. "
+            f"Clases: {stats['classes_created']} creadas, {stats['classes_updated']} actualizadas."
+        )
+        if stats['errors']:
+            self.stderr.write(self.style.WARNING(f"{stats['errors']} registros con error (ver last_error); se reintentarán en la próxima ejecución"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Sincronización completa'))
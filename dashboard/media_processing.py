@@ -0,0 +1,153 @@
+"""
+Procesamiento en segundo plano de los archivos de video, audio y adjuntos (ver jobs.py).
+
+Al guardar un archivo en uno de los campos de MEDIA_FIELDS se encolan:
+  - 'probe_media': tamaño, tipo y duración (con ffprobe si está instalado; WAV con la librería
+    estándar). El resultado se guarda en media_info[<campo>] junto con el nombre del archivo analizado.
+  - 'transcribe_media': solo si MEDIA_TRANSCRIPTION_BACKEND está configurado y el campo de texto de
+    TRANSCRIPTION_FIELDS está vacío. El texto nunca reemplaza una transcripción escrita a mano.
+
+Los resultados se escriben con update() condicionado a que el archivo no haya cambiado entretanto.
+"""
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import subprocess
+import wave
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .jobs import enqueue, job
+from .models import (
+    ClassContentModel, MultimediaBlockVideoModel, MultimediaBlockAudioModel, MultimediaBlockAttachmentModel,
+)
+
+logger = logging.getLogger(__name__)
+
+# Modelo -> campos de archivo que se analizan (el resultado va a media_info)
+MEDIA_FIELDS = {
+    ClassContentModel: ['video', 'audio', 'pdf'],
+    MultimediaBlockVideoModel: ['video'],
+    MultimediaBlockAudioModel: ['audio'],
+    MultimediaBlockAttachmentModel: ['file_attachment'],
+}
+
+# Modelo -> {campo de archivo: campo de texto con su transcripción}
+TRANSCRIPTION_FIELDS = {
+    ClassContentModel: {'video': 'video_transcription', 'audio': 'audio_transcription'},
+    MultimediaBlockVideoModel: {'video': 'script'},
+    MultimediaBlockAudioModel: {'audio': 'script'},
+}
+
+
+def schedule_media_jobs(instance, field_name):
+    """Encola el análisis y, si corresponde, la transcripción de instance.<field_name>"""
+    payload = {
+        'model': instance._meta.label,
+        'pk': instance.pk,
+        'field': field_name,
+        'source': getattr(instance, field_name).name,
+    }
+    enqueue('probe_media', payload)
+    text_field = TRANSCRIPTION_FIELDS.get(type(instance), {}).get(field_name)
+    if text_field and settings.MEDIA_TRANSCRIPTION_BACKEND and not getattr(instance, text_field):
+        enqueue('transcribe_media', payload)
+
+
+def probe_file(storage, name):
+    """Tamaño, tipo MIME y duración en segundos (None si no se puede obtener) de un archivo del storage"""
+    info = {
+        'source': name,
+        'size': storage.size(name),
+        'content_type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        'duration': None,
+    }
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Storage remoto: sin ruta local no se puede medir la duración
+        return info
+    info['duration'] = probe_duration(path)
+    return info
+
+
+def probe_duration(path):
+    if shutil.which('ffprobe'):
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+            capture_output=True, timeout=settings.MEDIA_PROBE_TIMEOUT, check=False,
+        )
+        try:
+            return round(float(json.loads(result.stdout)['format']['duration']), 3)
+        except (ValueError, KeyError, TypeError):
+            return None
+    if path.lower().endswith('.wav'):
+        try:
+            with wave.open(path, 'rb') as audio:
+                return round(audio.getnframes() / audio.getframerate(), 3)
+        except (wave.Error, EOFError, ZeroDivisionError):
+            return None
+    return None
+
+
+def _current_source(model, pk, field, source):
+    """Devuelve la fila si el campo sigue apuntando a `source`; si no, el trabajo ya no aplica"""
+    return model.objects.filter(pk=pk, **{field: source}).only('pk', field).first()
+
+
+def _touched(model, values):
+    # update() no toca auto_now: se actualiza a mano para que ETag / Last-Modified cambien
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        values['updated_at'] = timezone.now()
+    return values
+
+
+@job('probe_media')
+def probe_media_job(model, pk, field, source):
+    from .signals import invalidate_instance
+
+    model = apps.get_model(model)
+    instance = _current_source(model, pk, field, source)
+    if instance is None:
+        return
+    storage = model._meta.get_field(field).storage
+    # Un archivo que falta no se arregla reintentando
+    if not storage.exists(source):
+        logger.warning('No se puede analizar %s: el archivo no existe', source)
+        return
+    info = probe_file(storage, source)
+
+    # Se relee media_info justo antes de escribir para no pisar el resultado de otro campo
+    media_info = model.objects.filter(pk=pk).values_list('media_info', flat=True).first() or {}
+    media_info[field] = info
+    if model.objects.filter(pk=pk, **{field: source}).update(**_touched(model, {'media_info': media_info})):
+        invalidate_instance(model.objects.get(pk=pk))
+
+
+@job('transcribe_media', visibility_timeout=60 * 60)
+def transcribe_media_job(model, pk, field, source):
+    from .search import index_instance
+    from .signals import invalidate_instance
+
+    model = apps.get_model(model)
+    text_field = TRANSCRIPTION_FIELDS[model][field]
+    if not settings.MEDIA_TRANSCRIPTION_BACKEND or _current_source(model, pk, field, source) is None:
+        return
+    storage = model._meta.get_field(field).storage
+    media_type = 'audio' if field == 'audio' else 'video'
+    # Los errores del backend se propagan: el trabajo se reintenta con espera
+    text = import_string(settings.MEDIA_TRANSCRIPTION_BACKEND)(storage.path(source), media_type)
+    if not text:
+        return
+
+    empty = Q(**{f'{text_field}__isnull': True}) | Q(**{text_field: ''})
+    if model.objects.filter(empty, pk=pk, **{field: source}).update(**_touched(model, {text_field: text})):
+        instance = model.objects.get(pk=pk)
+        invalidate_instance(instance)
+        index_instance(instance)
@@ -0,0 +1,180 @@
+"""
+Servicio de los archivos de MEDIA_ROOT.
+
+Sustituye a django.views.static.serve (que lee el archivo completo y no admite Range) con:
+  - Peticiones Range de un solo rango (206 / 416), para que el reproductor pueda saltar dentro de un
+    video o un audio sin volver a descargarlo desde el byte cero.
+  - FileResponse sobre el archivo abierto: con un servidor WSGI que ofrece wsgi.file_wrapper
+    (gunicorn, uWSGI) el cuerpo se envía con sendfile() sin pasar por Python, también en las
+    respuestas 206, cuya longitud se limita con Content-Length.
+  - ETag / Last-Modified y respuestas 304. Los blobs (blobs/...) y sus derivados nunca cambian de
+    contenido, así que se sirven con Cache-Control immutable y un año de max-age.
+  - Modo MEDIA_SERVE_MODE = 'x-accel': la vista solo valida la ruta y delega la entrega en nginx con
+    X-Accel-Redirect hacia MEDIA_ACCEL_REDIRECT_PREFIX (una location `internal` que apunta a
+    MEDIA_ROOT); nginx resuelve Range y sendfile por su cuenta.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import is_blob
+
+# Un año: lo máximo que aceptan los navegadores y los CDN
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Vista de solo lectura de `length` bytes de `file` a partir de `start`. Expone fileno() para que
+    wsgi.file_wrapper pueda usar sendfile() desde la posición actual, limitado por Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Interpreta una cabecera Range de un solo rango y devuelve (inicio, fin) inclusivos.
+    Devuelve None si la cabecera no es válida o pide varios rangos (se responde el archivo completo)
+    y lanza ValueError si el rango no es satisfacible.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    if end is None:
+        end = size - 1
+    return start, min(end, size - 1)
+
+
+def media_etag(path, stat):
+    if is_blob(path):
+        # El nombre del blob ya es el hash de su contenido
+        return f'"{os.path.splitext(os.path.basename(path))[0]}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def cache_control(path):
+    if is_blob(path):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Solo comparación fuerte (RFC 9110 §13.1.5)
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+@require_safe
+def serve_media(request, path):
+    """Sirve MEDIA_ROOT/<path> con soporte de Range, caché HTTP y X-Accel-Redirect"""
+    path = posixpath.normpath(path).lstrip('/')
+    if not path or path == '.' or os.path.basename(path).startswith('.'):
+        # Incluye los temporales .tmp-* que escribe ContentAddressedStorage
+        raise Http404('Archivo no encontrado')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Archivo no encontrado')
+    if not os.path.isfile(fullpath):
+        raise Http404('Archivo no encontrado')
+
+    etag = media_etag(path, stat)
+    last_modified = stat.st_mtime
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        if isinstance(not_modified, HttpResponseNotModified):
+            not_modified['Cache-Control'] = cache_control(path)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    if encoding or not content_type:
+        # Igual que FileResponse: sin Content-Encoding, para que el navegador no descomprima el archivo
+        content_type = 'application/octet-stream'
+
+    if settings.MEDIA_SERVE_MODE == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(path)
+        _set_headers(response, path, etag, last_modified)
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if 'Range' in request.headers and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{size}'
+            _set_headers(response, path, etag, last_modified)
+            return response
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+    _set_headers(response, path, etag, last_modified)
+    return response
+
+
+def _set_headers(response, path, etag, last_modified):
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control(path)
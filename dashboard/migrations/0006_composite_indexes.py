@@ -0,0 +1,65 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_classcontentmodel_embed_video'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoriestaskmodel',
+            index=models.Index(fields=['class_model', 'order'], name='categories_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classcontentmodel',
+            index=models.Index(fields=['class_id', 'order'], name='content_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classmodel',
+            index=models.Index(fields=['course', 'created_at'], name='class_course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursemodel',
+            index=models.Index(fields=['created_at', 'id'], name='course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fillinthegapstaskmodel',
+            index=models.Index(fields=['class_model', 'order'], name='gaps_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multimediablockattachmentmodel',
+            index=models.Index(fields=['class_model', 'order'], name='block_attach_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multimediablockaudiomodel',
+            index=models.Index(fields=['class_model', 'order'], name='block_audio_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multimediablockvideoembedmodel',
+            index=models.Index(fields=['class_model', 'order'], name='block_embed_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multimediablockvideomodel',
+            index=models.Index(fields=['class_model', 'order'], name='block_video_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multimediablockvideomodel',
+            index=models.Index(fields=['order', 'id'], name='block_video_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='multiplechoicemodel',
+            index=models.Index(fields=['class_model', 'order'], name='mc_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderingtaskmodel',
+            index=models.Index(fields=['class_model', 'order'], name='ordering_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trueorfalsemodel',
+            index=models.Index(fields=['class_model', 'order'], name='tf_class_order_idx'),
+        ),
+    ]
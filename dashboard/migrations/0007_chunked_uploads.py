@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:04
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUploadModel',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('field', models.CharField(choices=[('video', 'Video'), ('audio', 'Audio'), ('pdf', 'PDF')], max_length=10)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(help_text='Tamaño total del archivo en bytes')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes recibidos hasta ahora')),
+                ('checksum', models.CharField(blank=True, help_text='SHA-256 esperado (hex)', max_length=64, null=True)),
+                ('status', models.CharField(choices=[('uploading', 'Subiendo'), ('complete', 'Completa')], default='uploading', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to='dashboard.classcontentmodel')),
+            ],
+        ),
+    ]
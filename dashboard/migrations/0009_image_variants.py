@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classcontentmodel',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas y WebP generados, ver derivatives.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='classmodel',
+            name='cover_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas y WebP generados, ver derivatives.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='coursemodel',
+            name='cover_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas y WebP generados, ver derivatives.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='multimediablockattachmentmodel',
+            name='cover_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas y WebP generados, ver derivatives.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='multimediablockvideoembedmodel',
+            name='cover_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas y WebP generados, ver derivatives.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='multimediablockvideomodel',
+            name='cover_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Miniaturas y WebP generados, ver derivatives.py', null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classcontentmodel',
+            name='media_info',
+            field=models.JSONField(blank=True, editable=False, help_text='Duración, tipo y tamaño de los archivos, ver media_processing.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='multimediablockattachmentmodel',
+            name='media_info',
+            field=models.JSONField(blank=True, editable=False, help_text='Duración, tipo y tamaño de los archivos, ver media_processing.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='multimediablockaudiomodel',
+            name='media_info',
+            field=models.JSONField(blank=True, editable=False, help_text='Duración, tipo y tamaño de los archivos, ver media_processing.py', null=True),
+        ),
+        migrations.AddField(
+            model_name='multimediablockvideomodel',
+            name='media_info',
+            field=models.JSONField(blank=True, editable=False, help_text='Duración, tipo y tamaño de los archivos, ver media_processing.py', null=True),
+        ),
+        migrations.CreateModel(
+            name='JobModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='Nombre del manejador registrado en jobs.py', max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En ejecución'), ('done', 'Terminado'), ('failed', 'Fallido')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(help_text='No se ejecuta antes de esta fecha (reintentos con espera)')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Fin del plazo de visibilidad del worker', null=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'), models.Index(fields=['status', 'locked_until'], name='job_status_locked_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodleClassSyncModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section_id', models.PositiveIntegerField(blank=True, help_text='id de la sección en Moodle; vacío hasta confirmar la creación', null=True)),
+                ('synced_updated_at', models.DateTimeField(blank=True, help_text='updated_at de la clase en el último envío correcto', null=True)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('class_model', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='moodle_sync', to='dashboard.classmodel')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MoodleCourseSyncModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('remote_id', models.PositiveIntegerField(blank=True, help_text='id del curso en Moodle; vacío hasta confirmar la creación', null=True)),
+                ('synced_updated_at', models.DateTimeField(blank=True, help_text='updated_at del curso en el último envío correcto', null=True)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='moodle_sync', to='dashboard.coursemodel')),
+            ],
+        ),
+    ]
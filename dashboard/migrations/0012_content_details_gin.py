@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Índice GIN (jsonb_path_ops) para las búsquedas por contenido en content_details
+# (content_details__contains, operador @>). Solo existe en PostgreSQL: en SQLite el JSON se guarda
+# como texto y no hay índice equivalente, así que la migración no hace nada.
+INDEX_NAME = 'content_details_gin_idx'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('dashboard', 'ClassContentModel')._meta.db_table)
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON {table} USING gin (content_details jsonb_path_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_moodle_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:37
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+# Índice de texto completo sobre dashboard_searchdocumentmodel (ver dashboard/search.py):
+#  - SQLite: tabla FTS5 de contenido externo sincronizada por triggers. Además del título y el cuerpo
+#    indexa `scope`, los tokens courseN classN kindX (de la vista dashboard_search_fts_content), para
+#    que los filtros se resuelvan dentro del índice en lugar de con un JOIN fila a fila. Índices de
+#    prefijo de 2 a 5 letras: sin ellos, buscar "con*" une las listas de todos los términos que
+#    empiezan así. Si el SQLite instalado no tiene FTS5 no se crea y la búsqueda usa LIKE.
+#  - PostgreSQL: columna tsvector generada (título con peso A, cuerpo con peso B) e índice GIN.
+# Configuración 'simple' (sin stemming): los cursos mezclan idiomas.
+SCOPE = "'course' || {row}.course_id || ' class' || {row}.class_model_id || ' kind' || replace({row}.kind, '_', '')"
+SQLITE_INDEX = [
+    f"""CREATE VIEW dashboard_search_fts_content AS
+        SELECT id, title, body, {SCOPE.format(row='d')} AS scope FROM dashboard_searchdocumentmodel d""",
+    """CREATE VIRTUAL TABLE dashboard_search_fts USING fts5(
+        title, body, scope, content='dashboard_search_fts_content', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5'
+    )""",
+    f"""CREATE TRIGGER dashboard_search_fts_insert AFTER INSERT ON dashboard_searchdocumentmodel BEGIN
+        INSERT INTO dashboard_search_fts(rowid, title, body, scope) VALUES (new.id, new.title, new.body, {SCOPE.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER dashboard_search_fts_delete AFTER DELETE ON dashboard_searchdocumentmodel BEGIN
+        INSERT INTO dashboard_search_fts(dashboard_search_fts, rowid, title, body, scope)
+        VALUES ('delete', old.id, old.title, old.body, {SCOPE.format(row='old')});
+    END""",
+    f"""CREATE TRIGGER dashboard_search_fts_update
+    AFTER UPDATE OF title, body, kind, course_id, class_model_id ON dashboard_searchdocumentmodel BEGIN
+        INSERT INTO dashboard_search_fts(dashboard_search_fts, rowid, title, body, scope)
+        VALUES ('delete', old.id, old.title, old.body, {SCOPE.format(row='old')});
+        INSERT INTO dashboard_search_fts(rowid, title, body, scope) VALUES (new.id, new.title, new.body, {SCOPE.format(row='new')});
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS dashboard_search_fts_insert',
+    'DROP TRIGGER IF EXISTS dashboard_search_fts_delete',
+    'DROP TRIGGER IF EXISTS dashboard_search_fts_update',
+    'DROP TABLE IF EXISTS dashboard_search_fts',
+    'DROP VIEW IF EXISTS dashboard_search_fts_content',
+]
+POSTGRES_INDEX = [
+    """ALTER TABLE dashboard_searchdocumentmodel ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple'::regconfig, coalesce(body, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX search_document_vector_idx ON dashboard_searchdocumentmodel USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS search_document_vector_idx',
+    'ALTER TABLE dashboard_searchdocumentmodel DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for statement in POSTGRES_INDEX:
+            schema_editor.execute(statement)
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_INDEX[1])
+        except OperationalError:
+            return
+        for statement in SQLITE_INDEX[:1] + SQLITE_INDEX[2:]:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP}.get(vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_content_details_gin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocumentModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='Tipo de objeto, clave de search.SEARCH_SOURCES', max_length=30)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(blank=True, default='', max_length=500)),
+                ('body', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='dashboard.classmodel')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='dashboard.coursemodel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_unique')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
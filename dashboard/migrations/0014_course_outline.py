@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseOutlineModel',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='outline', serialize=False, to='dashboard.coursemodel')),
+                ('outline', models.JSONField()),
+                ('version', models.PositiveIntegerField(default=1, help_text='Aumenta con cada cambio; forma el ETag')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
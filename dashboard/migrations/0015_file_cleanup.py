@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0014_course_outline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileCleanupModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Ruta del archivo en el storage', max_length=500)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Intentos fallidos de borrado')),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
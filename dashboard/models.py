@@ -33,6 +33,7 @@ class MediaModel(models.Model):
 
 class CourseModel(models.Model):
     cover = models.ImageField(upload_to='course_covers/', null=True, blank=True)
+    cover_variants = models.JSONField(null=True, blank=True, editable=False, help_text="Miniaturas y WebP generados, ver derivatives.py")
     course_name = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
     category = models.CharField(max_length=100, null=True, blank=True)
@@ -41,8 +42,14 @@ class CourseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='course_created_idx'),
+        ]
+
 class ClassModel(models.Model):
     cover = models.ImageField(upload_to='course_covers/', null=True, blank=True)
+    cover_variants = models.JSONField(null=True, blank=True, editable=False, help_text="Miniaturas y WebP generados, ver derivatives.py")
     class_name = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
     course = models.ForeignKey(CourseModel, on_delete=models.CASCADE, related_name="classes")
@@ -50,6 +57,12 @@ class ClassModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Clases de un curso en orden de creación (listado paginado por course_id)
+            models.Index(fields=['course', 'created_at'], name='class_course_created_idx'),
+        ]
+
     def __str__(self):
         return self.class_name
 
@@ -76,6 +89,11 @@ class MultipleChoiceModel(models.Model):
     order = models.PositiveIntegerField(default=0)
     stats = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='mc_class_order_idx'),
+        ]
+
     ##True or False Task
 
 """
@@ -101,6 +119,11 @@ class TrueOrFalseModel(models.Model):
     media = models.ManyToManyField(MediaModel, related_name="true_or_false_tasks", blank=True)
     order = models.PositiveIntegerField(default=0, help_text="Orden de aparición de la tarea.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='tf_class_order_idx'),
+        ]
+
 
   
 
@@ -114,6 +137,11 @@ class OrderingTaskModel(models.Model):
     media = models.ManyToManyField(MediaModel, related_name="ordering_tasks", blank=True)
     order = models.PositiveIntegerField(default=0, help_text="Orden de aparición de la tarea.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='ordering_class_order_idx'),
+        ]
+
     ## Categories Task
 """
 def validate_categories(categories):
@@ -137,6 +165,9 @@ class CategoriesTaskModel(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='categories_class_order_idx'),
+        ]
 
     def __str__(self):
         return f"Tarea de Ordenar - {self.instructions[:30]}"
@@ -152,6 +183,11 @@ class FillInTheGapsTaskModel(models.Model):
     order = models.PositiveIntegerField(default=0, help_text="Orden de aparición de la tarea.")
     media = models.ManyToManyField(MediaModel, related_name="fill_in_the_gaps_tasks", blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='gaps_class_order_idx'),
+        ]
+
 
     
 class TextBlockLayoutModel(models.Model):
@@ -188,8 +224,17 @@ class MultimediaBlockVideoModel(models.Model):
     video = models.FileField(upload_to='multimedia_block_videos/', null=True, blank=True, help_text="Archivo de video")
     script = models.TextField(help_text="Transcripción de lo que se dice en el video", null=True, blank=True)
     cover = models.ImageField(upload_to='multimedia_block_videos/', null=True, blank=True)
+    cover_variants = models.JSONField(null=True, blank=True, editable=False, help_text="Miniaturas y WebP generados, ver derivatives.py")
+    media_info = models.JSONField(null=True, blank=True, editable=False, help_text="Duración, tipo y tamaño de los archivos, ver media_processing.py")
     order = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='block_video_class_order_idx'),
+            # Listado global paginado por (order, id)
+            models.Index(fields=['order', 'id'], name='block_video_order_idx'),
+        ]
+
 
 class MultimediaBlockAudioModel(models.Model):
     class_model = models.ForeignKey(ClassModel, on_delete=models.CASCADE, related_name="multimedia_block_audios")
@@ -197,16 +242,28 @@ class MultimediaBlockAudioModel(models.Model):
     instructions = models.TextField(null=True, blank=True)
     audio = models.FileField(upload_to='multimedia_block_audios/', null=True, blank=True, help_text="Archivo de audio")
     script = models.TextField(help_text="Transcripción de lo que se dice en el video", null=True, blank=True)
+    media_info = models.JSONField(null=True, blank=True, editable=False, help_text="Duración, tipo y tamaño de los archivos, ver media_processing.py")
     order = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='block_audio_class_order_idx'),
+        ]
+
 class MultimediaBlockVideoEmbedModel(models.Model):
     class_model = models.ForeignKey(ClassModel, on_delete=models.CASCADE, related_name="multimedia_block_videos_embedded")
     tittle = models.CharField(max_length=200, null=True, blank=True)
     instructions = models.TextField(null=True, blank=True)
     link_video = models.URLField(null=True, blank=True)
     cover = models.ImageField(upload_to='multimedia_block_videos/', null=True, blank=True)
+    cover_variants = models.JSONField(null=True, blank=True, editable=False, help_text="Miniaturas y WebP generados, ver derivatives.py")
     order = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='block_embed_class_order_idx'),
+        ]
+
 class MultimediaBlockAttachmentModel(models.Model):
     class_model = models.ForeignKey(ClassModel, on_delete=models.CASCADE, related_name="multimedia_block_attachments")
     tittle = models.CharField(max_length=200, null=True, blank=True)
@@ -215,8 +272,15 @@ class MultimediaBlockAttachmentModel(models.Model):
     text_attachment = models.TextField(null=True, blank=True)
     file_attachment = models.FileField(upload_to='attachments/', null=True, blank=True, help_text="Archivo adjunto (pdf, txt, etc.)")
     cover = models.ImageField(upload_to='multimedia_block_videos/', null=True, blank=True)
+    cover_variants = models.JSONField(null=True, blank=True, editable=False, help_text="Miniaturas y WebP generados, ver derivatives.py")
+    media_info = models.JSONField(null=True, blank=True, editable=False, help_text="Duración, tipo y tamaño de los archivos, ver media_processing.py")
     order = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_model', 'order'], name='block_attach_class_order_idx'),
+        ]
+
 """
 Course Json:
     {
@@ -406,12 +470,14 @@ class ClassContentModel(models.Model):
     # Campos para multimedia en JSON
     multimedia = models.JSONField(null=True, blank=True)
     image = models.ImageField(upload_to='content_images/', null=True, blank=True)
+    image_variants = models.JSONField(null=True, blank=True, editable=False, help_text="Miniaturas y WebP generados, ver derivatives.py")
     video = models.FileField(upload_to='content_videos/', null=True, blank=True)
     video_transcription = models.TextField(null=True, blank=True)
     embed_video = models.URLField(null=True, blank=True)
     audio = models.FileField(upload_to='content_audios/', null=True, blank=True)
     audio_transcription = models.TextField(null=True, blank=True)
     pdf = models.FileField(upload_to='content_pdfs/', null=True, blank=True)
+    media_info = models.JSONField(null=True, blank=True, editable=False, help_text="Duración, tipo y tamaño de los archivos, ver media_processing.py")
     
     order = models.PositiveIntegerField(default=0)
     stats = models.BooleanField(default=False)
@@ -425,12 +491,9 @@ class ClassContentModel(models.Model):
         if not file:
             return None
 
-        # Generar un nombre de archivo único
+        # El storage nombra el archivo por el hash de su contenido: si ya existe no se vuelve a escribir
         ext = os.path.splitext(file.name)[1]
-        filename = f"content_media/{uuid.uuid4()}{ext}"
-        
-        # Guardar el archivo
-        path = default_storage.save(filename, file)
+        path = default_storage.save(f"content_media/media{ext}", file)
         
         return {
             'name': file.name,
@@ -477,7 +540,162 @@ class ClassContentModel(models.Model):
         ordering = ['order']
         verbose_name = 'Contenido de Clase'
         verbose_name_plural = 'Contenidos de Clase'
+        indexes = [
+            # Los contenidos siempre se leen por clase ordenados por order
+            models.Index(fields=['class_id', 'order'], name='content_class_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_content_type_display()} - {self.title or 'Sin título'}"
 
+
+
+class ChunkedUploadModel(models.Model):
+    """
+    Subida por partes de un archivo grande hacia un campo de archivo de ClassContentModel.
+    El archivo parcial vive en CHUNKED_UPLOAD_DIR/<id>.part hasta que se completa (ver uploads.py).
+    """
+    FIELD_CHOICES = [
+        ('video', 'Video'),
+        ('audio', 'Audio'),
+        ('pdf', 'PDF'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Subiendo'),
+        ('complete', 'Completa'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content = models.ForeignKey(ClassContentModel, on_delete=models.CASCADE, related_name='chunked_uploads')
+    field = models.CharField(max_length=10, choices=FIELD_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Tamaño total del archivo en bytes")
+    offset = models.BigIntegerField(default=0, help_text="Bytes recibidos hasta ahora")
+    checksum = models.CharField(max_length=64, null=True, blank=True, help_text="SHA-256 esperado (hex)")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class MediaBlobModel(models.Model):
+    """Archivo único del almacenamiento direccionado por contenido (ver storage.py)"""
+    name = models.CharField(max_length=255, unique=True, help_text="Ruta del blob en el storage")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class JobModel(models.Model):
+    """
+    Trabajo en segundo plano de la cola en base de datos (ver jobs.py). Un worker lo reclama
+    pasándolo a running con locked_until; si el worker muere, al vencer locked_until otro lo retoma.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+    ]
+
+    kind = models.CharField(max_length=100, help_text="Nombre del manejador registrado en jobs.py")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(help_text="No se ejecuta antes de esta fecha (reintentos con espera)")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Fin del plazo de visibilidad del worker")
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Los workers buscan por estado y fecha: pendientes listos y ejecuciones vencidas
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class MoodleCourseSyncModel(models.Model):
+    """Curso de Moodle que corresponde a un CourseModel (ver moodle_sync.py)"""
+    course = models.OneToOneField(CourseModel, on_delete=models.CASCADE, related_name='moodle_sync')
+    remote_id = models.PositiveIntegerField(null=True, blank=True, help_text="id del curso en Moodle; vacío hasta confirmar la creación")
+    synced_updated_at = models.DateTimeField(null=True, blank=True, help_text="updated_at del curso en el último envío correcto")
+    synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.course_id} -> {self.remote_id}"
+
+
+class MoodleClassSyncModel(models.Model):
+    """Sección del curso de Moodle que corresponde a un ClassModel (ver moodle_sync.py)"""
+    class_model = models.OneToOneField(ClassModel, on_delete=models.CASCADE, related_name='moodle_sync')
+    section_id = models.PositiveIntegerField(null=True, blank=True, help_text="id de la sección en Moodle; vacío hasta confirmar la creación")
+    synced_updated_at = models.DateTimeField(null=True, blank=True, help_text="updated_at de la clase en el último envío correcto")
+    synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.class_model_id} -> {self.section_id}"
+
+
+class SearchDocumentModel(models.Model):
+    """
+    Texto de un bloque de contenido para la búsqueda (ver search.py): una fila por objeto indexado.
+    El índice de texto completo (FTS5 en SQLite, tsvector en PostgreSQL) se mantiene sobre esta tabla.
+    """
+    kind = models.CharField(max_length=30, help_text="Tipo de objeto, clave de search.SEARCH_SOURCES")
+    object_id = models.PositiveBigIntegerField()
+    class_model = models.ForeignKey(ClassModel, on_delete=models.CASCADE, related_name='search_documents')
+    course = models.ForeignKey(CourseModel, on_delete=models.CASCADE, related_name='search_documents')
+    title = models.CharField(max_length=500, blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class CourseOutlineModel(models.Model):
+    """
+    Índice materializado de un curso (ver outline.py): clases y títulos, tipos, orden y media de sus
+    contenidos en un solo JSON, para que la navegación del curso sea una lectura de una fila.
+    """
+    course = models.OneToOneField(CourseModel, on_delete=models.CASCADE, primary_key=True, related_name='outline')
+    outline = models.JSONField()
+    version = models.PositiveIntegerField(default=1, help_text="Aumenta con cada cambio; forma el ETag")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.course_id} v{self.version}"
+
+
+class FileCleanupModel(models.Model):
+    """
+    Ruta de archivo de una fila borrada, pendiente de borrar del storage (ver file_cleanup.py).
+    Una fila por referencia: la misma ruta aparece tantas veces como filas borradas la usaban.
+    """
+    name = models.CharField(max_length=500, help_text="Ruta del archivo en el storage")
+    attempts = models.PositiveIntegerField(default=0, help_text="Intentos fallidos de borrado")
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,324 @@
+"""
+Sincronización incremental de cursos y clases con Moodle.
+
+CourseModel -> curso de Moodle (core_course_*), ClassModel -> sección de ese curso
+(local_wsmanagesections_*). MoodleCourseSyncModel / MoodleClassSyncModel guardan el id remoto y el
+updated_at enviado por última vez, así cada ejecución envía solo lo que cambió desde entonces:
+  - Cursos nuevos: core_course_create_courses por lotes. El registro se crea sin remote_id antes de
+    la llamada; si la ejecución se corta después de que Moodle creara el curso, la siguiente lo
+    recupera por idnumber en lugar de crearlo dos veces.
+  - Cursos modificados: core_course_update_courses por lotes.
+  - Clases: por curso, una llamada crea todas las secciones nuevas y otra actualiza nombre y resumen
+    de las nuevas y las modificadas. Los cursos se procesan en paralelo (MoodleAPI.map). Las
+    secciones se crean en blanco al final del curso y su id se guarda antes de darles nombre: si se
+    pierde la respuesta de la creación, la siguiente ejecución recupera las secciones en blanco del
+    final del curso que no tiene asignadas ninguna clase.
+Cada lote se guarda al terminar, así que volver a ejecutar tras un corte continúa donde quedó. Si
+Moodle rechaza un lote se reintenta elemento a elemento para aislar el registro inválido, cuyo error
+queda en last_error hasta la siguiente ejecución.
+"""
+import threading
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.html import escape
+
+from pmback.apiMoodle import MoodleAPI, MoodleError
+
+from .models import CourseModel, ClassModel, MoodleCourseSyncModel, MoodleClassSyncModel
+
+SUMMARY_FORMAT_HTML = 1
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client():
+    return MoodleAPI(
+        settings.MOODLE_BASE_URL,
+        settings.MOODLE_TOKEN,
+        max_workers=settings.MOODLE_MAX_WORKERS,
+        rate_limit=settings.MOODLE_RATE_LIMIT or None,
+    )
+
+
+def shared_client():
+    """Cliente reutilizado entre peticiones (con su pool de conexiones), uno por URL y token"""
+    key = (settings.MOODLE_BASE_URL, settings.MOODLE_TOKEN)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = get_client()
+        return _clients[key]
+
+
+def course_idnumber(course_id):
+    return f'poly-academy-course-{course_id}'
+
+
+def summary_html(description, bullet_points):
+    parts = []
+    if description:
+        parts.append(f'<p>{escape(description)}</p>')
+    points = [point.get('text') if isinstance(point, dict) else point for point in bullet_points or []]
+    points = [str(point) for point in points if point]
+    if points:
+        parts.append('<ul>' + ''.join(f'<li>{escape(point)}</li>' for point in points) + '</ul>')
+    return ''.join(parts)
+
+
+def course_payload(course, remote_id=None):
+    payload = {
+        'fullname': course.course_name,
+        'shortname': f'{course.course_name[:230]} [PA-{course.pk}]',
+        'summary': summary_html(course.description, course.bullet_points),
+        'summaryformat': SUMMARY_FORMAT_HTML,
+    }
+    if remote_id is None:
+        # La categoría solo se fija al crear: si alguien mueve el curso en Moodle, se respeta
+        payload.update(categoryid=settings.MOODLE_COURSE_CATEGORY_ID, idnumber=course_idnumber(course.pk))
+    else:
+        payload['id'] = remote_id
+    return payload
+
+
+def section_payload(class_instance, section_id):
+    return {
+        'section': section_id,
+        'name': class_instance.class_name,
+        'summary': summary_html(class_instance.description, class_instance.bullet_points),
+        'summaryformat': SUMMARY_FORMAT_HTML,
+    }
+
+
+def _blank_section(section):
+    """
+    Sección tal como la deja create_sections: sin módulos ni resumen. El nombre no sirve para
+    reconocerla, porque core_course_get_contents devuelve el nombre por defecto de las que no tienen.
+    """
+    return section.get('section') != 0 and not section.get('modules') and not section.get('summary')
+
+
+def _recover_sections(sections, interrupted, mapped):
+    """
+    Asigna a las clases de `interrupted` (en el orden en que se crearon) las secciones en blanco
+    del final del curso que ninguna clase tiene: las que creó una ejecución que no llegó a guardar
+    sus ids. Se emparejan desde el final. Devuelve {pk de la clase: id de la sección}.
+    """
+    trailing = []
+    for section in reversed(sections):
+        if section['id'] in mapped or not _blank_section(section):
+            break
+        trailing.append(section['id'])
+    return {item.pk: section_id for item, section_id in zip(reversed(interrupted), trailing)}
+
+
+def _stale(prefix=''):
+    return (
+        Q(**{f'{prefix}moodle_sync__isnull': True})
+        | Q(**{f'{prefix}moodle_sync__synced_updated_at__isnull': True})
+        | Q(**{f'{prefix}updated_at__gt': F(f'{prefix}moodle_sync__synced_updated_at')})
+    )
+
+
+def pending_courses(course_ids=None):
+    """Cursos sin enviar o modificados desde el último envío"""
+    queryset = CourseModel.objects.filter(_stale()).select_related('moodle_sync').order_by('pk')
+    if course_ids:
+        queryset = queryset.filter(pk__in=course_ids)
+    return queryset
+
+
+def pending_classes(course_ids=None):
+    """Clases sin enviar o modificadas, de cursos que ya existen en Moodle"""
+    queryset = ClassModel.objects.filter(
+        _stale(), course__moodle_sync__remote_id__isnull=False,
+    ).select_related('moodle_sync', 'course__moodle_sync').order_by('course_id', 'created_at', 'pk')
+    if course_ids:
+        queryset = queryset.filter(course_id__in=course_ids)
+    return queryset
+
+
+def _record(instance):
+    try:
+        return instance.moodle_sync
+    except ObjectDoesNotExist:
+        return None
+
+
+def _push(moodle, items, send):
+    """
+    Envía `items` con send(items) -> resultados en el mismo orden (o None). Si Moodle rechaza el lote,
+    reintenta uno a uno en paralelo. Devuelve [(item, resultado, error)].
+    """
+    try:
+        results = send(items)
+    except MoodleError as error:
+        if len(items) == 1:
+            return [(items[0], None, str(error))]
+        return [entry for entries in moodle.map(lambda item: _push(moodle, [item], send), items) for entry in entries]
+    results = results if results is not None else [None] * len(items)
+    return [(item, result, None) for item, result in zip(items, results)]
+
+
+def _mark(records, entries, synced_at, remote_field=None, stats=None, key=None):
+    """Actualiza los registros tras un envío: updated_at sincronizado o el error"""
+    changed = []
+    for instance, result, error in entries:
+        record = records[instance.pk]
+        if error:
+            record.last_error = error
+            if stats is not None:
+                stats['errors'] += 1
+        else:
+            if remote_field is not None:
+                setattr(record, remote_field, result)
+            record.synced_updated_at = instance.updated_at
+            record.synced_at = synced_at
+            record.last_error = None
+            if stats is not None and key:
+                stats[key] += 1
+        changed.append(record)
+    return changed
+
+
+def sync_courses(moodle, courses, stats):
+    """Crea o actualiza en Moodle un lote de cursos"""
+    now = timezone.now()
+    to_create = [course for course in courses if _record(course) is None or _record(course).remote_id is None]
+    to_update = [course for course in courses if course not in to_create]
+
+    # Creación interrumpida en una ejecución anterior: se busca el curso por idnumber
+    interrupted = [course for course in to_create if _record(course) is not None]
+    found = moodle.map(lambda course: moodle.get_courses_by_field('idnumber', course_idnumber(course.pk)), interrupted)
+    for course, remote in zip(interrupted, found):
+        if remote:
+            _record(course).remote_id = remote[0]['id']
+            to_create.remove(course)
+            to_update.append(course)
+
+    MoodleCourseSyncModel.objects.bulk_create(
+        [MoodleCourseSyncModel(course=course) for course in to_create if _record(course) is None],
+    )
+    records = {record.course_id: record for record in MoodleCourseSyncModel.objects.filter(course__in=courses)}
+
+    changed = []
+    if to_create:
+        def create(batch):
+            created = moodle.create_courses([course_payload(course) for course in batch], batch_size=len(batch))
+            return [course['id'] for course in created]
+
+        entries = _push(moodle, to_create, create)
+        changed += _mark(records, entries, now, 'remote_id', stats, 'courses_created')
+    if to_update:
+        for course in to_update:
+            records[course.pk].remote_id = _record(course).remote_id
+
+        def update(batch):
+            moodle.update_courses([course_payload(course, records[course.pk].remote_id) for course in batch], batch_size=len(batch))
+
+        entries = _push(moodle, to_update, update)
+        changed += _mark(records, entries, now, stats=stats, key='courses_updated')
+
+    MoodleCourseSyncModel.objects.bulk_update(changed, ['remote_id', 'synced_updated_at', 'synced_at', 'last_error'])
+
+
+def sync_classes(moodle, groups, stats):
+    """
+    Crea y actualiza las secciones de las clases de varios cursos (`groups`: una lista de clases por
+    curso). Por curso hay dos llamadas como máximo y los cursos van en paralelo; la base de datos solo
+    se usa desde este hilo.
+    """
+    now = timezone.now()
+    classes = [item for group in groups for item in group]
+    MoodleClassSyncModel.objects.bulk_create(
+        [MoodleClassSyncModel(class_model=item) for item in classes if _record(item) is None],
+    )
+    records = {record.class_model_id: record for record in MoodleClassSyncModel.objects.filter(class_model__in=classes)}
+
+    plans = []
+    for group in groups:
+        new = [item for item in group if _record(item) is None or _record(item).section_id is None]
+        # Creación interrumpida en una ejecución anterior: sus secciones pueden existir ya en Moodle
+        interrupted = [item for item in new if _record(item) is not None]
+        mapped = set(MoodleClassSyncModel.objects.filter(
+            class_model__course_id=group[0].course_id, section_id__isnull=False,
+        ).values_list('section_id', flat=True)) if interrupted else set()
+        plans.append((group[0].course.moodle_sync.remote_id, group, new, interrupted, mapped))
+
+    def create(plan):
+        remote_course_id, group, new, interrupted, mapped = plan
+        assigned = {}
+        try:
+            if interrupted:
+                assigned.update(_recover_sections(moodle.get_course_contents(remote_course_id), interrupted, mapped))
+            remaining = [item for item in new if item.pk not in assigned]
+            if remaining:
+                for item, section in zip(remaining, moodle.create_sections(remote_course_id, len(remaining))):
+                    assigned[item.pk] = section['sectionid']
+        except (MoodleError, requests.RequestException) as error:
+            # Un fallo de un curso no corta los demás: los ids ya asignados se guardan igualmente
+            return assigned, 0, str(error)
+        return assigned, len(remaining), None
+
+    failed = set()
+    for plan, (assigned, created, error) in zip(plans, moodle.map(create, plans)):
+        for pk, section_id in assigned.items():
+            records[pk].section_id = section_id
+        stats['classes_created'] += created
+        if error:
+            failed.add(plan[0])
+            stats['errors'] += 1
+            for item in plan[1]:
+                records[item.pk].last_error = error
+    # Los ids de las secciones se guardan antes de actualizarlas: un corte aquí no las duplica
+    MoodleClassSyncModel.objects.bulk_update(records.values(), ['section_id', 'last_error'])
+
+    def update(plan):
+        remote_course_id, group = plan[0], plan[1]
+
+        def send(batch):
+            moodle.update_sections(remote_course_id, [section_payload(item, records[item.pk].section_id) for item in batch])
+
+        return _push(moodle, group, send)
+
+    plans = [plan for plan in plans if plan[0] not in failed]
+    changed = []
+    for entries in moodle.map(update, plans):
+        changed += _mark(records, entries, now, stats=stats, key='classes_updated')
+    MoodleClassSyncModel.objects.bulk_update(changed, ['synced_updated_at', 'synced_at', 'last_error'])
+
+
+def run_sync(moodle=None, batch_size=None, course_ids=None):
+    """
+    Envía a Moodle los cursos y clases pendientes. Devuelve los contadores de la ejecución.
+    Los lotes se recorren por pk creciente: un registro que falla no se reintenta en la misma ejecución.
+    """
+    moodle = moodle or get_client()
+    batch_size = batch_size or settings.MOODLE_SYNC_BATCH_SIZE
+    stats = {'courses_created': 0, 'courses_updated': 0, 'classes_created': 0, 'classes_updated': 0, 'errors': 0}
+
+    last_pk = 0
+    while True:
+        courses = list(pending_courses(course_ids).filter(pk__gt=last_pk)[:batch_size])
+        if not courses:
+            break
+        sync_courses(moodle, courses, stats)
+        last_pk = courses[-1].pk
+
+    last_course = 0
+    while True:
+        course_batch = list(
+            pending_classes(course_ids).filter(course_id__gt=last_course)
+            .values_list('course_id', flat=True).distinct().order_by('course_id')[:moodle.max_workers]
+        )
+        if not course_batch:
+            break
+        by_course = {}
+        for item in pending_classes(course_batch):
+            by_course.setdefault(item.course_id, []).append(item)
+        sync_classes(moodle, list(by_course.values()), stats)
+        last_course = course_batch[-1]
+    return stats
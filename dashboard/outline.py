@@ -0,0 +1,152 @@
+"""
+Índice materializado de cada curso (CourseOutlineModel): curso -> clases -> contenidos con id,
+título, tipo, orden y tipos de media, sin content_details. La navegación del curso lo lee de una
+sola fila en lugar de pedir la lista de clases y después los contenidos completos de cada una.
+
+El índice se crea en la primera lectura y después se actualiza por partes: las señales (y las
+escrituras sin señales, como el importador o el reordenamiento) apuntan las clases afectadas con
+schedule_refresh y, al confirmar la transacción, se recalculan solo esas clases, una vez por clase
+aunque hayan cambiado muchos contenidos. Los cambios apuntados pertenecen a su transacción: si se
+revierte, se descartan con sus callbacks de on_commit.
+"""
+from django.db import transaction
+
+from .models import ClassModel, ClassContentModel, CourseModel, CourseOutlineModel
+
+COURSE_FIELDS = ('id', 'course_name', 'level', 'category')
+CLASS_FIELDS = ('id', 'class_name')
+CONTENT_FIELDS = ('id', 'tittle', 'content_type', 'order')
+# Campos de archivo del contenido -> tipo de media en el índice
+MEDIA_FLAGS = {'image': 'image', 'video': 'video', 'audio': 'audio', 'pdf': 'pdf', 'embed_video': 'video_embed'}
+
+
+def _content_entry(row):
+    media = {flag for field, flag in MEDIA_FLAGS.items() if row[field]}
+    for item in row['multimedia'] or []:
+        if isinstance(item, dict) and item.get('media_type'):
+            media.add(item['media_type'])
+    return {**{field: row[field] for field in CONTENT_FIELDS}, 'media': sorted(media)}
+
+
+def _class_entries(class_rows):
+    """Entradas de las clases de `class_rows` con sus contenidos (una consulta)"""
+    contents = {row['id']: [] for row in class_rows}
+    rows = ClassContentModel.objects.filter(class_id__in=list(contents)).order_by('order', 'id').values(
+        'class_id', *CONTENT_FIELDS, *MEDIA_FLAGS, 'multimedia',
+    )
+    for row in rows:
+        contents[row['class_id']].append(_content_entry(row))
+    return [
+        {
+            **{field: row[field] for field in CLASS_FIELDS},
+            # Solo para ordenar las clases como el listado (CreatedAtKeysetPagination)
+            'created_at': row['created_at'].isoformat(),
+            'contents': contents[row['id']],
+        }
+        for row in class_rows
+    ]
+
+
+def _class_rows(**filters):
+    return list(ClassModel.objects.filter(**filters).order_by('created_at', 'id').values(*CLASS_FIELDS, 'created_at', 'course_id'))
+
+
+def _course_entry(course_id):
+    return CourseModel.objects.filter(pk=course_id).values(*COURSE_FIELDS).first()
+
+
+def build_outline(course_id):
+    """Índice completo del curso, o None si no existe"""
+    course = _course_entry(course_id)
+    if course is None:
+        return None
+    return {'course': course, 'classes': _class_entries(_class_rows(course_id=course_id))}
+
+
+def get_outline(course_id):
+    """(outline, version) del curso; lo crea si todavía no existe. None si el curso no existe."""
+    row = CourseOutlineModel.objects.filter(course_id=course_id).values_list('outline', 'version').first()
+    if row is not None:
+        return row
+    outline = build_outline(course_id)
+    if outline is None:
+        return None
+    record, _created = CourseOutlineModel.objects.get_or_create(course_id=course_id, defaults={'outline': outline})
+    return record.outline, record.version
+
+
+class _Changes:
+    """Cambios apuntados en una transacción; se aplican una sola vez, con el primer on_commit que llega"""
+
+    def __init__(self):
+        self.classes, self.courses, self.removed = set(), set(), set()
+
+    def __call__(self):
+        if self.classes or self.courses or self.removed:
+            changes = self.classes, self.courses, self.removed
+            self.classes, self.courses, self.removed = set(), set(), set()
+            flush(*changes)
+
+
+def _transaction_changes():
+    """Los cambios ya apuntados en la transacción (o savepoint) en curso, o None"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    # Solo se reutilizan los del mismo savepoint: si se revierte, sus callbacks salen de
+    # run_on_commit y sus cambios se descartan con ellos sin tocar los del bloque exterior
+    savepoint_ids = set(connection.savepoint_ids)
+    for callback_savepoint_ids, callback, _robust in reversed(connection.run_on_commit):
+        if isinstance(callback, _Changes) and callback_savepoint_ids == savepoint_ids:
+            return callback
+    return None
+
+
+def schedule_refresh(class_ids=(), course_ids=(), removed=()):
+    """
+    Apunta cambios para aplicar al confirmar la transacción: contenidos o datos de las clases
+    `class_ids`, datos de los cursos `course_ids` y clases `removed` [(course_id, class_id)] que
+    dejaron el curso (borradas o movidas a otro).
+    """
+    changes = _transaction_changes() or _Changes()
+    changes.classes.update(class_ids)
+    changes.courses.update(course_ids)
+    changes.removed.update(removed)
+    # Se registra en cada llamada; solo la primera ejecución aplica los cambios
+    transaction.on_commit(changes)
+
+
+def flush(class_ids, course_ids=(), removed=()):
+    """
+    Aplica los cambios a los índices existentes. Las clases de `removed` se vuelven a leer: si
+    todavía existen (p. ej. se movieron de curso) se colocan en el curso en el que están ahora.
+    """
+    removed_ids = {class_id for _course_id, class_id in removed}
+    class_ids = set(class_ids) | removed_ids
+    class_rows = _class_rows(pk__in=list(class_ids)) if class_ids else []
+    changed = {course_id: set() for course_id in course_ids}
+    for row in class_rows:
+        changed.setdefault(row['course_id'], set()).add(row['id'])
+    for course_id, class_id in removed:
+        changed.setdefault(course_id, set()).add(class_id)
+
+    # Solo se actualizan los índices que ya existen; los demás se crean completos al leerlos
+    existing = set(CourseOutlineModel.objects.filter(course_id__in=list(changed)).values_list('course_id', flat=True))
+    rows = [row for row in class_rows if row['course_id'] in existing]
+    entries = {row['id']: (row['course_id'], entry) for row, entry in zip(rows, _class_entries(rows))}
+
+    for course_id in sorted(existing):
+        with transaction.atomic():
+            record = CourseOutlineModel.objects.select_for_update().get(course_id=course_id)
+            outline = record.outline
+            if course_id in course_ids:
+                outline['course'] = _course_entry(course_id) or outline['course']
+            touched = changed[course_id]
+            classes = [entry for entry in outline['classes'] if entry['id'] not in touched]
+            classes.extend(
+                entry for class_id, (entry_course_id, entry) in entries.items()
+                if class_id in touched and entry_course_id == course_id
+            )
+            outline['classes'] = sorted(classes, key=lambda entry: (entry['created_at'], entry['id']))
+            record.version += 1
+            record.save(update_fields=['outline', 'version', 'updated_at'])
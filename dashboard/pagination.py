@@ -0,0 +1,105 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+En lugar de OFFSET, cada página continúa a partir de la última fila de la anterior:
+WHERE (order, id) > (:order, :id) ORDER BY order, id LIMIT n. El coste por página es constante sin
+importar en qué posición del catálogo esté el cliente. La paginación es opcional: solo se aplica
+si la petición trae ?cursor= o ?page_size=, así los clientes actuales siguen recibiendo la lista completa.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('order', 'id')
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            page_size = int(raw)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: ['Debe ser un número entero']})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: ['Debe ser mayor que cero']})
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, instance):
+        position = [self._field_value(instance, name) for name in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, model, cursor):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(self.ordering, position)]
+        except Exception:
+            raise ValidationError({self.cursor_query_param: ['Cursor inválido']})
+
+    def _field_value(self, instance, name):
+        value = getattr(instance, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def _after(self, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            step = Q(**{f'{name}__gt': position[index]})
+            for previous, value in zip(self.ordering[:index], position[:index]):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.next_cursor = None
+        if not self.is_requested(request):
+            return None
+
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(queryset.model, cursor)))
+
+        # Se pide una fila extra para saber si hay página siguiente sin hacer COUNT
+        rows = list(queryset[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = self.encode_cursor(rows[-1])
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_pagination_data(self):
+        return {
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+        }
+
+    def get_paginated_response(self, data):
+        return Response({'data': data, **self.get_pagination_data()})
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
@@ -0,0 +1,109 @@
+"""
+Reordenamiento masivo de bloques y tareas de una clase.
+
+Todos los cambios se aplican en una transacción con UPDATE ... SET order = CASE id WHEN ... END,
+en lugar de un PATCH por elemento. Como update() no dispara señales, la caché de la clase y el
+índice del curso (outline.py) se actualizan aquí.
+"""
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import (
+    ClassContentModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel,
+    CategoriesTaskModel, FillInTheGapsTaskModel,
+)
+from .outline import schedule_refresh
+from .signals import invalidate_class
+
+# Destino en la URL -> (modelo, campo FK hacia la clase)
+REORDER_TARGETS = {
+    'contents': (ClassContentModel, 'class_id'),
+    'multiple_choice': (MultipleChoiceModel, 'class_model'),
+    'true_or_false': (TrueOrFalseModel, 'class_model'),
+    'ordering': (OrderingTaskModel, 'class_model'),
+    'categories': (CategoriesTaskModel, 'class_model'),
+    'fill_in_the_gaps': (FillInTheGapsTaskModel, 'class_model'),
+}
+
+# Pares por sentencia UPDATE; mantiene cada sentencia bajo el límite de parámetros de SQLite
+UPDATE_CHUNK_SIZE = 250
+
+
+def _is_position(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def parse_reorder_payload(data):
+    """
+    Acepta [{"id": 1, "order": 0}, ...], [[1, 0], ...] o {"items": [...]} y devuelve [(id, order), ...].
+    Lanza ValidationError si algún elemento no es válido o hay ids repetidos.
+    """
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list) or not data:
+        raise ValidationError({'items': ['Debe enviar una lista no vacía de pares (id, order)']})
+
+    pairs = []
+    errors = []
+    for index, item in enumerate(data):
+        if isinstance(item, dict):
+            pair = (item.get('id'), item.get('order'))
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            pair = tuple(item)
+        else:
+            errors.append(f'Elemento {index}: debe ser {{"id", "order"}} o [id, order]')
+            continue
+        if not _is_position(pair[0]) or not _is_position(pair[1]):
+            errors.append(f'Elemento {index}: id y order deben ser enteros positivos')
+            continue
+        pairs.append(pair)
+
+    seen = set()
+    duplicated = set()
+    for item_id, _order in pairs:
+        if item_id in seen:
+            duplicated.add(item_id)
+        seen.add(item_id)
+    if duplicated:
+        errors.append(f'Ids repetidos: {sorted(duplicated)}')
+    if errors:
+        raise ValidationError({'items': errors})
+    return pairs
+
+
+def reorder(target, class_id, pairs):
+    """Aplica los nuevos valores de order a los elementos de la clase. Devuelve cuántos se actualizaron."""
+    model, class_field = REORDER_TARGETS[target]
+    ids = [item_id for item_id, _order in pairs]
+    has_updated_at = any(field.name == 'updated_at' for field in model._meta.concrete_fields)
+
+    with transaction.atomic():
+        queryset = model.objects.filter(**{class_field: class_id})
+        found = set()
+        for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+            found.update(queryset.filter(pk__in=ids[start:start + UPDATE_CHUNK_SIZE]).values_list('pk', flat=True))
+        missing = [item_id for item_id in ids if item_id not in found]
+        if missing:
+            raise ValidationError({'items': [f'Elementos que no pertenecen a la clase {class_id}: {missing}']})
+
+        now = timezone.now()
+        updated = 0
+        for start in range(0, len(pairs), UPDATE_CHUNK_SIZE):
+            chunk = pairs[start:start + UPDATE_CHUNK_SIZE]
+            values = {
+                'order': Case(
+                    *[When(pk=item_id, then=Value(order)) for item_id, order in chunk],
+                    output_field=IntegerField(),
+                ),
+            }
+            # update() no toca auto_now: se actualiza a mano para que ETag / Last-Modified cambien
+            if has_updated_at:
+                values['updated_at'] = now
+            updated += queryset.filter(pk__in=[item_id for item_id, _order in chunk]).update(**values)
+
+    invalidate_class(class_id)
+    if model is ClassContentModel:
+        schedule_refresh(class_ids=[class_id])
+    return updated
@@ -0,0 +1,298 @@
+"""
+Búsqueda de texto completo en el contenido de los cursos.
+
+Cada objeto de SEARCH_SOURCES tiene una fila en SearchDocumentModel con su título y el texto de sus
+campos (content_details se recorre y se quedan solo los textos; el HTML se quita). El índice se
+mantiene sobre esa tabla (ver la migración 0013):
+  - SQLite: tabla FTS5 sincronizada por triggers; ranking bm25 con el título 10 veces más pesado.
+  - PostgreSQL: columna tsvector generada con índice GIN; ranking ts_rank_cd.
+  - Otros motores o SQLite sin FTS5: LIKE sobre la tabla, sin ranking.
+Los documentos se actualizan con las señales de guardado y borrado (ver signals.py); los cambios
+hechos con update() o bulk_create llaman a index_instance / index_objects. `manage.py
+rebuild_search_index` reconstruye todo.
+
+Consultas: las palabras se buscan todas (AND), la última también como prefijo ("gramát" encuentra
+"gramática") y el texto entre comillas como frase exacta. Con muchas coincidencias solo se ordenan
+por relevancia las SEARCH_RANK_CANDIDATES más recientes, para que las palabras comunes no recorran
+todo el índice.
+"""
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+from .models import (
+    ClassModel, CourseModel, ClassContentModel, TextBlockLayoutModel, VideoLayoutModel, MultimediaBlockVideoModel,
+    MultimediaBlockAudioModel, MultimediaBlockAttachmentModel, SearchDocumentModel,
+)
+
+# Tipo -> (modelo, campo FK hacia ClassModel, campos de texto); el primero es el título
+SEARCH_SOURCES = {
+    'content': (ClassContentModel, 'class_id', ['tittle', 'instructions', 'content_details', 'audio_transcription', 'video_transcription']),
+    'text_block': (TextBlockLayoutModel, 'lesson', ['tittle', 'instructions', 'content']),
+    'video_layout': (VideoLayoutModel, 'class_model', ['tittle', 'instructions', 'script']),
+    'video_block': (MultimediaBlockVideoModel, 'class_model', ['tittle', 'instructions', 'script']),
+    'audio_block': (MultimediaBlockAudioModel, 'class_model', ['tittle', 'instructions', 'script']),
+    'attachment_block': (MultimediaBlockAttachmentModel, 'class_model', ['tittle', 'instructions', 'text_attachment']),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, _fk, _fields) in SEARCH_SOURCES.items()}
+
+FTS_TABLE = 'dashboard_search_fts'
+POSTGRES_CONFIG = 'simple'
+SNIPPET_WORDS = 16
+MARK_START, MARK_END = '<mark>', '</mark>'
+
+# Textos de content_details que no se indexan: rutas de imágenes, URLs, colores...
+NOT_TEXT = re.compile(r'^(https?://|/|#[0-9a-fA-F]{3,8}$)|\.(jpe?g|png|gif|webp|svg|mp3|mp4|wav|pdf)$', re.IGNORECASE)
+# Misma noción de palabra que unicode61 / el parser 'simple': letras y dígitos, '_' separa
+WORD = re.compile(r'[^\W_]+')
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def clean_text(value):
+    return html.unescape(strip_tags(value)).strip()
+
+
+def json_text(value):
+    """Textos de un valor JSON (content_details), en orden"""
+    if isinstance(value, str):
+        if value and not NOT_TEXT.search(value):
+            yield clean_text(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from json_text(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from json_text(item)
+
+
+def document_fields(kind, values):
+    """(título, cuerpo) a partir de los valores de los campos de texto del objeto"""
+    fields = SEARCH_SOURCES[kind][2]
+    title = clean_text(values.get(fields[0]) or '')[:500]
+    parts = []
+    for field in fields[1:]:
+        value = values.get(field)
+        if isinstance(value, (dict, list)):
+            parts.extend(text for text in json_text(value) if text)
+        elif value:
+            parts.append(clean_text(value))
+    return title, '\n'.join(part for part in parts if part)
+
+
+def _source_values(kind, instance):
+    model, fk, fields = SEARCH_SOURCES[kind]
+    names = [*fields, f'{fk}_id']
+    if instance.get_deferred_fields() & set(names):
+        # Instancia cargada con only(): se leen los campos en una consulta en lugar de una por campo
+        return model.objects.filter(pk=instance.pk).values(*names).first()
+    return {name: getattr(instance, name) for name in names}
+
+
+def index_instance(instance):
+    """Crea o actualiza el documento de búsqueda de `instance`"""
+    kind = KIND_BY_MODEL[type(instance)]
+    values = _source_values(kind, instance)
+    if values is None:
+        return
+    class_id = values[f'{SEARCH_SOURCES[kind][1]}_id']
+    course_id = ClassModel.objects.filter(pk=class_id).values_list('course_id', flat=True).first()
+    title, body = document_fields(kind, values)
+    SearchDocumentModel.objects.update_or_create(
+        kind=kind, object_id=instance.pk,
+        defaults={'class_model_id': class_id, 'course_id': course_id, 'title': title, 'body': body},
+    )
+
+
+def remove_instance(instance):
+    SearchDocumentModel.objects.filter(kind=KIND_BY_MODEL[type(instance)], object_id=instance.pk).delete()
+
+
+def index_objects(kind, queryset, batch_size=1000):
+    """
+    (Re)indexa en lotes los objetos de `queryset` (del modelo de `kind`), para altas con bulk_create
+    y la reconstrucción completa. Devuelve cuántos documentos se escribieron.
+    """
+    model, fk, fields = SEARCH_SOURCES[kind]
+    queryset = queryset.order_by('pk').values('pk', *fields, f'{fk}_id', f'{fk}__course_id')
+    written = 0
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not rows:
+            return written
+        documents = []
+        for row in rows:
+            title, body = document_fields(kind, row)
+            documents.append(SearchDocumentModel(
+                kind=kind, object_id=row['pk'], class_model_id=row[f'{fk}_id'],
+                course_id=row[f'{fk}__course_id'], title=title, body=body,
+            ))
+        # Borrar e insertar (en lugar de update_conflicts) mantiene los triggers de FTS5 simples
+        SearchDocumentModel.objects.filter(kind=kind, object_id__in=[row['pk'] for row in rows]).delete()
+        SearchDocumentModel.objects.bulk_create(documents)
+        written += len(documents)
+        last_pk = rows[-1]['pk']
+
+
+def rebuild_index(batch_size=1000):
+    """Reconstruye todos los documentos. Devuelve {tipo: documentos}."""
+    SearchDocumentModel.objects.all().delete()
+    return {
+        kind: index_objects(kind, model.objects.all(), batch_size=batch_size)
+        for kind, (model, _fk, _fields) in SEARCH_SOURCES.items()
+    }
+
+
+def move_class(class_instance):
+    """Actualiza el curso de los documentos de una clase que cambió de curso"""
+    SearchDocumentModel.objects.filter(class_model=class_instance).exclude(
+        course_id=class_instance.course_id,
+    ).update(course_id=class_instance.course_id)
+
+
+def parse_query(query):
+    """Grupos de palabras de la consulta: una frase entre comillas es un grupo, cada palabra suelta otro"""
+    groups = []
+    for phrase, word in QUERY_PART.findall(query):
+        tokens = WORD.findall(phrase if phrase else word)
+        if phrase:
+            if tokens:
+                groups.append((tokens, True))
+        else:
+            groups.extend(([token], False) for token in tokens)
+    return groups
+
+
+def fts5_query(groups, course_id=None, class_id=None, kind=None):
+    """
+    Expresión MATCH de FTS5: las palabras solo en título y cuerpo, y los filtros como tokens de la
+    columna scope (ver la migración 0013)
+    """
+    parts = ['"' + ' '.join(tokens) + '"' for tokens, _phrase in groups]
+    if not groups[-1][1]:
+        parts[-1] += '*'
+    expression = '{title body} : (' + ' '.join(parts) + ')'
+    scope = [
+        f'{prefix}{value}' for prefix, value in (('course', course_id), ('class', class_id), ('kind', kind))
+        if value is not None
+    ]
+    if scope:
+        expression = 'scope : (' + ' '.join(token.replace('_', '') for token in scope) + ') AND ' + expression
+    return expression
+
+
+def tsquery(groups):
+    parts = [' <-> '.join(f"'{token.lower()}'" for token in tokens) for tokens, _phrase in groups]
+    if not groups[-1][1]:
+        parts[-1] += ':*'
+    return ' & '.join(f'({part})' for part in parts)
+
+
+def fts5_available():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def _search_sqlite(match, limit, offset):
+    with connection.cursor() as cursor:
+        # Solo se puntúan los settings.SEARCH_RANK_CANDIDATES documentos más recientes: el coste
+        # de bm25 crece con las coincidencias y una palabra muy común aparece en casi todos
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT 1 OFFSET %s',
+            [match, settings.SEARCH_RANK_CANDIDATES - 1],
+        )
+        oldest = cursor.fetchone()
+        cursor.execute(f"""
+            SELECT d.kind, d.object_id, d.class_model_id, d.course_id, d.title,
+                   snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}),
+                   bm25({FTS_TABLE}, 10.0, 1.0, 0.0) AS rank
+            FROM {FTS_TABLE} JOIN dashboard_searchdocumentmodel d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid >= %s
+            ORDER BY rank, d.id
+            LIMIT %s OFFSET %s
+        """, [MARK_START, MARK_END, match, oldest[0] if oldest else 0, limit, offset])
+        # bm25 es negativo: cuanto menor, más relevante
+        return [(*row[:6], -row[6]) for row in cursor.fetchall()]
+
+
+def _search_postgres(groups, course_id, class_id, kind, limit, offset):
+    filters, params = [], []
+    for column, value in (('d.course_id', course_id), ('d.class_model_id', class_id), ('d.kind', kind)):
+        if value is not None:
+            filters.append(f'AND {column} = %s')
+            params.append(value)
+    # Como en SQLite, se puntúan solo los candidatos más recientes; ts_headline, que es caro, solo
+    # se calcula para la página devuelta
+    sql = f"""
+        SELECT page.kind, page.object_id, page.class_model_id, page.course_id, page.title,
+               ts_headline(%s::regconfig, page.body, page.query, %s), page.rank
+        FROM (
+            SELECT candidate.*, ts_rank_cd(candidate.search_vector, candidate.query) AS rank
+            FROM (
+                SELECT d.id, d.kind, d.object_id, d.class_model_id, d.course_id, d.title, d.body, d.search_vector, query
+                FROM dashboard_searchdocumentmodel d, to_tsquery(%s::regconfig, %s) query
+                WHERE d.search_vector @@ query {' '.join(filters)}
+                ORDER BY d.id DESC
+                LIMIT %s
+            ) candidate
+            ORDER BY rank DESC, candidate.id
+            LIMIT %s OFFSET %s
+        ) page
+        ORDER BY page.rank DESC, page.id
+    """
+    options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            POSTGRES_CONFIG, options, POSTGRES_CONFIG, tsquery(groups), *params,
+            settings.SEARCH_RANK_CANDIDATES, limit, offset,
+        ])
+        return cursor.fetchall()
+
+
+def _search_like(groups, course_id, class_id, kind, limit, offset):
+    queryset = SearchDocumentModel.objects.all()
+    for tokens, _phrase in groups:
+        text = ' '.join(tokens)
+        queryset = queryset.filter(Q(title__icontains=text) | Q(body__icontains=text))
+    for field, value in (('course_id', course_id), ('class_model_id', class_id), ('kind', kind)):
+        if value is not None:
+            queryset = queryset.filter(**{field: value})
+    rows = queryset.order_by('-updated_at', 'id').values_list('kind', 'object_id', 'class_model_id', 'course_id', 'title', 'body')
+    return [(*row[:5], row[5][:200], None) for row in rows[offset:offset + limit]]
+
+
+def search(query, course_id=None, class_id=None, kind=None, limit=20, offset=0):
+    """
+    Busca `query` y devuelve los resultados ordenados por relevancia, con la clase y el curso de
+    cada uno: [{'kind', 'id', 'title', 'snippet', 'rank', 'class': {...}, 'course': {...}}].
+    """
+    groups = parse_query(query)
+    if not groups:
+        return []
+    if connection.vendor == 'postgresql':
+        rows = _search_postgres(groups, course_id, class_id, kind, limit, offset)
+    elif connection.vendor == 'sqlite' and fts5_available():
+        rows = _search_sqlite(fts5_query(groups, course_id, class_id, kind), limit, offset)
+    else:
+        rows = _search_like(groups, course_id, class_id, kind, limit, offset)
+
+    # Contexto de la página: una consulta por tabla
+    classes = ClassModel.objects.only('id', 'class_name').in_bulk({row[2] for row in rows})
+    courses = CourseModel.objects.only('id', 'course_name').in_bulk({row[3] for row in rows})
+    return [
+        {
+            'kind': row_kind,
+            'id': object_id,
+            'title': title,
+            'snippet': snippet,
+            'rank': round(rank, 4) if rank is not None else None,
+            'class': {'id': class_pk, 'class_name': classes[class_pk].class_name} if class_pk in classes else None,
+            'course': {'id': course_pk, 'course_name': courses[course_pk].course_name} if course_pk in courses else None,
+        }
+        for row_kind, object_id, class_pk, course_pk, title, snippet, rank in rows
+    ]
@@ -1,69 +1,120 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from .content_validators import validate_content_details
+from .derivatives import variants_payload
 from .models import CourseModel, ClassModel, LayoutModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel, MediaModel, MultimediaBlockVideoModel, ClassContentModel
 
-class CourseModelSerializer(serializers.ModelSerializer):
+
+class SparseFieldsMixin:
+    """
+    Limita los campos serializados a los indicados en context['fields'] (?fields=id,tittle).
+    Los nombres desconocidos se ignoran; si ninguno es válido se devuelven todos los campos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested:
+            keep = set(requested) & set(self.fields)
+            if keep:
+                for name in set(self.fields) - keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def model_fields_for(cls, requested):
+        """Campos del modelo que hacen falta para serializar `requested` (para queryset.only())"""
+        model = cls.Meta.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        declared = cls().fields
+        sources = set()
+        for name in requested:
+            if name in declared:
+                source = declared[name].source.split('.')[0]
+                if source in concrete:
+                    sources.add(source)
+        return sources
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Derivados de una imagen (miniatura, srcset y WebP por ancho) a partir de <campo>_variants.
+    Es None mientras no se hayan generado.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, manifest):
+        return variants_payload(manifest, default_storage, self.context.get('request'))
+
+
+class CourseModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    cover_variants = ImageVariantsField()
+
     class Meta:
         model = CourseModel
-        fields = ['id', 'course_name', 'description', 'category', 'level', 'bullet_points', 'cover', 'created_at', 'updated_at']
+        fields = ['id', 'course_name', 'description', 'category', 'level', 'bullet_points', 'cover', 'cover_variants', 'created_at', 'updated_at']
 
 
-class ClassModelSerializer(serializers.ModelSerializer):
+class ClassModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     course_id = serializers.PrimaryKeyRelatedField(
         queryset=CourseModel.objects.all(),
         source='course'
     )
-    
+    cover_variants = ImageVariantsField()
+
     class Meta:
         model = ClassModel
-        fields = ['id', 'class_name', 'description', 'course_id', 'bullet_points', 'cover', 'created_at', 'updated_at']
+        fields = ['id', 'class_name', 'description', 'course_id', 'bullet_points', 'cover', 'cover_variants', 'created_at', 'updated_at']
 
 
 class LayoutModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = LayoutModel
-        fields = ['id', 'class_model', 'title', 'instructions', 'cover', 'audio', 'audio_script']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'cover', 'audio', 'audio_script']
 
 
 class MultipleChoiceModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = MultipleChoiceModel
-        fields = ['id', 'tittle', 'instructions', 'script', 'question', 'cover', 'audio', 'stats']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'script', 'question', 'cover', 'audio', 'order', 'stats']
 
 
 class TrueOrFalseModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = TrueOrFalseModel
-        fields = ['id', 'layout', 'instructions', 'questions', 'order']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'questions', 'order']
 
 
 class OrderingTaskModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderingTaskModel
-        fields = ['id', 'layout', 'instructions', 'items', 'order']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'items', 'order']
 
 
 class CategoriesTaskModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = CategoriesTaskModel
-        fields = ['id', 'layout', 'instructions', 'categories', 'order']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'categories', 'order']
 
 
 class FillInTheGapsTaskModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = FillInTheGapsTaskModel
-        fields = ['id', 'layout', 'instructions', 'text_with_gaps', 'keywords', 'order']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'text_with_gaps', 'keywords', 'order']
 
 
 class VideoLayoutModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = VideoLayoutModel
-        fields = ['id', 'title', 'instructions', 'video_file', 'script', 'created_at', 'updated_at']
+        fields = ['id', 'tittle', 'instructions', 'video_file', 'script', 'created_at', 'updated_at']
 
 
 class TextBlockLayoutModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = TextBlockLayoutModel
-        fields = ['id', 'title', 'instructions', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'tittle', 'instructions', 'content', 'created_at', 'updated_at']
 
 
 class MediaModelSerializer(serializers.ModelSerializer):
@@ -72,18 +123,22 @@ class MediaModelSerializer(serializers.ModelSerializer):
         fields = ['id', 'media_type', 'file', 'description', 'created_at', 'updated_at']
 
 
-class MultimediaBlockVideoModelSerializer(serializers.ModelSerializer):
+class MultimediaBlockVideoModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    cover_variants = ImageVariantsField()
+
     class Meta:
         model = MultimediaBlockVideoModel
-        fields = ['id', 'video', 'script', 'cover']
+        fields = ['id', 'class_model', 'tittle', 'instructions', 'video', 'script', 'media_info', 'cover', 'cover_variants', 'order']
+
 
+class ClassContentModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
 
-class ClassContentModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClassContentModel
         fields = ['id', 'class_id', 'content_type', 'tittle', 'instructions', 
                  'content_details', 'multimedia', 'order', 'stats', 
-                 'created_at', 'updated_at', 'image', 'video', 'video_transcription', 'embed_video', 'audio', 'audio_transcription', 'pdf']
+                 'created_at', 'updated_at', 'image', 'image_variants', 'video', 'video_transcription', 'embed_video', 'audio', 'audio_transcription', 'pdf', 'media_info']
 
     def validate_content_details(self, value):
         if value is not None:
@@ -96,3 +151,13 @@ class ClassContentModelSerializer(serializers.ModelSerializer):
             if not isinstance(value, list):
                 raise serializers.ValidationError("El campo multimedia debe ser una lista")
         return value
+
+    def validate(self, attrs):
+        # Validación estructural de content_details según el tipo de contenido
+        if 'content_details' in attrs or 'content_type' in attrs:
+            content_type = attrs.get('content_type', getattr(self.instance, 'content_type', None))
+            content_details = attrs.get('content_details', getattr(self.instance, 'content_details', None))
+            errors = validate_content_details(content_type, content_details)
+            if errors:
+                raise serializers.ValidationError({'content_details': errors})
+        return attrs
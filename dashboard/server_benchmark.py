@@ -0,0 +1,173 @@
+"""
+Benchmark de concurrencia del servidor HTTP: WSGI (workers síncronos) frente a ASGI (uvicorn), ver
+gunicorn.conf.py y `manage.py bench_servers`.
+
+Cada modo se arranca con gunicorn en un proceso aparte contra la misma base de datos sintética y se
+le envían clientes que llegan a un ritmo fijo (`arrival_rate` por segundo, carga abierta). Una
+fracción (`slow_fraction`) son clientes lentos, como los de una red móvil con pérdidas sin un proxy
+con buffer delante: tardan `send_delay` segundos en enviar la petición, en varios trozos. Con workers
+síncronos un cliente lento ocupa un worker hasta que termina de enviar y los rápidos que llegan
+mientras tanto esperan detrás de él; con ASGI la espera no ocupa ningún worker. Se mide el tiempo
+total, las peticiones por segundo y los percentiles de latencia (de todos los clientes y de los
+rápidos) desde que cada cliente conecta.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from .benchmark import percentile
+
+MODES = ('wsgi', 'asgi')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def mode_available(mode):
+    """ASGI necesita uvicorn y uvicorn-worker (requirements.txt)"""
+    if mode != 'asgi':
+        return True
+    try:
+        import uvicorn_worker  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def start_server(mode, port, workers, env=None):
+    """Arranca gunicorn con gunicorn.conf.py en `mode`; devuelve el proceso"""
+    env = {
+        **os.environ,
+        **(env or {}),
+        'SERVER_MODE': mode,
+        'PORT': str(port),
+        'WEB_CONCURRENCY': str(workers),
+        'DJANGO_SETTINGS_MODULE': 'pmback.settings',
+    }
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+
+
+def stop_server(process, timeout=10):
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def wait_ready(port, process, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'El servidor terminó al arrancar: {process.stderr.read().decode(errors="replace")}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'El servidor no respondió en {timeout} s')
+
+
+async def slow_request(port, path, send_delay=0, timeout=120):
+    """Petición GET que tarda `send_delay` segundos en enviarse. Devuelve (código de estado, segundos); None si falla."""
+    started = time.perf_counter()
+    headers = [f'GET {path} HTTP/1.1\r\n', 'Host: 127.0.0.1\r\n', 'Accept: application/json\r\n', 'Connection: close\r\n\r\n']
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        try:
+            for index, header in enumerate(headers):
+                if index and send_delay:
+                    await asyncio.sleep(send_delay / (len(headers) - 1))
+                writer.write(header.encode())
+                await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout)
+        finally:
+            writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return None, time.perf_counter() - started
+    try:
+        status = int(response.split(b' ', 2)[1])
+    except (IndexError, ValueError):
+        status = None
+    return status, time.perf_counter() - started
+
+
+def is_slow(index, slow_fraction):
+    """Reparte los clientes lentos de forma uniforme entre los rápidos"""
+    return int((index + 1) * slow_fraction) > int(index * slow_fraction)
+
+
+async def run_load(port, paths, clients, send_delay=0, slow_fraction=0, arrival_rate=None):
+    """
+    Lanza `clients` peticiones repartidas entre `paths`, una cada 1 / arrival_rate segundos (todas a
+    la vez sin arrival_rate). Devuelve ([(estado, segundos, lento)], segundos totales).
+    """
+    started = time.perf_counter()
+
+    async def client(index):
+        if arrival_rate:
+            await asyncio.sleep(index / arrival_rate)
+        slow = is_slow(index, slow_fraction)
+        status, seconds = await slow_request(port, paths[index % len(paths)], send_delay if slow else 0)
+        return status, seconds, slow
+
+    results = await asyncio.gather(*[client(index) for index in range(clients)])
+    return results, time.perf_counter() - started
+
+
+def _latency(seconds):
+    latencies = sorted(value * 1000 for value in seconds)
+    if not latencies:
+        return None
+    return {
+        'p50': round(percentile(latencies, 50), 2),
+        'p95': round(percentile(latencies, 95), 2),
+        'max': round(latencies[-1], 2),
+    }
+
+
+def summarize(results, elapsed):
+    ok = sum(1 for status, _seconds, _slow in results if status == 200)
+    return {
+        'requests': len(results),
+        'ok': ok,
+        'errors': len(results) - ok,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(results) / elapsed, 2) if elapsed else None,
+        'latency_ms': _latency([seconds for _status, seconds, _slow in results]),
+        'fast_latency_ms': _latency([seconds for _status, seconds, slow in results if not slow]),
+    }
+
+
+def bench_mode(mode, paths, clients, workers, send_delay=0, slow_fraction=0, arrival_rate=None, env=None):
+    """Arranca el servidor en `mode`, calienta la caché con una petición por ruta y mide la carga"""
+    port = free_port()
+    process = start_server(mode, port, workers, env)
+    try:
+        wait_ready(port, process)
+        # Calentamiento: la caché de contenido local de cada worker se llena con las primeras peticiones
+        asyncio.run(run_load(port, paths, len(paths) * workers))
+        results, elapsed = asyncio.run(run_load(port, paths, clients, send_delay, slow_fraction, arrival_rate))
+    finally:
+        stop_server(process)
+    return {
+        'mode': mode,
+        'workers': workers,
+        'clients': clients,
+        'arrival_rate': arrival_rate,
+        'send_delay_s': send_delay,
+        'slow_fraction': slow_fraction,
+        **summarize(results, elapsed),
+    }
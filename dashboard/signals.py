@@ -0,0 +1,236 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .content_cache import CLASS_SCOPE, COURSE_SCOPE, CATALOG_SCOPE, bump_version
+from .derivatives import IMAGE_FIELDS, schedule_derivatives, variants_field
+from .file_cleanup import file_field_names, instance_files, record_files
+from .media_processing import MEDIA_FIELDS, schedule_media_jobs
+from .models import (
+    CourseModel, ClassModel, LayoutModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel,
+    CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel,
+    MultimediaBlockVideoModel, MultimediaBlockAudioModel, MultimediaBlockVideoEmbedModel,
+    MultimediaBlockAttachmentModel, MediaModel, ClassContentModel,
+)
+from .outline import schedule_refresh
+from .search import SEARCH_SOURCES, index_instance, move_class, remove_instance
+
+# Modelos hijos de una clase y el nombre del campo FK hacia ClassModel
+CLASS_CHILD_MODELS = {
+    LayoutModel: 'class_model_id',
+    MultipleChoiceModel: 'class_model_id',
+    TrueOrFalseModel: 'class_model_id',
+    OrderingTaskModel: 'class_model_id',
+    CategoriesTaskModel: 'class_model_id',
+    FillInTheGapsTaskModel: 'class_model_id',
+    VideoLayoutModel: 'class_model_id',
+    TextBlockLayoutModel: 'lesson_id',
+    MultimediaBlockVideoModel: 'class_model_id',
+    MultimediaBlockAudioModel: 'class_model_id',
+    MultimediaBlockVideoEmbedModel: 'class_model_id',
+    MultimediaBlockAttachmentModel: 'class_model_id',
+    ClassContentModel: 'class_id_id',
+}
+
+# Tareas con relación M2M a MediaModel
+MEDIA_TASK_MODELS = [TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel]
+
+
+def _bump(scope, pk=None):
+    # Se invalida de inmediato y otra vez al confirmar la transacción, para que una lectura
+    # concurrente no deje cacheados datos anteriores al commit bajo la versión nueva
+    bump_version(scope, pk)
+    transaction.on_commit(lambda: bump_version(scope, pk))
+
+
+def invalidate_class(class_id):
+    if class_id is not None:
+        _bump(CLASS_SCOPE, class_id)
+
+
+def invalidate_course(course_id):
+    if course_id is not None:
+        _bump(COURSE_SCOPE, course_id)
+    _bump(CATALOG_SCOPE)
+
+
+def invalidate_instance(instance):
+    """Invalida la caché que depende de `instance`, para cambios hechos con update() (sin señales)"""
+    if isinstance(instance, CourseModel):
+        invalidate_course(instance.pk)
+    elif isinstance(instance, ClassModel):
+        invalidate_class(instance.pk)
+        _bump(COURSE_SCOPE, instance.course_id)
+    elif type(instance) in CLASS_CHILD_MODELS:
+        invalidate_class(getattr(instance, CLASS_CHILD_MODELS[type(instance)]))
+
+
+@receiver([post_save, post_delete], sender=CourseModel)
+def course_changed(sender, instance, **kwargs):
+    invalidate_course(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ClassModel)
+def class_changed(sender, instance, **kwargs):
+    invalidate_class(instance.pk)
+    _bump(COURSE_SCOPE, instance.course_id)
+
+
+def class_child_changed(sender, instance, **kwargs):
+    invalidate_class(getattr(instance, CLASS_CHILD_MODELS[sender]))
+
+
+for _model in CLASS_CHILD_MODELS:
+    post_save.connect(class_child_changed, sender=_model, dispatch_uid=f'content_cache_{_model.__name__}_save')
+    post_delete.connect(class_child_changed, sender=_model, dispatch_uid=f'content_cache_{_model.__name__}_delete')
+
+
+def task_media_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # pre_clear: después del clear ya no se sabe qué tareas estaban enlazadas
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_class(instance.class_model_id)
+        return
+    # Cambio hecho desde el lado de MediaModel: se invalidan las clases de las tareas afectadas
+    task_model = next(model for model in MEDIA_TASK_MODELS if model.media.through is sender)
+    queryset = task_model.objects.filter(pk__in=pk_set) if pk_set else task_model.objects.filter(media=instance)
+    for class_id in queryset.values_list('class_model_id', flat=True).distinct():
+        invalidate_class(class_id)
+
+
+for _model in MEDIA_TASK_MODELS:
+    m2m_changed.connect(task_media_changed, sender=_model.media.through, dispatch_uid=f'content_cache_{_model.__name__}_media')
+
+
+# pre_delete: al llegar post_delete las filas M2M de la media ya se borraron
+@receiver([post_save, pre_delete], sender=MediaModel)
+def media_changed(sender, instance, **kwargs):
+    class_ids = set()
+    for model in MEDIA_TASK_MODELS:
+        class_ids.update(model.objects.filter(media=instance).values_list('class_model_id', flat=True))
+    for class_id in class_ids:
+        invalidate_class(class_id)
+
+
+def clear_stale_variants(sender, instance, **kwargs):
+    # Si la imagen cambió, los derivados anteriores ya no valen; post_save programa los nuevos
+    for field_name in IMAGE_FIELDS[sender]:
+        if variants_field(field_name) in instance.get_deferred_fields():
+            continue
+        manifest = getattr(instance, variants_field(field_name))
+        if manifest and manifest.get('source') != getattr(instance, field_name).name:
+            setattr(instance, variants_field(field_name), None)
+
+
+def image_saved(sender, instance, **kwargs):
+    deferred = instance.get_deferred_fields()
+    for field_name in IMAGE_FIELDS[sender]:
+        if field_name in deferred or variants_field(field_name) in deferred:
+            continue
+        if getattr(instance, field_name).name and not getattr(instance, variants_field(field_name)):
+            schedule_derivatives(instance, field_name)
+
+
+for _model in IMAGE_FIELDS:
+    pre_save.connect(clear_stale_variants, sender=_model, dispatch_uid=f'derivatives_{_model.__name__}_pre_save')
+    post_save.connect(image_saved, sender=_model, dispatch_uid=f'derivatives_{_model.__name__}_save')
+
+
+def clear_stale_media_info(sender, instance, **kwargs):
+    # Se descarta el análisis de los archivos que cambiaron; post_save encola el nuevo
+    if 'media_info' in instance.get_deferred_fields() or not instance.media_info:
+        return
+    instance.media_info = {
+        field_name: info for field_name, info in instance.media_info.items()
+        if field_name in MEDIA_FIELDS[sender] and info.get('source') == getattr(instance, field_name).name
+    } or None
+
+
+def media_saved(sender, instance, **kwargs):
+    deferred = instance.get_deferred_fields()
+    if 'media_info' in deferred:
+        return
+    media_info = instance.media_info or {}
+    for field_name in MEDIA_FIELDS[sender]:
+        if field_name in deferred or not getattr(instance, field_name).name:
+            continue
+        if field_name not in media_info:
+            schedule_media_jobs(instance, field_name)
+
+
+for _model in MEDIA_FIELDS:
+    pre_save.connect(clear_stale_media_info, sender=_model, dispatch_uid=f'media_jobs_{_model.__name__}_pre_save')
+    post_save.connect(media_saved, sender=_model, dispatch_uid=f'media_jobs_{_model.__name__}_save')
+
+
+def search_source_saved(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=[...]) que no toca el texto ni la clase (p. ej. media_info) no reindexa
+    kind_fields = next(fields + [fk] for model, fk, fields in SEARCH_SOURCES.values() if model is sender)
+    if update_fields is not None and not set(update_fields) & {*kind_fields, *(f'{name}_id' for name in kind_fields)}:
+        return
+    index_instance(instance)
+
+
+def search_source_deleted(sender, instance, **kwargs):
+    remove_instance(instance)
+
+
+for _model, _fk, _fields in SEARCH_SOURCES.values():
+    post_save.connect(search_source_saved, sender=_model, dispatch_uid=f'search_{_model.__name__}_save')
+    post_delete.connect(search_source_deleted, sender=_model, dispatch_uid=f'search_{_model.__name__}_delete')
+
+
+@receiver(post_save, sender=ClassModel, dispatch_uid='search_ClassModel_save')
+def search_class_saved(sender, instance, created, **kwargs):
+    if not created:
+        move_class(instance)
+
+
+# Campos de un contenido que aparecen en el índice del curso (outline.py)
+OUTLINE_CONTENT_FIELDS = {'class_id', 'tittle', 'content_type', 'order', 'image', 'video', 'audio', 'pdf', 'embed_video', 'multimedia'}
+
+
+@receiver([post_save, post_delete], sender=ClassContentModel, dispatch_uid='outline_ClassContentModel')
+def outline_content_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not OUTLINE_CONTENT_FIELDS & set(update_fields):
+        return
+    schedule_refresh(class_ids=[instance.class_id_id])
+
+
+@receiver(pre_save, sender=ClassModel, dispatch_uid='outline_ClassModel_pre_save')
+def outline_class_moving(sender, instance, update_fields=None, **kwargs):
+    # Curso anterior, para quitar la clase de su índice si cambia de curso
+    if instance._state.adding or (update_fields is not None and 'course' not in update_fields):
+        instance._outline_course_id = instance.course_id
+    else:
+        instance._outline_course_id = ClassModel.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=ClassModel, dispatch_uid='outline_ClassModel_save')
+def outline_class_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_outline_course_id', instance.course_id)
+    moved = [(previous, instance.pk)] if previous not in (None, instance.course_id) else []
+    schedule_refresh(class_ids=[instance.pk], removed=moved)
+
+
+@receiver(post_delete, sender=ClassModel, dispatch_uid='outline_ClassModel_delete')
+def outline_class_deleted(sender, instance, **kwargs):
+    schedule_refresh(removed=[(instance.course_id, instance.pk)])
+
+
+@receiver(post_save, sender=CourseModel, dispatch_uid='outline_CourseModel_save')
+def outline_course_saved(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(course_ids=[instance.pk])
+
+
+def files_deleted(sender, instance, **kwargs):
+    # Los archivos se borran después, por lotes (file_cleanup.py)
+    record_files(instance_files(instance))
+
+
+for _model in apps.get_app_config('dashboard').get_models():
+    if file_field_names(_model):
+        post_delete.connect(files_deleted, sender=_model, dispatch_uid=f'file_cleanup_{_model.__name__}')
@@ -0,0 +1,210 @@
+"""
+Almacenamiento direccionado por contenido para la media de la plataforma.
+
+Cada archivo se guarda una sola vez en blobs/<aa>/<bb>/<sha256><ext>, donde el nombre sale del hash
+de sus bytes: subir la misma portada o el mismo audio en 40 clases ocupa un único archivo, y una
+subida repetida termina en cuanto se calcula el hash, sin escribir nada. Cada save() suma una
+referencia en MediaBlobModel y cada delete() la resta; el archivo se borra con la última.
+
+El nombre "lógico" que recibe save() (upload_to + nombre original) solo aporta la extensión. Los
+archivos guardados antes de este backend siguen funcionando con su ruta de siempre.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+BLOB_PREFIX = 'blobs/'
+# Derivados de imagen (derivatives.variant_name): <original sin extensión>.w<ancho>.webp
+DERIVATIVE_SUFFIX = re.compile(r'\.w\d+\.webp$')
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def blob_name(sha256, original_name=''):
+    ext = os.path.splitext(original_name)[1].lower()
+    return f'{BLOB_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def _blob_model():
+    # El storage se instancia al cargar los settings, antes que los modelos
+    return apps.get_model('dashboard', 'MediaBlobModel')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide el hash en _save; nunca hay colisiones que resolver
+        return name
+
+    def _save(self, name, content):
+        sha256, size = self._hash(content)
+        name = blob_name(sha256, name)
+        if not self.exists(name):
+            self._write(name, content)
+        self.add_reference(name, sha256, size)
+        return name
+
+    def adopt(self, path, name, sha256=None):
+        """
+        Incorpora un archivo local ya completo (p. ej. una subida por partes) moviéndolo a su blob.
+        Si se conoce el sha256 no se vuelve a leer el archivo. Devuelve el nombre del blob.
+        """
+        if sha256 is None:
+            with open(path, 'rb') as source:
+                sha256, _size = self._hash(File(source))
+        size = os.path.getsize(path)
+        name = blob_name(sha256, name)
+        if self.exists(name):
+            os.remove(path)
+        else:
+            target = self.path(name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            file_move_safe(path, target, allow_overwrite=True)
+        self.add_reference(name, sha256, size)
+        return name
+
+    def save_alongside(self, name, content):
+        """Guarda un derivado de un blob (p. ej. una miniatura) con nombre fijo y sin contar referencias"""
+        self._write(name, content)
+        return name
+
+    def delete(self, name):
+        """Resta una referencia; el archivo solo se borra cuando no queda ninguna"""
+        # Los derivados de un blob no cuentan referencias (save_alongside)
+        if not is_blob(name) or DERIVATIVE_SUFFIX.search(name):
+            return super().delete(name)
+        model = _blob_model()
+        with transaction.atomic():
+            model.objects.filter(name=name).update(ref_count=F('ref_count') - 1)
+            remaining = model.objects.filter(name=name).values_list('ref_count', flat=True).first()
+            if remaining is not None and remaining > 0:
+                return
+            model.objects.filter(name=name).delete()
+        self._delete_blob(name)
+
+    def _delete_blob(self, name):
+        """Borra el archivo del blob y, si ningún otro blob comparte su hash, sus derivados"""
+        super().delete(name)
+        sha256 = os.path.splitext(os.path.basename(name))[0]
+        if _blob_model().objects.filter(sha256=sha256).exists():
+            return
+        directory = os.path.dirname(self.path(name))
+        if not os.path.isdir(directory):
+            return
+        for entry in os.listdir(directory):
+            if entry.startswith(f'{sha256}.w') and entry.endswith('.webp'):
+                os.remove(os.path.join(directory, entry))
+
+    def add_reference(self, name, sha256=None, size=None, count=1):
+        """Suma `count` referencias al blob (p. ej. al copiar filas que apuntan a él)"""
+        if not is_blob(name):
+            return
+        model = _blob_model()
+        if model.objects.filter(name=name).update(ref_count=F('ref_count') + count):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(
+                    name=name,
+                    sha256=sha256 or os.path.basename(name).split('.')[0],
+                    size=size if size is not None else self.size(name),
+                    ref_count=count,
+                )
+        except IntegrityError:
+            # Otra petición creó el registro a la vez
+            model.objects.filter(name=name).update(ref_count=F('ref_count') + count)
+
+    def recount_references(self):
+        """
+        Recalcula ref_count a partir de los campos de archivo de todos los modelos y de las listas
+        `multimedia` de ClassContentModel, y borra los blobs que ya nadie usa. Corrige la deriva que
+        dejan las filas borradas o los archivos reemplazados sin pasar por delete().
+        Devuelve (blobs actualizados, blobs eliminados).
+        """
+        counts = {}
+        for name in _referenced_names():
+            if is_blob(name):
+                counts[name] = counts.get(name, 0) + 1
+
+        updated = deleted = 0
+        model = _blob_model()
+        for blob in model.objects.all().iterator():
+            count = counts.get(blob.name, 0)
+            if count == 0:
+                blob.delete()
+                self._delete_blob(blob.name)
+                deleted += 1
+            elif count != blob.ref_count:
+                model.objects.filter(pk=blob.pk).update(ref_count=count)
+                updated += 1
+        return updated, deleted
+
+    def _hash(self, content):
+        digest = hashlib.sha256()
+        size = 0
+        content.seek(0)
+        for chunk in content.chunks(HASH_BLOCK_SIZE):
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _write(self, name, content):
+        """Escribe el blob de forma atómica: archivo temporal en el mismo directorio y rename"""
+        target = self.path(name)
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+
+        if hasattr(content, 'temporary_file_path'):
+            # Subida grande que Django ya dejó en disco: se mueve en lugar de copiarse
+            file_move_safe(content.temporary_file_path(), target, allow_overwrite=True)
+            return
+
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as target_file:
+                content.seek(0)
+                for chunk in content.chunks(HASH_BLOCK_SIZE):
+                    target_file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            # Si otra petición escribió el mismo blob, los bytes son idénticos: reemplazar es inocuo
+            os.replace(temporary, target)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+def _referenced_names():
+    """Todas las rutas de archivo guardadas en la base de datos, con repeticiones"""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                yield from model.objects.exclude(**{field.attname: ''}).exclude(
+                    **{f'{field.attname}__isnull': True}
+                ).values_list(field.attname, flat=True).iterator()
+
+    content_model = apps.get_model('dashboard', 'ClassContentModel')
+    for multimedia in content_model.objects.exclude(multimedia__isnull=True).values_list('multimedia', flat=True).iterator():
+        yield from multimedia_paths(multimedia)
+
+
+def multimedia_paths(multimedia):
+    """Rutas de archivo de una lista `multimedia` de ClassContentModel"""
+    for item in multimedia if isinstance(multimedia, list) else []:
+        file_info = item.get('file_info') if isinstance(item, dict) else None
+        if isinstance(file_info, dict) and file_info.get('path'):
+            yield file_info['path']
@@ -0,0 +1,171 @@
+"""
+Generador de cursos sintéticos para benchmarks y pruebas de carga.
+
+Los contenidos recorren todos los tipos de ClassContentModel.CONTENT_TYPES con los payloads de
+SAMPLE_CONTENT_DETAILS (la forma de dashboard/json_example/); los bloques multimedia llevan la lista
+`multimedia` de los ejemplos. Todo se inserta con bulk_create, así que generar miles de filas tarda
+segundos. La media de las tareas apunta a unos pocos archivos compartidos, que write_media_files
+guarda en el storage (pensado para un MEDIA_ROOT temporal).
+"""
+from itertools import cycle, islice
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .content_samples import SAMPLE_CONTENT_DETAILS
+from .models import (
+    CourseModel, ClassModel, LayoutModel, MediaModel, MultipleChoiceModel, TrueOrFalseModel,
+    OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel,
+    TextBlockLayoutModel, MultimediaBlockVideoModel, ClassContentModel,
+)
+from .search import index_objects
+from .signals import invalidate_class, invalidate_course
+
+CONTENT_TYPES = [content_type for content_type, _label in ClassContentModel.CONTENT_TYPES]
+
+# Lista `multimedia` de los bloques multimedia, como en json_example/multimedia.json
+SAMPLE_MULTIMEDIA = {
+    'video': [
+        {'media_type': 'video', 'file': 'ruta/a/la/video.mp4', 'transcription': 'Transcripción del video'},
+        {'media_type': 'image', 'file': 'ruta/a/la/imagen.jpg'},
+    ],
+    'audio': [
+        {'media_type': 'audio', 'file': 'ruta/a/la/audio.mp3', 'transcription': 'Transcripción del audio'},
+    ],
+    'video_embed': [
+        {'media_type': 'video', 'url': 'https://www.example.com/video.mp4'},
+        {'media_type': 'image', 'file': 'ruta/a/la/imagen.jpg'},
+    ],
+    'attachment': [
+        {'media_type': 'pdf', 'file': 'ruta/a/archivo.pdf', 'text': 'Texto del archivo pdf'},
+    ],
+}
+
+MEDIA_FILES = {
+    'image': 'task_media/synthetic.png',
+    'audio': 'task_media/synthetic.mp3',
+    'video': 'task_media/synthetic.mp4',
+}
+MEDIA_FILE_SIZE = 256 * 1024
+
+
+def write_media_files(size=MEDIA_FILE_SIZE):
+    """
+    Guarda un archivo de relleno de `size` bytes por tipo de media y devuelve {tipo: nombre en el
+    storage}, para pasarlo a generate_courses(media_files=...).
+    """
+    return {
+        media_type: default_storage.save(name, ContentFile(media_type.encode() + b'\0' * size))
+        for media_type, name in MEDIA_FILES.items()
+    }
+
+
+def _content_object(class_instance, index):
+    """Bloque de contenido; los tipos se recorren en orden para cubrirlos todos"""
+    content_type = CONTENT_TYPES[index % len(CONTENT_TYPES)]
+    return ClassContentModel(
+        class_id=class_instance,
+        content_type=content_type,
+        tittle=f'Contenido {index}',
+        instructions='Instrucciones para el contenido',
+        content_details=SAMPLE_CONTENT_DETAILS[content_type],
+        multimedia=SAMPLE_MULTIMEDIA.get(content_type),
+        order=index,
+    )
+
+
+def _task_objects(class_instance, index):
+    """Una tarea de cada tipo, con la forma que usan los reproductores"""
+    return [
+        MultipleChoiceModel(
+            class_model=class_instance, tittle=f'Opción múltiple {index}', order=index,
+            question={'answers': [{'text': 'A', 'is_correct': True}, {'text': 'B', 'is_correct': False}]},
+        ),
+        TrueOrFalseModel(
+            class_model=class_instance, order=index,
+            questions={'questions': [{'statement': 'La Tierra es plana.', 'state': 2}]},
+        ),
+        OrderingTaskModel(
+            class_model=class_instance, order=index,
+            items={'items': [{'id': 1, 'description': 'Primero'}, {'id': 2, 'description': 'Segundo'}]},
+        ),
+        CategoriesTaskModel(
+            class_model=class_instance, order=index, instructions='Agrupa las palabras',
+            categories={'categories': [{'name': 'Animales', 'items': ['perro', 'gato']}]},
+        ),
+        FillInTheGapsTaskModel(
+            class_model=class_instance, order=index, text_with_gaps='The {gap} is round.', keywords=['Earth'],
+        ),
+    ]
+
+
+def generate_courses(courses=1, classes=5, contents=40, media=10, tasks=3, media_files=None):
+    """
+    Crea `courses` cursos con `classes` clases cada uno. Cada clase recibe `contents` bloques de
+    contenido, `tasks` tareas de cada tipo y `media` objetos MediaModel repartidos entre sus tareas.
+    `media_files` indica el archivo de cada tipo de media (por defecto, rutas de MEDIA_FILES).
+    Devuelve la lista de cursos creados.
+    """
+    media_files = media_files or MEDIA_FILES
+    created = []
+    with transaction.atomic():
+        for course_index in range(courses):
+            course = CourseModel.objects.create(
+                course_name=f'Curso sintético {course_index}',
+                description='Curso generado para benchmarks',
+                level='A1',
+                bullet_points=['punto 1', 'punto 2'],
+            )
+            class_instances = ClassModel.objects.bulk_create([
+                ClassModel(class_name=f'Clase {index}', description='Clase sintética', course=course)
+                for index in range(classes)
+            ])
+
+            for class_instance in class_instances:
+                LayoutModel.objects.create(class_model=class_instance, tittle='Layout principal')
+                VideoLayoutModel.objects.create(class_model=class_instance, tittle='Video de la clase')
+                TextBlockLayoutModel.objects.create(lesson=class_instance, tittle='Texto de la clase', content='Contenido')
+                MultimediaBlockVideoModel.objects.create(class_model=class_instance, tittle='Bloque de video')
+
+                ClassContentModel.objects.bulk_create([
+                    _content_object(class_instance, index) for index in range(contents)
+                ])
+
+                task_objects = []
+                for index in range(tasks):
+                    task_objects.extend(_task_objects(class_instance, index))
+                media_objects = MediaModel.objects.bulk_create([
+                    MediaModel(media_type=media_type, file=media_files[media_type])
+                    for media_type in islice(cycle(media_files), media)
+                ])
+                _create_tasks_with_media(task_objects, media_objects)
+
+            created.append((course, class_instances))
+
+    # bulk_create no dispara señales
+    index_objects('content', ClassContentModel.objects.filter(class_id__course__in=[course for course, _classes in created]))
+    for course, class_instances in created:
+        for class_instance in class_instances:
+            invalidate_class(class_instance.id)
+        invalidate_course(course.id)
+    return [course for course, _class_instances in created]
+
+
+def _create_tasks_with_media(task_objects, media_objects):
+    by_model = {}
+    for task in task_objects:
+        by_model.setdefault(type(task), []).append(task)
+
+    for model, tasks in by_model.items():
+        tasks = model.objects.bulk_create(tasks)
+        if not media_objects or not hasattr(model, 'media'):
+            continue
+        # Reparte la media de la clase entre las tareas de forma cíclica
+        through = model.media.through
+        task_column = f'{model._meta.model_name}_id'
+        through.objects.bulk_create([
+            through(**{task_column: task.id, 'mediamodel_id': media_objects[(index + offset) % len(media_objects)].id})
+            for index, task in enumerate(tasks)
+            for offset in range(min(2, len(media_objects)))
+        ])
@@ -0,0 +1,28 @@
+from django import template
+
+from ..derivatives import variants_field
+
+register = template.Library()
+
+
+def _variants(instance, field_name):
+    manifest = getattr(instance, variants_field(field_name), None)
+    return manifest.get('variants') if manifest else None
+
+
+@register.filter
+def thumbnail_url(instance, field_name='cover'):
+    """URL del derivado más pequeño de instance.<field_name>, o de la imagen original si aún no hay"""
+    image = getattr(instance, field_name)
+    variants = _variants(instance, field_name)
+    if variants:
+        return image.storage.url(variants[0]['name'])
+    return image.url if image else ''
+
+
+@register.filter
+def srcset(instance, field_name='cover'):
+    """Atributo srcset con los derivados WebP de instance.<field_name> ('' si aún no hay)"""
+    image = getattr(instance, field_name)
+    variants = _variants(instance, field_name) or []
+    return ', '.join(f"{image.storage.url(item['name'])} {item['width']}w" for item in variants)
@@ -1,3 +1,2127 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+import tempfile
+import unittest
+import wave
+import zipfile
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pmback.apiMoodle import MoodleAPI, MoodleError, encode_params
+from pmback.database import database_config, database_url
+
+from . import async_views
+from .benchmark import ENDPOINTS, compare_results, percentile, run_benchmark
+from .bundles import MAX_BUNDLE_QUERIES, load_class_bundle
+from .content_samples import SAMPLE_CONTENT_DETAILS
+from .content_validators import SCHEMAS, validate_content_details
+from .content_cache import get_cache
+from .derivatives import generate_derivatives, variant_name
+from .jobs import HANDLERS, claim_jobs, enqueue, job, run_job, run_pending
+from .grades import invalidate_grades
+from .grading import CONTENT_SLOTS, NotGradable, compile_content, load_key
+from . import moodle_sync
+from .moodle_sync import run_sync
+from .cloning import clone_class, clone_course
+from .deletion import delete_classes, delete_courses
+from .file_cleanup import find_orphan_files, sweep_files
+from .outline import get_outline
+from .reorder import reorder
+from .search import fts5_query, parse_query, rebuild_index, search
+from .server_benchmark import is_slow, summarize
+from .storage import blob_name
+from .synthetic import generate_courses
+from .uploads import UploadConflict, append_chunk, delete_expired_uploads, partial_path
+from .models import (
+    CourseModel, ClassModel, LayoutModel, MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel,
+    CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel, MediaModel,
+    ClassContentModel, MultimediaBlockVideoModel, ChunkedUploadModel, MediaBlobModel, JobModel,
+    MoodleCourseSyncModel, MoodleClassSyncModel, SearchDocumentModel, CourseOutlineModel, FileCleanupModel,
+)
+
+
+def setUpModule():
+    # La caché de contenido por defecto es en disco y sobrevive entre ejecuciones: se empieza vacía
+    get_cache().clear()
+
+
+def create_class(size=1, course=None):
+    """Crea una clase con `size` elementos de cada tipo (layouts, tareas, bloques y contenidos)"""
+    course = course or CourseModel.objects.create(course_name='Curso de prueba')
+    class_instance = ClassModel.objects.create(class_name='Clase de prueba', course=course)
+    shared_media = MediaModel.objects.create(media_type='image', file='task_media/shared.png')
+    for i in range(size):
+        LayoutModel.objects.create(class_model=class_instance, tittle=f'Layout {i}')
+        MultipleChoiceModel.objects.create(
+            class_model=class_instance, tittle=f'MC {i}', order=i,
+            question={'answers': [{'text': 'A', 'is_correct': True}, {'text': 'B', 'is_correct': False}]},
+        )
+        own_media = MediaModel.objects.create(media_type='audio', file=f'task_media/audio_{i}.mp3')
+        tasks = [
+            TrueOrFalseModel.objects.create(
+                class_model=class_instance, order=i,
+                questions={'questions': [{'statement': 'S', 'state': 1}]},
+            ),
+            OrderingTaskModel.objects.create(
+                class_model=class_instance, order=i,
+                items={'items': [{'id': 1, 'description': 'A'}, {'id': 2, 'description': 'B'}]},
+            ),
+            CategoriesTaskModel.objects.create(
+                class_model=class_instance, order=i, instructions='Agrupa',
+                categories={'categories': [{'name': 'C1', 'items': ['a', 'b']}]},
+            ),
+            FillInTheGapsTaskModel.objects.create(
+                class_model=class_instance, order=i, text_with_gaps='The {gap} is round.', keywords=['Earth'],
+            ),
+        ]
+        for task in tasks:
+            task.media.add(shared_media, own_media)
+        VideoLayoutModel.objects.create(class_model=class_instance, tittle=f'Video {i}')
+        TextBlockLayoutModel.objects.create(lesson=class_instance, tittle=f'Texto {i}', content='Contenido')
+        ClassContentModel.objects.create(
+            class_id=class_instance, content_type='text_block', tittle=f'Bloque {i}', order=i,
+            content_details={'text': f'Bloque {i}'},
+        )
+    return class_instance
+
+
+class ClassBundleTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        small = create_class(size=1)
+        large = create_class(size=25)
+
+        with self.assertNumQueries(MAX_BUNDLE_QUERIES):
+            load_class_bundle(small.id)
+        with self.assertNumQueries(MAX_BUNDLE_QUERIES):
+            load_class_bundle(large.id)
+
+    def test_bundle_endpoint_within_query_budget(self):
+        class_instance = create_class(size=10)
+        with self.assertNumQueries(MAX_BUNDLE_QUERIES):
+            response = self.client.get(f'/dashboard/api/classes/{class_instance.id}/bundle/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['class']['id'], class_instance.id)
+        self.assertEqual(len(data['layouts']), 10)
+        self.assertEqual(len(data['fill_in_the_gaps_tasks']), 10)
+        self.assertEqual(len(data['contents']), 10)
+        # La media compartida aparece una sola vez
+        self.assertEqual(len(data['media']), 11)
+
+    def test_class_tasks_view_uses_bundle(self):
+        class_instance = create_class(size=5)
+        with self.assertNumQueries(MAX_BUNDLE_QUERIES):
+            response = self.client.get(f'/dashboard/api/classes/{class_instance.id}/tasks/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(len(body['task_layouts']), 5)
+        self.assertEqual(len(body['true_or_false']), 5)
+        self.assertEqual(len(body['media']), 6)
+
+    def test_missing_class_returns_404(self):
+        response = self.client.get('/dashboard/api/classes/999/bundle/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentCacheTests(TestCase):
+    # Con la respuesta en caché solo queda la consulta agregada que calcula el ETag
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.class_instance = create_class(size=3)
+
+    def get_contents(self):
+        return self.client.get(f'/dashboard/api/class-contents/?class_id={self.class_instance.id}')
+
+    def test_class_contents_served_from_cache_until_changed(self):
+        first = self.get_contents()
+        with self.assertNumQueries(1):
+            second = self.get_contents()
+        self.assertEqual(first.json(), second.json())
+
+        content = self.class_instance.contents.first()
+        content.tittle = 'Nuevo título'
+        content.save()
+
+        titles = [item['tittle'] for item in self.get_contents().json()['data']]
+        self.assertIn('Nuevo título', titles)
+
+    def test_other_classes_keep_their_cache(self):
+        other = create_class(size=1)
+        self.get_contents()
+        ClassContentModel.objects.create(class_id=other, content_type='text_block', order=9)
+        with self.assertNumQueries(1):
+            self.get_contents()
+
+    def test_task_media_change_invalidates_class_tasks(self):
+        url = f'/dashboard/api/classes/{self.class_instance.id}/tasks/'
+        self.assertEqual(len(self.client.get(url).json()['media']), 4)
+
+        new_media = MediaModel.objects.create(media_type='video', file='task_media/new.mp4')
+        self.class_instance.ordering_tasks.first().media.add(new_media)
+        self.assertEqual(len(self.client.get(url).json()['media']), 5)
+
+        new_media.delete()
+        self.assertEqual(len(self.client.get(url).json()['media']), 4)
+
+    def test_course_list_invalidated_by_course_save(self):
+        self.client.get('/dashboard/api/courses/')
+        with self.assertNumQueries(1):
+            self.client.get('/dashboard/api/courses/')
+
+        CourseModel.objects.create(course_name='Otro curso')
+        names = [course['course_name'] for course in self.client.get('/dashboard/api/courses/').json()]
+        self.assertIn('Otro curso', names)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'content': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+            }
+            with override_settings(CACHES=caches):
+                self.get_contents()
+                with self.assertNumQueries(1):
+                    self.get_contents()
+                self.class_instance.contents.first().delete()
+                self.assertEqual(len(self.get_contents().json()['data']), 2)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.class_instance = create_class(size=3)
+        self.url = f'/dashboard/api/class-contents/?class_id={self.class_instance.id}'
+
+    def test_etag_returns_304_without_serializing(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # Un listado se revalida solo con el ETag: MAX(updated_at) no cambia al borrar una fila
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_etag_changes_when_content_changes(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.class_instance.contents.first().delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['data']), 2)
+
+    def test_if_modified_since(self):
+        url = f'/dashboard/api/courses/{self.class_instance.course_id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        # En un listado If-Modified-Since no basta: tras un borrado se devuelve la lista nueva
+        self.class_instance.contents.first().delete()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']), 2)
+
+    def test_course_detail_etag(self):
+        url = f'/dashboard/api/courses/{self.class_instance.course_id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/dashboard/api/courses/999/').status_code, 404)
+
+
+class PaginationAndFieldsTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.class_instance = create_class(size=0)
+        # Varios bloques con el mismo order para comprobar el desempate por id
+        for i in range(7):
+            ClassContentModel.objects.create(
+                class_id=self.class_instance, content_type='text_block', tittle=f'Bloque {i}', order=i // 2,
+                content_details={'text': 'x' * 100},
+            )
+
+    def walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            body = self.client.get(url).json()
+            ids.extend(item['id'] for item in body['data'])
+            url = body['next']
+            pages += 1
+        return ids, pages
+
+    def test_cursor_pagination_walks_every_row_once(self):
+        expected = list(self.class_instance.contents.order_by('order', 'id').values_list('id', flat=True))
+        ids, pages = self.walk(f'/dashboard/api/class-contents/?class_id={self.class_instance.id}&page_size=3')
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_unpaginated_list_unchanged(self):
+        body = self.client.get(f'/dashboard/api/class-contents/?class_id={self.class_instance.id}').json()
+        self.assertEqual(len(body['data']), 7)
+        self.assertNotIn('next', body)
+
+    def test_classes_paginated_by_created_at_without_count(self):
+        course = self.class_instance.course
+        for i in range(4):
+            ClassModel.objects.create(class_name=f'Extra {i}', course=course)
+        expected = list(ClassModel.objects.filter(course=course).order_by('created_at', 'id').values_list('id', flat=True))
+        ids, _pages = self.walk(f'/dashboard/api/classes/?course_id={course.id}&page_size=2')
+        self.assertEqual(ids, expected)
+
+        with CaptureQueriesContext(connection) as queries:
+            body = self.client.get(f'/dashboard/api/classes/?course_id={course.id}').json()
+        self.assertEqual(body['total'], 5)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_video_blocks_paginated(self):
+        for i in range(3):
+            MultimediaBlockVideoModel.objects.create(class_model=self.class_instance, order=3 - i)
+        ids, pages = self.walk('/dashboard/api/multimediablockvideos/?page_size=2')
+        self.assertEqual(ids, list(MultimediaBlockVideoModel.objects.order_by('order', 'id').values_list('id', flat=True)))
+        self.assertEqual(pages, 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/dashboard/api/class-contents/?cursor=nope')
+        self.assertEqual(response.status_code, 400)
+
+    def test_fields_limits_payload_and_columns(self):
+        url = f'/dashboard/api/class-contents/?class_id={self.class_instance.id}&fields=id,tittle'
+        with CaptureQueriesContext(connection) as queries:
+            body = self.client.get(url).json()
+        self.assertEqual(set(body['data'][0]), {'id', 'tittle'})
+        select = [query['sql'] for query in queries.captured_queries if 'tittle' in query['sql']]
+        self.assertTrue(select)
+        self.assertNotIn('content_details', select[0])
+
+
+class CourseExportTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.class_instance = create_class(size=2)
+        self.course = self.class_instance.course
+        path = default_storage.save('content_audios/clip.mp3', ContentFile(b'ID3-audio-bytes'))
+        content = self.class_instance.contents.first()
+        content.audio = path
+        content.save()
+        self.audio_path = path
+
+    def read_records(self, lines):
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def test_ndjson_export_contains_whole_tree(self):
+        response = self.client.get(f'/dashboard/api/courses/{self.course.id}/export/?export_format=ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        records = self.read_records(b''.join(response.streaming_content).decode('utf-8').splitlines())
+
+        models = [record['model'] for record in records]
+        self.assertEqual(models[0], 'dashboard.coursemodel')
+        self.assertEqual(models.count('dashboard.classcontentmodel'), 2)
+        self.assertEqual(models.count('dashboard.fillinthegapstaskmodel'), 2)
+        self.assertEqual(models.count('dashboard.mediamodel'), 3)
+        self.assertEqual(models.count('dashboard.trueorfalsemodel_media'), 4)
+        content = next(record for record in records if record['model'] == 'dashboard.classcontentmodel')
+        self.assertEqual(content['fields']['class_id'], self.class_instance.id)
+
+    def test_zip_export_includes_media_files(self):
+        response = self.client.get(f'/dashboard/api/courses/{self.course.id}/export/')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+        self.assertIn('course.ndjson', archive.namelist())
+        self.assertEqual(archive.read('media/' + self.audio_path), b'ID3-audio-bytes')
+        records = self.read_records(archive.read('course.ndjson').decode('utf-8').splitlines())
+        self.assertEqual(records[0]['pk'], self.course.id)
+
+    def test_other_courses_are_not_exported(self):
+        other = create_class(size=1)
+        response = self.client.get(f'/dashboard/api/courses/{self.course.id}/export/?export_format=ndjson')
+        records = self.read_records(b''.join(response.streaming_content).decode('utf-8').splitlines())
+        self.assertNotIn(other.id, [record['pk'] for record in records if record['model'] == 'dashboard.classmodel'])
+
+    def test_missing_course(self):
+        self.assertEqual(self.client.get('/dashboard/api/courses/999/export/').status_code, 404)
+
+    def test_management_command(self):
+        output = os.path.join(self.media_root.name, 'export.zip')
+        call_command('export_course', self.course.id, output=output, chunk_size=1, stderr=io.StringIO())
+        with zipfile.ZipFile(output) as archive:
+            self.assertIn('media/' + self.audio_path, archive.namelist())
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.class_instance = create_class(size=0)
+
+    def ndjson(self, rows):
+        return '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+
+    def post(self, rows, query=''):
+        return self.client.post(
+            f'/dashboard/api/class-contents/bulk-import/{query}',
+            data=self.ndjson(rows), content_type='application/x-ndjson',
+        )
+
+    def test_imports_valid_rows_and_reports_invalid_ones(self):
+        rows = [
+            {'class_id': self.class_instance.id, 'content_type': 'true_false', 'tittle': 'V/F',
+             'content_details': {'questions': [{'statement': 'S', 'state': 1}]}},
+            {'class_model': self.class_instance.id, 'content_type': 'video', 'title': 'Video',
+             'multimedia': [{'media_type': 'video', 'file': 'ruta/a/la/video.mp4'}]},
+            '{no es json',
+            {'class_id': self.class_instance.id, 'content_type': 'desconocido'},
+            {'class_id': 999, 'content_type': 'text_block'},
+            {'class_id': self.class_instance.id, 'content_type': 'audio', 'multimedia': [{'media_type': 'gif'}]},
+        ]
+        response = self.post(rows)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()['data']
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4, 5, 6])
+        self.assertIn('class_id', report['errors'][2]['errors'])
+
+        contents = list(self.class_instance.contents.order_by('order'))
+        self.assertEqual([content.tittle for content in contents], ['V/F', 'Video'])
+        self.assertEqual([content.order for content in contents], [0, 1])
+
+    def test_batches_use_bulk_inserts(self):
+        rows = [{'content_type': 'text_block', 'content_details': {'textos': [{'texto': str(i)}]}} for i in range(250)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(rows, query=f'?class_id={self.class_instance.id}&batch_size=100')
+        self.assertEqual(response.json()['data']['created'], 250)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        # bulk_create puede partir cada lote según el límite de parámetros de SQLite
+        self.assertLessEqual(len(inserts), 10)
+        self.assertEqual(self.class_instance.contents.count(), 250)
+
+    def test_import_invalidates_class_cache(self):
+        url = f'/dashboard/api/class-contents/?class_id={self.class_instance.id}'
+        self.assertEqual(len(self.client.get(url).json()['data']), 0)
+        self.post([{'class_id': self.class_instance.id, 'content_type': 'text_block'}])
+        self.assertEqual(len(self.client.get(url).json()['data']), 1)
+
+    def test_invalid_encoding_and_batch_size(self):
+        valid = json.dumps({'class_id': self.class_instance.id, 'content_type': 'text_block'}).encode()
+        response = self.client.post(
+            '/dashboard/api/class-contents/bulk-import/', data=b'\xff\xfe{}\n' + valid,
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, 200)
+        report = response.json()['data']
+        self.assertEqual((report['created'], report['errors'][0]['line']), (1, 1))
+
+        for batch_size in ('x', '0'):
+            response = self.post([valid.decode()], query=f'?batch_size={batch_size}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('batch_size', response.json()['campos_con_error'])
+
+    def test_imported_blob_paths_add_references(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            blob = default_storage.save('content_images/foto.png', ContentFile(b'imagen importada'))
+            row = {'class_id': self.class_instance.id, 'content_type': 'text_block', 'image': blob,
+                   'multimedia': [{'media_type': 'image', 'file_info': {'path': blob}}]}
+            missing = dict(row, image=blob.replace('.png', '.jpg'), multimedia=None)
+            report = self.post([row, row, missing]).json()['data']
+            self.assertEqual((report['created'], report['errors'][0]['line']), (2, 3))
+            self.assertIn('image', report['errors'][0]['errors'])
+            # La subida original más la imagen y la entrada de multimedia de cada fila importada
+            self.assertEqual(MediaBlobModel.objects.get(name=blob).ref_count, 5)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as source:
+            source.write(self.ndjson([{'content_type': 'accordion', 'content_details': SAMPLE_CONTENT_DETAILS['accordion']}] * 3))
+        self.addCleanup(os.remove, source.name)
+        call_command('import_class_contents', source.name, class_id=self.class_instance.id, stdout=io.StringIO())
+        self.assertEqual(self.class_instance.contents.count(), 3)
+
+
+class ContentValidatorTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.class_instance = create_class(size=0)
+
+    def test_every_content_type_has_a_validator_and_sample(self):
+        content_types = set(dict(ClassContentModel.CONTENT_TYPES))
+        self.assertEqual(set(SCHEMAS), content_types)
+        self.assertEqual(set(SAMPLE_CONTENT_DETAILS), content_types)
+        for content_type, details in SAMPLE_CONTENT_DETAILS.items():
+            self.assertEqual(validate_content_details(content_type, details), [], content_type)
+
+    def test_reports_paths_of_structural_errors(self):
+        errors = validate_content_details('multiple_choice', {
+            'questions': [{'question': 'Q', 'answers': [{'text': 'A', 'is_correct': 'yes'}]}, {'answers': []}],
+        })
+        self.assertEqual(errors, [
+            'questions[0].answers[0].is_correct: debe ser true o false',
+            'questions[1].question: campo obligatorio',
+            'questions[1].answers: debe tener al menos 1 elemento(s)',
+        ])
+        self.assertTrue(validate_content_details('true_false', {'questions': [{'statement': 'S', 'state': 4}]}))
+        self.assertTrue(validate_content_details('timeline', ['no', 'es', 'objeto']))
+
+    def test_create_and_update_are_validated(self):
+        url = '/dashboard/api/class-contents/'
+        response = self.client.post(url, {
+            'class_id': self.class_instance.id, 'content_type': 'ordering',
+            'content_details': {'ordering': [{'text': 'A'}]},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content_details', response.json()['campos_con_error'])
+
+        response = self.client.post(url, {
+            'class_id': self.class_instance.id, 'content_type': 'ordering',
+            'content_details': SAMPLE_CONTENT_DETAILS['ordering'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        content_id = response.json()['data']['data']['id']
+
+        # Cambiar solo el tipo revalida el content_details guardado
+        response = self.client.patch(f'{url}{content_id}/', {'content_type': 'matching'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ClassContentModel.objects.get(pk=content_id).content_type, 'ordering')
+
+    def test_validation_cost_per_block(self):
+        # Micro-benchmark con margen amplio para no depender de la máquina: unos pocos µs por bloque
+        import timeit
+        samples = [(content_type, details) for content_type, details in SAMPLE_CONTENT_DETAILS.items() if details]
+        rounds = 200
+        elapsed = timeit.timeit(
+            lambda: [validate_content_details(content_type, details) for content_type, details in samples],
+            number=rounds,
+        )
+        per_block_us = elapsed / (rounds * len(samples)) * 1e6
+        self.assertLess(per_block_us, 100)
+
+
+class ReorderTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.class_instance = create_class(size=30)
+
+    def url(self, target):
+        return f'/dashboard/api/classes/{self.class_instance.id}/reorder/{target}/'
+
+    def test_reorder_contents_in_one_update(self):
+        contents = list(self.class_instance.contents.order_by('order', 'id'))
+        # Mueve el último bloque al principio
+        new_order = [contents[-1]] + contents[:-1]
+        payload = [{'id': content.id, 'order': index} for index, content in enumerate(new_order)]
+
+        contents_url = f'/dashboard/api/class-contents/?class_id={self.class_instance.id}'
+        etag = self.client.get(contents_url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url('contents'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['updated'], 30)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(
+            list(self.class_instance.contents.order_by('order', 'id').values_list('id', flat=True)),
+            [content.id for content in new_order],
+        )
+        # El orden nuevo se ve de inmediato, sin quedarse en caché ni en el ETag anterior
+        response = self.client.get(contents_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'][0]['id'], contents[-1].id)
+
+    def test_reorder_tasks_with_pairs(self):
+        tasks = list(self.class_instance.fill_in_the_gaps_tasks.order_by('order'))
+        payload = [[task.id, len(tasks) - index] for index, task in enumerate(tasks)]
+        response = self.client.patch(self.url('fill_in_the_gaps'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.class_instance.fill_in_the_gaps_tasks.order_by('order').first().id, tasks[-1].id)
+
+    def test_rejects_foreign_and_duplicated_ids(self):
+        other = create_class(size=1)
+        foreign = other.contents.first()
+        own = self.class_instance.contents.first()
+
+        response = self.client.post(self.url('contents'), [[own.id, 5], [foreign.id, 0]], format='json')
+        self.assertEqual(response.status_code, 400)
+        own.refresh_from_db()
+        self.assertEqual(own.order, 0)
+
+        response = self.client.post(self.url('contents'), [[own.id, 1], [own.id, 2]], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_target_and_class(self):
+        self.assertEqual(self.client.post(self.url('layouts'), [[1, 0]], format='json').status_code, 404)
+        self.assertEqual(self.client.post('/dashboard/api/classes/999/reorder/contents/', [[1, 0]], format='json').status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class QueryPlanTests(TestCase):
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada SELECT de los endpoints calientes y falla si alguno
+    recorre una tabla completa (SCAN) o tiene que ordenar en memoria lo que un índice ya da ordenado.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        # Varias clases y cursos para que el planificador tenga algo que filtrar
+        self.class_instance = create_class(size=5)
+        create_class(size=5)
+
+    def plans_for(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append((query['sql'], [row[3] for row in cursor.fetchall()]))
+        self.assertTrue(plans, url)
+        return plans
+
+    def assertNoTableScan(self, url):
+        for sql, plan in self.plans_for(url):
+            scans = [step for step in plan if step.startswith('SCAN')]
+            self.assertFalse(scans, f'{url}: recorrido completo en {sql}\n{plan}')
+
+    def test_hot_endpoints_use_indexes(self):
+        class_id = self.class_instance.id
+        course_id = self.class_instance.course_id
+        for url in [
+            f'/dashboard/api/classes/{class_id}/bundle/',
+            f'/dashboard/api/classes/{class_id}/tasks/',
+            f'/dashboard/api/class-contents/?class_id={class_id}',
+            f'/dashboard/api/class-contents/?class_id={class_id}&page_size=2',
+            f'/dashboard/api/classes/?course_id={course_id}',
+            f'/dashboard/api/classes/?course_id={course_id}&page_size=2',
+        ]:
+            with self.subTest(url=url):
+                self.assertNoTableScan(url)
+
+    def test_ordered_class_querysets_need_no_sort(self):
+        class_id = self.class_instance.id
+        querysets = [ClassContentModel.objects.filter(class_id=class_id).order_by('order', 'id')]
+        querysets += [
+            model.objects.filter(class_model=class_id).order_by('order', 'id')
+            for model in [MultipleChoiceModel, TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel]
+        ]
+        querysets.append(ClassModel.objects.filter(course_id=self.class_instance.course_id).order_by('created_at', 'id'))
+        for queryset in querysets:
+            plan = queryset.explain()
+            with self.subTest(model=queryset.model.__name__):
+                self.assertIn('USING INDEX', plan)
+                self.assertNotIn('SCAN', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_synthetic_course_covers_every_content_type(self):
+        content_types = dict(ClassContentModel.CONTENT_TYPES)
+        course, = generate_courses(courses=1, classes=2, contents=len(content_types), media=3, tasks=2)
+        self.assertEqual(course.classes.count(), 2)
+        class_instance = course.classes.first()
+        self.assertEqual(set(class_instance.contents.values_list('content_type', flat=True)), set(content_types))
+        for content in class_instance.contents.all():
+            self.assertEqual(validate_content_details(content.content_type, content.content_details), [])
+        self.assertEqual(class_instance.true_or_false_tasks.count(), 2)
+        self.assertTrue(class_instance.true_or_false_tasks.first().media.exists())
+
+    def test_run_benchmark_reports_every_endpoint(self):
+        course, = generate_courses(courses=1, classes=1, contents=5, media=2, tasks=1)
+        only = ['class-bundle', 'class-contents-list']
+        results = run_benchmark(course, iterations=2, warmup=0, only=only)
+
+        self.assertEqual(results['meta']['iterations'], 2)
+        expected = sum(1 for url_name, _kwargs, _query in ENDPOINTS if url_name in only) * 2
+        self.assertEqual(len(results['endpoints']), expected)
+        bundle = {item['mode']: item for item in results['endpoints'] if item['name'] == 'class-bundle'}
+        self.assertEqual(bundle['cold']['status'], 200)
+        self.assertEqual(bundle['cold']['queries'], MAX_BUNDLE_QUERIES)
+        self.assertEqual(bundle['warm']['queries'], 0)
+        self.assertGreater(bundle['cold']['peak_memory_kb'], 0)
+        self.assertLessEqual(bundle['cold']['latency_ms']['p50'], bundle['cold']['latency_ms']['max'])
+        json.dumps(results)
+
+    def test_compare_results_flags_regressions(self):
+        def result(p95, queries, status=200):
+            return {'endpoints': [{'name': 'class-bundle', 'mode': 'cold', 'status': status, 'queries': queries, 'latency_ms': {'p95': p95}}]}
+
+        self.assertEqual(compare_results(result(10, 14), result(11, 14)), [])
+        regression, = compare_results(result(10, 14), result(15, 20, status=500))
+        self.assertEqual(len(regression['reasons']), 3)
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 99), 4)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name,
+            CHUNKED_UPLOAD_DIR=os.path.join(self.media_root.name, 'partial'),
+            CHUNKED_UPLOAD_MAX_CHUNK_SIZE=1024,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.content = create_class(size=1).contents.first()
+        self.data = os.urandom(2500)
+        self.checksum = hashlib.sha256(self.data).hexdigest()
+
+    def start(self, **overrides):
+        payload = {'field': 'video', 'filename': 'lecture.mp4', 'size': len(self.data), **overrides}
+        return self.client.post(f'/dashboard/api/class-contents/{self.content.id}/uploads/', payload, format='json')
+
+    def put_chunk(self, upload_id, offset, chunk):
+        return self.client.generic(
+            'PUT', f'/dashboard/api/uploads/{upload_id}/', chunk,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunked_upload_with_resume(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['data']['upload_id']
+
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:1024]).json()['data']['offset'], 1024)
+        # Una parte con offset adelantado se rechaza indicando desde dónde seguir
+        response = self.put_chunk(upload_id, 2048, self.data[2048:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1024')
+        # Reenviar la última parte confirmada (p. ej. tras un corte) la sobrescribe
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:1024]).status_code, 200)
+        self.assertEqual(self.put_chunk(upload_id, 1024, self.data[1024:2048]).status_code, 200)
+        self.assertEqual(self.client.get(f'/dashboard/api/uploads/{upload_id}/').json()['data']['offset'], 2048)
+        self.assertEqual(self.put_chunk(upload_id, 2048, self.data[2048:]).json()['data']['offset'], len(self.data))
+
+        complete_url = f'/dashboard/api/uploads/{upload_id}/complete/'
+        response = self.client.post(complete_url, {'checksum': '0' * 64}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(complete_url, {'checksum': self.checksum}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.content.refresh_from_db()
+        # El archivo queda en el blob de su hash, sin copiarse otra vez
+        self.assertEqual(self.content.video.name, blob_name(self.checksum, 'lecture.mp4'))
+        with self.content.video.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        upload = ChunkedUploadModel.objects.get(pk=upload_id)
+        self.assertEqual(upload.status, 'complete')
+        self.assertFalse(os.path.exists(partial_path(upload)))
+        self.assertEqual(self.put_chunk(upload_id, 0, b'x').status_code, 409)
+
+    def test_rejects_invalid_sessions_and_chunks(self):
+        self.assertEqual(self.start(field='image').status_code, 400)
+        self.assertEqual(self.start(size=0).status_code, 400)
+
+        upload_id = self.start(checksum=self.checksum).json()['data']['upload_id']
+        # Parte mayor que CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:2000]).status_code, 400)
+        # Finalizar antes de recibir todo
+        response = self.client.post(f'/dashboard/api/uploads/{upload_id}/complete/', {}, format='json')
+        self.assertEqual(response.status_code, 409)
+
+        for offset in range(0, len(self.data), 1024):
+            self.put_chunk(upload_id, offset, self.data[offset:offset + 1024])
+        # Sin checksum en la petición se usa el indicado al iniciar
+        response = self.client.post(f'/dashboard/api/uploads/{upload_id}/complete/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_abort_and_expire(self):
+        upload_id = self.start().json()['data']['upload_id']
+        self.put_chunk(upload_id, 0, self.data[:100])
+        self.assertEqual(self.client.delete(f'/dashboard/api/uploads/{upload_id}/').status_code, 204)
+        self.assertFalse(ChunkedUploadModel.objects.exists())
+
+        upload_id = self.start().json()['data']['upload_id']
+        upload = ChunkedUploadModel.objects.get(pk=upload_id)
+        self.assertEqual(delete_expired_uploads(), 0)
+        ChunkedUploadModel.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(delete_expired_uploads(), 1)
+        self.assertFalse(os.path.exists(partial_path(upload)))
+
+    def test_chunk_body_is_read_outside_a_transaction(self):
+        upload_id = self.start().json()['data']['upload_id']
+        test = self
+
+        class Body(io.BytesIO):
+            def read(self, size=-1):
+                # Mientras llega el cuerpo no hay transacción abierta (aparte de la del TestCase)
+                test.assertEqual(len(connection.savepoint_ids), 1)
+                # Otra parte avanza la sesión a la vez: esta recibe 409 con el offset actual
+                ChunkedUploadModel.objects.filter(pk=upload_id).update(offset=1024)
+                return super().read(size)
+
+        with self.assertRaises(UploadConflict) as conflict:
+            append_chunk(upload_id, 0, Body(self.data[:1024]), 1024)
+        self.assertEqual(conflict.exception.offset, 1024)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.data = b'\x89PNG cover bytes'
+
+    def blob_files(self):
+        return [
+            os.path.join(root, name)
+            for root, _dirs, files in os.walk(os.path.join(self.media_root.name, 'blobs'))
+            for name in files
+        ]
+
+    def test_same_bytes_are_stored_once(self):
+        course = CourseModel.objects.create(course_name='Curso')
+        course.cover.save('portada.PNG', ContentFile(self.data))
+        media = MediaModel.objects.create(media_type='image', file=ContentFile(self.data, name='otra.png'))
+        content = create_class(size=1).contents.first()
+        info = content.save_multimedia_file(ContentFile(self.data, name='imagen.png'), 'image')
+
+        expected = blob_name(hashlib.sha256(self.data).hexdigest(), 'portada.png')
+        self.assertEqual(course.cover.name, expected)
+        self.assertEqual(media.file.name, expected)
+        self.assertEqual(info['path'], expected)
+        self.assertEqual(len(self.blob_files()), 1)
+        self.assertEqual(MediaBlobModel.objects.get(name=expected).ref_count, 3)
+
+        default_storage.delete(expected)
+        default_storage.delete(expected)
+        self.assertTrue(default_storage.exists(expected))
+        default_storage.delete(expected)
+        self.assertFalse(default_storage.exists(expected))
+        self.assertFalse(MediaBlobModel.objects.exists())
+
+    def test_recount_references(self):
+        course = CourseModel.objects.create(course_name='Curso')
+        course.cover.save('portada.png', ContentFile(self.data))
+        orphan = default_storage.save('task_media/huerfano.mp3', ContentFile(b'audio'))
+        # Subidas repetidas del mismo archivo dejan el contador por encima de las filas reales
+        default_storage.save('course_covers/portada.png', ContentFile(self.data))
+
+        call_command('recount_media_blobs', stdout=io.StringIO())
+        self.assertEqual(MediaBlobModel.objects.get(name=course.cover.name).ref_count, 1)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(course.cover.name))
+
+
+def png_bytes(width, height, color=(200, 30, 30)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(JOB_QUEUE_EAGER=True, IMAGE_DERIVATIVE_WIDTHS=[160, 320, 640])
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_course(self, data):
+        course = CourseModel.objects.create(course_name='Curso con portada')
+        with self.captureOnCommitCallbacks(execute=True):
+            course.cover.save('portada.png', ContentFile(data))
+        course.refresh_from_db()
+        return course
+
+    def test_cover_variants_generated_and_serialized(self):
+        course = self.create_course(png_bytes(1000, 500))
+
+        manifest = course.cover_variants
+        self.assertEqual(manifest['source'], course.cover.name)
+        self.assertEqual([item['width'] for item in manifest['variants']], [160, 320, 640])
+        self.assertEqual(manifest['variants'][0]['height'], 80)
+        for item in manifest['variants']:
+            self.assertEqual(item['name'], variant_name(course.cover.name, item['width']))
+            with default_storage.open(item['name'], 'rb') as variant:
+                self.assertEqual(variant.read(12)[8:], b'WEBP')
+
+        data = self.client.get('/dashboard/api/courses/').json()[0]
+        self.assertIn('160w', data['cover_variants']['srcset'])
+        self.assertTrue(data['cover_variants']['thumbnail'].endswith('.w160.webp'))
+
+        html = self.client.get('/dashboard/courses/').content.decode()
+        self.assertIn('.w160.webp', html)
+        self.assertIn('640w', html)
+
+    def test_variants_change_the_etag(self):
+        course = CourseModel.objects.create(course_name='Curso')
+        # Sin ejecutar on_commit: los derivados todavía no existen
+        course.cover.save('portada.png', ContentFile(png_bytes(400, 200)))
+        url = f'/dashboard/api/courses/{course.id}/'
+        etag = self.client.get(url)['ETag']
+
+        generate_derivatives(CourseModel, course.pk, 'cover')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('160w', response.json()['cover_variants']['srcset'])
+
+    def test_small_images_are_not_upscaled(self):
+        course = self.create_course(png_bytes(200, 100))
+        self.assertEqual([item['width'] for item in course.cover_variants['variants']], [160, 200])
+
+    def test_new_cover_replaces_variants(self):
+        course = self.create_course(png_bytes(800, 800))
+        old_source = course.cover_variants['source']
+        with self.captureOnCommitCallbacks(execute=True):
+            course.cover.save('otra.png', ContentFile(png_bytes(800, 800, color=(0, 0, 255))))
+        course.refresh_from_db()
+        self.assertNotEqual(course.cover_variants['source'], old_source)
+        self.assertEqual(course.cover_variants['source'], course.cover.name)
+
+    def test_invalid_image_leaves_no_variants(self):
+        course = CourseModel.objects.create(course_name='Curso')
+        with self.captureOnCommitCallbacks(execute=True):
+            course.cover.save('portada.png', ContentFile(b'esto no es una imagen'))
+        course.refresh_from_db()
+        self.assertIsNone(course.cover_variants)
+        self.assertIsNone(self.client.get(f'/dashboard/api/courses/{course.id}/').json()['cover_variants'])
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.data = bytes(range(256)) * 40
+        self.name = default_storage.save('class_content_videos/clase.mp4', ContentFile(self.data))
+        self.url = f'/media/{self.name}'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file_with_immutable_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(self.data).hexdigest()}"')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        size = len(self.data)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{size}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(self.body(response), self.data[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-50')
+        self.assertEqual(self.body(response), self.data[-50:])
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size - 10}-')
+        self.assertEqual(self.body(response), self.data[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+        # If-Range con un ETag distinto: el archivo cambió, se envía completo
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+
+    def test_legacy_files_and_invalid_paths(self):
+        legacy = os.path.join(self.media_root.name, 'task_media', 'antiguo.png')
+        os.makedirs(os.path.dirname(legacy))
+        with open(legacy, 'wb') as f:
+            f.write(b'png')
+        response = self.client.get('/media/task_media/antiguo.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+        self.assertEqual(self.client.get('/media/task_media/no-existe.png').status_code, 404)
+        self.assertEqual(self.client.get('/media/../pmback/settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/task_media/').status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect_mode(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+FLAKY_CALLS = []
+
+
+@job('test_flaky')
+def flaky_job(fail_times=0):
+    FLAKY_CALLS.append(fail_times)
+    if len(FLAKY_CALLS) <= fail_times:
+        raise RuntimeError('fallo de prueba')
+
+
+def fake_transcriber(path, media_type):
+    return f'transcripción de {media_type} ({os.path.getsize(path)} bytes)'
+
+
+def wav_bytes(seconds, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(1)
+        audio.setframerate(rate)
+        audio.writeframes(b'\x80' * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        FLAKY_CALLS.clear()
+
+    def test_enqueue_deduplicates_pending_jobs(self):
+        first = enqueue('test_flaky', {'fail_times': 0})
+        self.assertEqual(enqueue('test_flaky', {'fail_times': 0}).pk, first.pk)
+        self.assertNotEqual(enqueue('test_flaky', {'fail_times': 1}).pk, first.pk)
+        self.assertIn('image_derivatives', HANDLERS)
+
+    @override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=60)
+    def test_retries_with_backoff_until_failed(self):
+        queued = enqueue('test_flaky', {'fail_times': 5}, max_attempts=2)
+
+        self.assertEqual(claim_jobs('w1', 5), [queued.pk])
+        self.assertEqual(run_job(queued.pk, 'w1'), 'pending')
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn('fallo de prueba', queued.last_error)
+        self.assertGreater(queued.run_after, timezone.now() + timedelta(seconds=4))
+        # Aún no toca reintentar
+        self.assertEqual(claim_jobs('w1', 5), [])
+
+        JobModel.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        self.assertEqual(claim_jobs('w1', 5), [queued.pk])
+        self.assertEqual(run_job(queued.pk, 'w1'), 'failed')
+        self.assertEqual(len(FLAKY_CALLS), 2)
+
+    def test_expired_visibility_timeout_is_reclaimed(self):
+        queued = enqueue('test_flaky')
+        self.assertEqual(claim_jobs('w1'), [queued.pk])
+        self.assertEqual(claim_jobs('w2'), [])
+
+        # El worker w1 murió: al vencer el plazo, w2 retoma el trabajo y el resultado de w1 se descarta
+        JobModel.objects.filter(pk=queued.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_jobs('w2'), [queued.pk])
+        self.assertIsNone(run_job(queued.pk, 'w1'))
+        self.assertEqual(run_job(queued.pk, 'w2'), 'done')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('done', 2))
+
+    def test_run_jobs_command(self):
+        enqueue('test_flaky')
+        enqueue('test_flaky', {'fail_times': 0})
+        out = io.StringIO()
+        call_command('run_jobs', workers=0, once=True, stdout=out)
+        self.assertIn('2 trabajos procesados', out.getvalue())
+        self.assertEqual(JobModel.objects.filter(status='done').count(), 2)
+
+
+@override_settings(JOB_QUEUE_EAGER=True)
+class MediaProcessingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.content = create_class(size=1).contents.first()
+
+    def test_saving_media_enqueues_probe(self):
+        with override_settings(JOB_QUEUE_EAGER=False):
+            self.content.audio.save('clase.wav', ContentFile(wav_bytes(1.5)))
+        # La petición solo encola: el análisis lo hace el worker
+        self.assertEqual(JobModel.objects.filter(kind='probe_media', status='pending').count(), 1)
+        self.content.refresh_from_db()
+        self.assertIsNone(self.content.media_info)
+        saved_at = self.content.updated_at
+
+        call_command('run_jobs', workers=0, once=True, stdout=io.StringIO())
+        self.content.refresh_from_db()
+        # updated_at cambia con el resultado: el ETag de los listados también
+        self.assertGreater(self.content.updated_at, saved_at)
+        info = self.content.media_info['audio']
+        self.assertEqual(info['source'], self.content.audio.name)
+        self.assertEqual(info['content_type'], 'audio/x-wav')
+        self.assertAlmostEqual(info['duration'], 1.5, places=2)
+
+        # Guardar la fila sin cambiar el archivo no vuelve a encolar el análisis
+        self.content.tittle = 'Otro título'
+        self.content.save()
+        self.assertEqual(JobModel.objects.filter(kind='probe_media').count(), 1)
+
+    @override_settings(MEDIA_TRANSCRIPTION_BACKEND='dashboard.tests.fake_transcriber')
+    def test_transcription_fills_empty_text_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.content.video.save('clase.mp4', ContentFile(b'video' * 10))
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.video_transcription, 'transcripción de video (50 bytes)')
+        self.assertEqual(self.content.media_info['video']['size'], 50)
+
+        block = MultimediaBlockVideoModel(class_model=self.content.class_id, script='Guion escrito a mano')
+        with self.captureOnCommitCallbacks(execute=True):
+            block.video.save('bloque.mp4', ContentFile(b'otro video'))
+        block.refresh_from_db()
+        self.assertEqual(block.script, 'Guion escrito a mano')
+        self.assertFalse(JobModel.objects.filter(kind='transcribe_media', payload__pk=block.pk, payload__model=block._meta.label).exists())
+
+
+class FakeMoodle:
+    """Servidor HTTP local que imita el servicio web REST de Moodle para probar MoodleAPI"""
+    TOKEN = 'token-de-prueba'
+
+    def __init__(self, delay=0, unavailable=0):
+        self.delay = delay
+        self.unavailable = unavailable
+        self.calls = []
+        self.connections = set()
+        self.users = {}
+        self.enrolments = []
+        self.courses = {}
+        self.sections = {}
+        # courseid -> {userid: (nombre, [(itemid, itemname, nota, nota máxima)])}
+        self.grades = {}
+        # Funciones que Moodle ejecuta pero cuya respuesta se pierde (la conexión se corta)
+        self.lose_response = set()
+        self.active = self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler_class())
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}/webservice/rest/server.php'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.respond(dict(parse_qsl(urlsplit(self.path).query, keep_blank_values=True)))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                self.respond(dict(parse_qsl(body, keep_blank_values=True)))
+
+            def respond(self, params):
+                status, result = fake.handle(self.command, self.client_address, params)
+                body = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def handle(self, method, client_address, params):
+        with self.lock:
+            self.calls.append((method, params.get('wsfunction'), params))
+            self.connections.add(client_address)
+            if self.unavailable:
+                self.unavailable -= 1
+                return 503, {}
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            with self.lock:
+                result = self.dispatch(params)
+                if params.get('wsfunction') in self.lose_response:
+                    self.lose_response.discard(params.get('wsfunction'))
+                    return 502, {}
+                return 200, result
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    @staticmethod
+    def decode_list(params, name):
+        items = {}
+        for key, value in params.items():
+            match = re.fullmatch(rf'{name}\[(\d+)\](?:\[(\w+)\])?', key)
+            if match:
+                index, field = int(match.group(1)), match.group(2)
+                if field:
+                    items.setdefault(index, {})[field] = value
+                else:
+                    items[index] = value
+        return [items[index] for index in sorted(items)]
+
+    def dispatch(self, params):
+        if params.get('wstoken') != self.TOKEN:
+            return {'exception': 'moodle_exception', 'errorcode': 'invalidtoken', 'message': 'Invalid token'}
+        function = params.get('wsfunction')
+        if function == 'core_webservice_get_site_info':
+            return {'sitename': 'Moodle de prueba'}
+        if function == 'core_user_create_users':
+            users = self.decode_list(params, 'users')
+            for user in users:
+                if user['username'] in self.users:
+                    return {'exception': 'invalid_parameter_exception', 'errorcode': 'invalidparameter',
+                            'message': f"Username already exists: {user['username']}"}
+            created = []
+            for user in users:
+                user['id'] = len(self.users) + 1
+                self.users[user['username']] = user
+                created.append({'id': user['id'], 'username': user['username']})
+            return created
+        if function == 'core_user_get_users_by_field':
+            values = self.decode_list(params, 'values')
+            return [user for user in self.users.values() if user.get(params['field']) in values]
+        if function == 'enrol_manual_enrol_users':
+            self.enrolments.extend(self.decode_list(params, 'enrolments'))
+            return None
+        if function == 'core_enrol_get_enrolled_users':
+            users = self.grades.get(int(params['courseid']), {})
+            return [{'id': user_id, 'fullname': name} for user_id, (name, _items) in users.items()]
+        if function == 'gradereport_user_get_grade_items':
+            course_id, user_id = int(params['courseid']), int(params['userid'])
+            name, items = self.grades[course_id][user_id]
+            gradeitems = [
+                {'id': item_id, 'itemname': item_name, 'itemtype': 'mod', 'graderaw': grade, 'grademax': grademax}
+                for item_id, item_name, grade, grademax in items
+            ]
+            total = sum(grade or 0 for _id, _name, grade, _max in items)
+            gradeitems.append({'id': 1, 'itemname': None, 'itemtype': 'course', 'graderaw': total,
+                               'grademax': sum(grademax for *_rest, grademax in items)})
+            return {'usergrades': [{'courseid': course_id, 'userid': user_id, 'userfullname': name, 'gradeitems': gradeitems}], 'warnings': []}
+        if function == 'core_course_create_courses':
+            courses = self.decode_list(params, 'courses')
+            for course in courses:
+                if 'INVÁLIDO' in course['fullname'] or any(c['shortname'] == course['shortname'] for c in self.courses.values()):
+                    return {'exception': 'moodle_exception', 'errorcode': 'shortnametaken', 'message': 'Short name is already used'}
+            created = []
+            for course in courses:
+                course['id'] = len(self.courses) + 2
+                self.courses[course['id']] = course
+                self.sections[course['id']] = []
+                created.append({'id': course['id'], 'shortname': course['shortname']})
+            return created
+        if function == 'core_course_update_courses':
+            for course in self.decode_list(params, 'courses'):
+                self.courses[int(course['id'])].update(course)
+            return {'warnings': []}
+        if function == 'core_course_get_courses_by_field':
+            return {'courses': [c for c in self.courses.values() if c.get(params['field']) == params['value']]}
+        if function == 'core_course_get_contents':
+            return self.sections[int(params['courseid'])]
+        if function == 'local_wsmanagesections_create_sections':
+            sections = self.sections[int(params['courseid'])]
+            created = []
+            for _ in range(int(params['number'])):
+                section = {'id': sum(len(items) for items in self.sections.values()) + 100, 'section': len(sections) + 1, 'name': ''}
+                sections.append(section)
+                created.append({'sectionid': section['id'], 'sectionnumber': section['section']})
+            return created
+        if function == 'local_wsmanagesections_update_sections':
+            sections = {section['id']: section for section in self.sections[int(params['courseid'])]}
+            for update in self.decode_list(params, 'sections'):
+                sections[int(update['section'])].update(name=update['name'], summary=update['summary'])
+            return None
+        return {'exception': 'moodle_exception', 'errorcode': 'invalidrecord', 'message': f'Unknown function {function}'}
+
+
+class MoodleClientTests(SimpleTestCase):
+    def users(self, count):
+        return [
+            {'username': f'alumno{i}', 'firstname': 'Alumno', 'lastname': str(i), 'email': f'alumno{i}@example.com', 'password': 'Clave123!'}
+            for i in range(count)
+        ]
+
+    def test_encode_params(self):
+        self.assertEqual(
+            encode_params('users', [{'username': 'a', 'preferences': [{'type': 'lang', 'value': 'es'}], 'suspended': False}]),
+            {'users[0][username]': 'a', 'users[0][preferences][0][type]': 'lang', 'users[0][preferences][0][value]': 'es', 'users[0][suspended]': 0},
+        )
+
+    def test_bulk_calls_are_batched(self):
+        with FakeMoodle() as fake, MoodleAPI(fake.url, FakeMoodle.TOKEN, batch_size=100) as moodle:
+            created = moodle.create_users(self.users(250))
+            self.assertEqual([user['username'] for user in created], [f'alumno{i}' for i in range(250)])
+            moodle.enrol_users([{'userid': user['id'], 'courseid': 7} for user in created])
+
+            functions = [call[1] for call in fake.calls]
+            self.assertEqual(functions.count('core_user_create_users'), 3)
+            self.assertEqual(functions.count('enrol_manual_enrol_users'), 3)
+            self.assertTrue(all(method == 'POST' for method, *_ in fake.calls))
+            self.assertEqual(len(fake.enrolments), 250)
+            self.assertIn({'roleid': '5', 'userid': '1', 'courseid': '7'}, fake.enrolments)
+            self.assertEqual(fake.users['alumno0']['auth'], 'manual')
+
+            # Los métodos de un solo elemento conservan su respuesta
+            self.assertEqual(moodle.create_user('nuevo', 'N', 'U', 'n@example.com', 'x')[0]['username'], 'nuevo')
+            self.assertEqual(moodle.get_user_by_field('email', 'n@example.com')[0]['username'], 'nuevo')
+
+    def test_moodle_errors_raise(self):
+        with FakeMoodle() as fake, MoodleAPI(fake.url, 'otro-token') as moodle:
+            with self.assertRaises(MoodleError) as error:
+                moodle.get_site_info()
+            self.assertEqual(error.exception.errorcode, 'invalidtoken')
+
+    def test_reads_are_retried_writes_are_not(self):
+        with FakeMoodle(unavailable=2) as fake, MoodleAPI(fake.url, FakeMoodle.TOKEN, backoff_factor=0) as moodle:
+            self.assertEqual(moodle.get_site_info()['sitename'], 'Moodle de prueba')
+            self.assertEqual(len(fake.calls), 3)
+
+            fake.unavailable = 1
+            with self.assertRaises(Exception):
+                moodle.create_users(self.users(1))
+            self.assertEqual(fake.users, {})
+
+    def test_concurrent_calls_reuse_pooled_connections(self):
+        with FakeMoodle(delay=0.05) as fake, MoodleAPI(fake.url, FakeMoodle.TOKEN, max_workers=4) as moodle:
+            start = time.monotonic()
+            results = moodle.call_many([('core_webservice_get_site_info', {})] * 16)
+            elapsed = time.monotonic() - start
+
+            self.assertEqual(len(results), 16)
+            self.assertGreater(fake.max_active, 1)
+            self.assertLessEqual(fake.max_active, 4)
+            self.assertLess(elapsed, 16 * 0.05)
+            # Conexiones keep-alive: como mucho una por hilo, no una por llamada
+            self.assertLessEqual(len(fake.connections), 4)
+
+    def test_rate_limit(self):
+        with FakeMoodle() as fake, MoodleAPI(fake.url, FakeMoodle.TOKEN, rate_limit=50) as moodle:
+            start = time.monotonic()
+            moodle.call_many([('core_webservice_get_site_info', {})] * 11)
+            self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+
+class MoodleSyncTests(TestCase):
+    def setUp(self):
+        self.fake = FakeMoodle()
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__)
+        self.moodle = MoodleAPI(self.fake.url, FakeMoodle.TOKEN, max_workers=4)
+        self.addCleanup(self.moodle.close)
+
+    def create_courses(self, names, classes=2):
+        courses = []
+        for name in names:
+            course = CourseModel.objects.create(course_name=name, description='Descripción', bullet_points=[{'text': 'Punto'}])
+            for i in range(classes):
+                ClassModel.objects.create(course=course, class_name=f'{name} - clase {i}')
+            courses.append(course)
+        return courses
+
+    def functions(self):
+        return [call[1] for call in self.fake.calls]
+
+    def test_pushes_only_what_changed(self):
+        first, _second, _third = self.create_courses(['Inglés A1', 'Inglés A2', 'Inglés B1'])
+        stats = run_sync(self.moodle)
+        self.assertEqual(stats, {'courses_created': 3, 'courses_updated': 0, 'classes_created': 6, 'classes_updated': 6, 'errors': 0})
+        self.assertEqual(self.functions().count('core_course_create_courses'), 1)
+        self.assertEqual(self.functions().count('local_wsmanagesections_create_sections'), 3)
+        remote = self.fake.courses[first.moodle_sync.remote_id]
+        self.assertEqual(remote['idnumber'], f'poly-academy-course-{first.pk}')
+        self.assertEqual(remote['summary'], '<p>Descripción</p><ul><li>Punto</li></ul>')
+        self.assertEqual([s['name'] for s in self.fake.sections[remote['id']]], ['Inglés A1 - clase 0', 'Inglés A1 - clase 1'])
+
+        self.fake.calls.clear()
+        self.assertEqual(run_sync(self.moodle)['courses_updated'], 0)
+        self.assertEqual(self.fake.calls, [])
+
+        first.course_name = 'Inglés A1 (2025)'
+        first.save()
+        changed = ClassModel.objects.filter(course__course_name='Inglés B1').first()
+        changed.class_name = 'Nueva clase'
+        changed.save()
+        stats = run_sync(self.moodle)
+        self.assertEqual((stats['courses_updated'], stats['classes_updated'], stats['classes_created']), (1, 1, 0))
+        self.assertEqual(self.functions(), ['core_course_update_courses', 'local_wsmanagesections_update_sections'])
+        self.assertEqual(self.fake.courses[first.moodle_sync.remote_id]['fullname'], 'Inglés A1 (2025)')
+
+    def test_resumes_after_interrupted_create(self):
+        course, = self.create_courses(['Francés'], classes=1)
+        self.fake.lose_response = {'core_course_create_courses'}
+        with self.assertRaises(Exception):
+            run_sync(self.moodle)
+        self.assertIsNone(MoodleCourseSyncModel.objects.get(course=course).remote_id)
+
+        stats = run_sync(self.moodle)
+        self.assertEqual(len(self.fake.courses), 1)
+        self.assertEqual(MoodleCourseSyncModel.objects.get(course=course).remote_id, next(iter(self.fake.courses)))
+        self.assertEqual((stats['courses_updated'], stats['classes_created']), (1, 1))
+
+    def test_recovers_sections_after_lost_create_response(self):
+        courses = self.create_courses(['Francés', 'Portugués'], classes=0)
+        run_sync(self.moodle)
+        for course in courses:
+            for i in range(2):
+                ClassModel.objects.create(course=course, class_name=f'{course.course_name} - clase {i}')
+        self.fake.lose_response = {'local_wsmanagesections_create_sections'}
+        # El fallo de red de un curso no corta el lote ni pierde las secciones del otro
+        stats = run_sync(self.moodle)
+        self.assertEqual((stats['classes_created'], stats['classes_updated'], stats['errors']), (2, 2, 1))
+
+        stats = run_sync(self.moodle)
+        self.assertEqual((stats['classes_created'], stats['classes_updated'], stats['errors']), (0, 2, 0))
+        for course in courses:
+            remote_id = MoodleCourseSyncModel.objects.get(course=course).remote_id
+            names = [section['name'] for section in self.fake.sections[remote_id]]
+            self.assertEqual(names, [f'{course.course_name} - clase 0', f'{course.course_name} - clase 1'])
+
+    def test_rejected_course_does_not_block_batch(self):
+        self.create_courses(['Alemán', 'Curso INVÁLIDO', 'Italiano'], classes=1)
+        stats = run_sync(self.moodle)
+        self.assertEqual((stats['courses_created'], stats['errors']), (2, 1))
+        failed = MoodleCourseSyncModel.objects.get(course__course_name='Curso INVÁLIDO')
+        self.assertIn('Short name', failed.last_error)
+        self.assertEqual(MoodleClassSyncModel.objects.filter(section_id__isnull=False).count(), 2)
+
+        out = io.StringIO()
+        call_command('sync_moodle', dry_run=True, stdout=out)
+        self.assertIn('Pendientes: 1 cursos, 0 clases', out.getvalue())
+
+
+def run_one_job():
+    # Proceso hijo: los clientes de Moodle del padre tienen hilos que no existen aquí
+    moodle_sync._clients.clear()
+    if not run_pending(limit=1):
+        raise SystemExit(1)
+
+
+@override_settings(MOODLE_TOKEN=FakeMoodle.TOKEN, MOODLE_MAX_WORKERS=4, MOODLE_RATE_LIMIT=0, GRADES_REFRESH_AFTER=300)
+class GradeReportTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.fake = FakeMoodle(delay=0.01)
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__)
+        settings_override = override_settings(MOODLE_BASE_URL=self.fake.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.course = CourseModel.objects.create(course_name='Inglés A1')
+        MoodleCourseSyncModel.objects.create(course=self.course, remote_id=42)
+        self.fake.grades[42] = {
+            user_id: (f'Alumno {user_id:02d}', [(10, 'Quiz 1', 5 + user_id % 5, 10), (11, 'Tarea', None if user_id == 1 else 80, 100)])
+            for user_id in range(1, 31)
+        }
+        self.url = f'/dashboard/api/courses/{self.course.id}/grades/'
+
+    def grade_calls(self):
+        return [call for call in self.fake.calls if call[1] == 'gradereport_user_get_grade_items']
+
+    def run_jobs(self):
+        call_command('run_jobs', workers=0, once=True, stdout=io.StringIO())
+
+    def test_report_is_fetched_concurrently_and_cached(self):
+        # Sin informe la petición no espera a Moodle: responde 202 y encola su construcción
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()['data'], response.json()['refreshing']), (None, True))
+        self.assertEqual(self.grade_calls(), [])
+
+        self.run_jobs()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertFalse(body['refreshing'])
+        self.assertEqual(len(body['data']['students']), 30)
+        self.assertEqual(body['data']['students'][0]['fullname'], 'Alumno 01')
+        quiz, task = body['data']['items']
+        self.assertEqual((quiz['name'], quiz['count'], quiz['min'], quiz['max'], quiz['average']), ('Quiz 1', 30, 5.0, 9.0, 7.0))
+        self.assertEqual(task['count'], 29)
+        self.assertEqual(body['data']['students'][0]['items'][0]['percentage'], 60.0)
+        self.assertEqual(len(self.grade_calls()), 30)
+        self.assertGreater(self.fake.max_active, 1)
+        self.assertLessEqual(self.fake.max_active, 4)
+
+        self.fake.calls.clear()
+        self.assertEqual(self.client.get(self.url).json()['fetched_at'], body['fetched_at'])
+        self.assertEqual(self.fake.calls, [])
+
+        # Invalidación por curso: la siguiente petición vuelve a consultar Moodle
+        self.assertEqual(self.client.delete(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 202)
+        self.run_jobs()
+        self.assertEqual(len(self.grade_calls()), 30)
+
+    def test_stale_report_is_served_and_refreshed_in_background(self):
+        self.client.get(self.url)
+        self.run_jobs()
+        self.fake.grades[42][1] = ('Alumno 01', [(10, 'Quiz 1', 10, 10), (11, 'Tarea', 100, 100)])
+
+        with override_settings(GRADES_REFRESH_AFTER=0):
+            body = self.client.get(self.url).json()
+        self.assertTrue(body['refreshing'])
+        self.assertEqual(body['data']['students'][0]['items'][0]['grade'], 6)
+        self.assertEqual(JobModel.objects.filter(kind='refresh_grade_report', status='pending').count(), 1)
+
+        self.run_jobs()
+        body = self.client.get(self.url).json()
+        self.assertFalse(body['refreshing'])
+        self.assertEqual(body['data']['students'][0]['items'][0]['grade'], 10)
+
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'Requiere procesos con fork')
+    def test_report_built_by_worker_process_is_served(self):
+        # El trabajo corre en otro proceso, como en run_jobs: el informe debe llegar a este por la caché
+        self.assertEqual(self.client.get(self.url).status_code, 202)
+        worker = multiprocessing.get_context('fork').Process(target=run_one_job)
+        worker.start()
+        worker.join(timeout=30)
+        self.assertEqual(worker.exitcode, 0)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']['students']), 30)
+
+    def test_unsynced_course(self):
+        other = CourseModel.objects.create(course_name='Sin Moodle')
+        response = self.client.get(f'/dashboard/api/courses/{other.id}/grades/')
+        self.assertEqual(response.status_code, 409)
+        invalidate_grades(other.id)
+
+
+class AsyncReadViewsTests(TestCase):
+    # Las vistas async comparten caché y ETag con las DRF: misma ruta, mismo cuerpo
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+        self.class_instance = create_class(size=3)
+
+    def test_class_contents_match_sync_view(self):
+        url = f'/dashboard/api/class-contents/?class_id={self.class_instance.id}'
+        view = async_to_sync(async_views.class_content_list)
+        expected = self.client.get(url)
+
+        # La entrada de caché de la vista DRF se reutiliza: solo queda el agregado del ETag
+        with self.assertNumQueries(1):
+            response = view(self.factory.get(url))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+        not_modified = view(self.factory.get(url, headers={'If-None-Match': response['ETag']}))
+        self.assertEqual(not_modified.status_code, 304)
+
+        invalid = view(self.factory.get(f'{url}&cursor=no-valido'))
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(json.loads(invalid.content)['tipo_error'], 'validación')
+
+    async def test_course_list_and_bundle_match_sync_views(self):
+        for url, view, kwargs in [
+            ('/dashboard/api/courses/', async_views.course_list, {}),
+            (f'/dashboard/api/classes/{self.class_instance.id}/bundle/', async_views.class_bundle, {'class_id': self.class_instance.id}),
+        ]:
+            response = await view(self.factory.get(url), **kwargs)
+            expected = await sync_to_async(self.client.get)(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), expected.json())
+
+        missing = await async_views.class_bundle(self.factory.get('/dashboard/api/classes/999/bundle/'), class_id=999)
+        self.assertEqual(missing.status_code, 404)
+
+        invalid = await async_views.course_list(self.factory.get('/dashboard/api/courses/?cursor=zzz'))
+        expected = await sync_to_async(self.client.get)('/dashboard/api/courses/?cursor=zzz')
+        self.assertEqual((invalid.status_code, expected.status_code), (400, 400))
+        self.assertEqual(json.loads(invalid.content), expected.json())
+
+    async def test_other_methods_use_drf_view(self):
+        response = await async_views.course_list(self.factory.post('/dashboard/api/courses/', {'course_name': 'Curso async'}))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await CourseModel.objects.filter(course_name='Curso async').aexists())
+
+
+class ServerBenchmarkTests(SimpleTestCase):
+    def test_slow_clients_are_spread_evenly(self):
+        self.assertEqual(sum(is_slow(index, 0.2) for index in range(100)), 20)
+        self.assertFalse(any(is_slow(index, 0) for index in range(10)))
+
+    def test_summary_separates_fast_clients(self):
+        summary = summarize([(200, 0.01, False), (200, 0.02, False), (200, 2.0, True), (None, 2.5, True)], elapsed=2.5)
+        self.assertEqual((summary['ok'], summary['errors']), (3, 1))
+        self.assertEqual(summary['latency_ms']['max'], 2500.0)
+        self.assertEqual(summary['fast_latency_ms']['max'], 20.0)
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_sqlite_default_with_pragmas(self):
+        config = database_config({}, '/srv/db.sqlite3')
+        self.assertEqual(config['NAME'], '/srv/db.sqlite3')
+        self.assertIn('PRAGMA journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA busy_timeout=5000', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(database_config({'DATABASE_URL': 'sqlite:////tmp/x.sqlite3'}, None)['NAME'], '/tmp/x.sqlite3')
+
+    def test_postgres_persistent_connections_or_pool(self):
+        url = 'postgres://poly:s%40cret@db:5433/poly?sslmode=require'
+        config = database_config({'DATABASE_URL': url}, None)
+        self.assertEqual((config['USER'], config['PASSWORD'], config['HOST'], config['PORT']), ('poly', 's@cret', 'db', '5433'))
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+        self.assertEqual(database_url(config), url)
+
+        pooled = database_config({'DATABASE_URL': url, 'DB_POOL_MAX_SIZE': '8'}, None)
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 8)
+        self.assertEqual(database_url(pooled), url)
+
+        with self.assertRaises(ValueError):
+            database_config({'DATABASE_URL': 'mysql://db/poly'}, None)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Pragmas de SQLite')
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.course = CourseModel.objects.create(course_name='Inglés básico')
+        self.class_instance = ClassModel.objects.create(class_name='Saludos', course=self.course)
+        self.content = ClassContentModel.objects.create(
+            class_id=self.class_instance, content_type='text_block', tittle='Presentaciones', order=0,
+            instructions='Lee el diálogo', content_details={'text': '<p>Good morning, teacher!</p>', 'image': '/media/a.png'},
+        )
+        self.block = TextBlockLayoutModel.objects.create(
+            lesson=self.class_instance, tittle='Gramática', content='Los saludos formales: good morning y good evening',
+        )
+
+    def test_signals_keep_documents_in_sync(self):
+        document = SearchDocumentModel.objects.get(kind='content', object_id=self.content.pk)
+        self.assertEqual((document.title, document.course_id), ('Presentaciones', self.course.pk))
+        self.assertEqual(document.body, 'Lee el diálogo\nGood morning, teacher!')
+
+        self.content.tittle = 'Despedidas'
+        self.content.save()
+        self.assertEqual(search('despedidas')[0]['id'], self.content.pk)
+
+        other = CourseModel.objects.create(course_name='Otro curso')
+        self.class_instance.course = other
+        self.class_instance.save()
+        self.assertEqual(search('despedidas', course_id=other.pk)[0]['course']['course_name'], 'Otro curso')
+
+        self.content.delete()
+        self.assertEqual(search('despedidas'), [])
+
+    def test_ranking_prefix_phrase_and_filters(self):
+        # El título pesa más que el cuerpo; la última palabra se busca como prefijo y sin tildes
+        hits = search('gramat')
+        self.assertEqual([(hit['kind'], hit['id']) for hit in hits], [('text_block', self.block.pk)])
+        self.assertEqual({hit['kind'] for hit in search('good morning')}, {'content', 'text_block'})
+        self.assertEqual(len(search('"good evening"')), 1)
+        self.assertEqual(search('"evening good"'), [])
+        self.assertEqual(len(search('morning', kind='content')), 1)
+        self.assertEqual(search('morning', class_id=self.class_instance.pk + 1), [])
+        titled = ClassContentModel.objects.create(class_id=self.class_instance, content_type='text_block', tittle='Saludos', order=1)
+        ranked = search('saludos')
+        self.assertEqual(len(ranked), 2)
+        if ranked[0]['rank'] is not None:
+            self.assertEqual(ranked[0]['id'], titled.pk)
+        hit = search('teacher')[0]
+        self.assertEqual(hit['class'], {'id': self.class_instance.pk, 'class_name': 'Saludos'})
+        if hit['rank'] is not None:
+            self.assertIn('<mark>teacher</mark>', hit['snippet'])
+
+    def test_query_parsing(self):
+        self.assertEqual(parse_query('  "buenos días" señor_x '), [(['buenos', 'días'], True), (['señor'], False), (['x'], False)])
+        self.assertEqual(fts5_query(parse_query('"buenos días" señ')), '{title body} : ("buenos días" "señ"*)')
+        self.assertEqual(
+            fts5_query(parse_query('hola'), course_id=3, kind='text_block'),
+            'scope : (course3 kindtextblock) AND {title body} : ("hola"*)',
+        )
+        self.assertEqual(parse_query('"" -- '), [])
+
+    def test_endpoint_and_rebuild(self):
+        SearchDocumentModel.objects.all().delete()
+        self.assertEqual(rebuild_index(batch_size=1), {
+            'content': 1, 'text_block': 1, 'video_layout': 0, 'video_block': 0, 'audio_block': 0, 'attachment_block': 0,
+        })
+        client = APIClient()
+        response = client.get('/dashboard/api/search/', {'q': 'morning', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertTrue(response.data['has_more'])
+        self.assertEqual(response.data['data'][0]['course'], {'id': self.course.pk, 'course_name': 'Inglés básico'})
+
+        response = client.get('/dashboard/api/search/', {'q': '  ', 'kind': 'otro', 'limit': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['campos_con_error']), {'q', 'kind', 'limit'})
+
+
+class CourseOutlineTests(TestCase):
+    def setUp(self):
+        self.course = CourseModel.objects.create(course_name='Curso con índice')
+        self.first = ClassModel.objects.create(class_name='Primera', course=self.course)
+        self.second = ClassModel.objects.create(class_name='Segunda', course=self.course)
+        self.video = ClassContentModel.objects.create(
+            class_id=self.first, content_type='video', tittle='Video', order=1, video='content_videos/a.mp4',
+            multimedia=[{'media_type': 'image', 'file': 'a.jpg'}], content_details={'text': 'x' * 1000},
+        )
+        self.text = ClassContentModel.objects.create(class_id=self.first, content_type='text_block', tittle='Texto', order=0)
+        self.url = f'/dashboard/api/courses/{self.course.pk}/outline/'
+
+    def outline(self):
+        return get_outline(self.course.pk)[0]
+
+    def test_outline_built_on_first_read_and_served_from_one_row(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        outline = response.json()['data']
+        self.assertEqual(outline['course']['course_name'], 'Curso con índice')
+        self.assertEqual([entry['class_name'] for entry in outline['classes']], ['Primera', 'Segunda'])
+        self.assertEqual(outline['classes'][0]['contents'], [
+            {'id': self.text.pk, 'tittle': 'Texto', 'content_type': 'text_block', 'order': 0, 'media': []},
+            {'id': self.video.pk, 'tittle': 'Video', 'content_type': 'video', 'order': 1, 'media': ['image', 'video']},
+        ])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/dashboard/api/courses/999/outline/').status_code, 404)
+
+    def test_changes_update_only_touched_classes(self):
+        self.outline()
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                ClassContentModel.objects.create(class_id=self.second, content_type='text_block', tittle=f'N{index}', order=index)
+            self.video.tittle = 'Video nuevo'
+            self.video.save()
+        outline = self.outline()
+        self.assertEqual([item['tittle'] for item in outline['classes'][0]['contents']], ['Texto', 'Video nuevo'])
+        self.assertEqual(len(outline['classes'][1]['contents']), 3)
+        # Una actualización por transacción, no una por contenido guardado
+        self.assertEqual(CourseOutlineModel.objects.get(pk=self.course.pk).version, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reorder('contents', self.first.pk, [(self.video.pk, 0), (self.text.pk, 1)])
+        self.assertEqual([item['id'] for item in self.outline()['classes'][0]['contents']], [self.video.pk, self.text.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.course_name = 'Renombrado'
+            self.course.save()
+            self.second.delete()
+        outline = self.outline()
+        self.assertEqual(outline['course']['course_name'], 'Renombrado')
+        self.assertEqual([entry['id'] for entry in outline['classes']], [self.first.pk])
+
+    def test_class_moved_between_courses(self):
+        other = CourseModel.objects.create(course_name='Destino')
+        self.outline()
+        get_outline(other.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.course = other
+            self.first.save()
+        self.assertEqual([entry['id'] for entry in self.outline()['classes']], [self.second.pk])
+        moved = get_outline(other.pk)[0]['classes']
+        self.assertEqual([entry['id'] for entry in moved], [self.first.pk])
+        self.assertEqual(len(moved[0]['contents']), 2)
+
+    def test_rolled_back_changes_are_discarded(self):
+        self.outline()
+        # Aplica lo que dejó pendiente setUp, como si ya estuviera confirmado
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.second.delete()
+                raise RuntimeError('revertir')
+            self.first.class_name = 'Primera (editada)'
+            self.first.save()
+        outline = self.outline()
+        self.assertEqual([entry['class_name'] for entry in outline['classes']], ['Primera (editada)', 'Segunda'])
+        self.assertEqual(len(outline['classes'][0]['contents']), 2)
+        self.assertEqual(CourseOutlineModel.objects.get(pk=self.course.pk).version, 3)
+
+
+class CloneTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build_course(self, size):
+        course = CourseModel.objects.create(course_name='Original')
+        for _ in range(2):
+            class_instance = create_class(size=size, course=course)
+        content = class_instance.contents.first()
+        content.image.save('foto.png', ContentFile(b'imagen compartida'))
+        content.multimedia = [{'media_type': 'image', 'file_info': {'path': content.image.name}}]
+        content.save()
+        return course, content.image.name
+
+    def test_course_clone_copies_tree_and_shares_blobs(self):
+        course, blob = self.build_course(size=2)
+        self.assertEqual(MediaBlobModel.objects.get(name=blob).ref_count, 1)
+
+        clone, copied = clone_course(course)
+        self.assertEqual(clone.course_name, 'Original (copia)')
+        self.assertEqual(copied['classmodel'], 2)
+        self.assertEqual(copied['classcontentmodel'], 4)
+        for model, attname in [(ClassContentModel, 'class_id'), (TextBlockLayoutModel, 'lesson'), (TrueOrFalseModel, 'class_model')]:
+            self.assertEqual(
+                model.objects.filter(**{f'{attname}__course': clone}).count(),
+                model.objects.filter(**{f'{attname}__course': course}).count(),
+            )
+
+        # La media compartida por varias tareas se copia una vez y los enlaces apuntan a las copias
+        source_media = set(MediaModel.objects.filter(true_or_false_tasks__class_model__course=course).values_list('pk', flat=True))
+        cloned_media = set(MediaModel.objects.filter(true_or_false_tasks__class_model__course=clone).values_list('pk', flat=True))
+        self.assertEqual(len(cloned_media), len(source_media))
+        self.assertFalse(cloned_media & source_media)
+        self.assertEqual(
+            set(MediaModel.objects.filter(pk__in=cloned_media).values_list('file', flat=True)),
+            set(MediaModel.objects.filter(pk__in=source_media).values_list('file', flat=True)),
+        )
+
+        # Mismo blob; una referencia más por el campo image y otra por la lista multimedia
+        cloned_content = ClassContentModel.objects.get(class_id__course=clone, image=blob)
+        self.assertEqual(cloned_content.multimedia[0]['file_info']['path'], blob)
+        self.assertEqual(MediaBlobModel.objects.get(name=blob).ref_count, 3)
+        self.assertEqual(search('bloque', course_id=clone.pk)[0]['course']['id'], clone.pk)
+
+    def test_clone_queries_do_not_grow_with_size(self):
+        small, _blob = self.build_course(size=1)
+        large, _blob = self.build_course(size=6)
+        with CaptureQueriesContext(connection) as small_queries:
+            clone_course(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            clone_course(large)
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_class_clone_in_same_course(self):
+        course, blob = self.build_course(size=2)
+        class_instance = course.classes.get(contents__image=blob)
+
+        clone, copied = clone_class(class_instance, class_name='Repaso')
+        self.assertEqual((clone.course_id, clone.class_name), (course.pk, 'Repaso'))
+        self.assertEqual(copied['classcontentmodel'], 2)
+        self.assertEqual(course.classes.count(), 3)
+        self.assertEqual(TrueOrFalseModel.objects.filter(class_model=clone).count(), TrueOrFalseModel.objects.filter(class_model=class_instance).count())
+        self.assertEqual(MediaBlobModel.objects.get(name=blob).ref_count, 3)
+
+        copy, _copied = clone_class(class_instance)
+        self.assertEqual((copy.course_id, copy.class_name), (course.pk, f'{class_instance.class_name} (copia)'))
+
+    def test_class_clone_endpoint(self):
+        course, _blob = self.build_course(size=1)
+        target = CourseModel.objects.create(course_name='Destino')
+        class_instance = course.classes.first()
+        response = self.client.post(
+            f'/dashboard/api/classes/{class_instance.pk}/clone/', {'course_id': target.pk}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()['data']
+        self.assertEqual((data['course_id'], data['class_name']), (target.pk, 'Clase de prueba (copia)'))
+        self.assertEqual(ClassContentModel.objects.filter(class_id=data['id']).count(), 1)
+
+        response = self.client.post(f'/dashboard/api/courses/{course.pk}/clone/', {'course_name': 'Cohorte 2'}, content_type='application/json')
+        self.assertEqual(response.json()['data']['course_name'], 'Cohorte 2')
+        response = self.client.post(f'/dashboard/api/classes/{class_instance.pk}/clone/', {'course_id': 999}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('course_id', response.json()['campos_con_error'])
+
+
+class DeletionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root.name, CHUNKED_UPLOAD_DIR=self.upload_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build_course(self, size):
+        course = CourseModel.objects.create(course_name='Original')
+        for _ in range(2):
+            class_instance = create_class(size=size, course=course)
+        content = class_instance.contents.first()
+        content.image.save('foto.png', ContentFile(b'imagen del curso'))
+        # La misma imagen subida como multimedia: otra referencia al mismo blob
+        path = default_storage.save('content_multimedia/foto.png', ContentFile(b'imagen del curso'))
+        content.multimedia = [{'media_type': 'image', 'file_info': {'path': path}}]
+        content.save()
+        return course, content.image.name
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_course_delete_removes_tree_and_sweeps_shared_blobs(self):
+        course, blob = self.build_course(size=2)
+        clone, _copied = clone_course(course)
+        get_outline(course.pk)
+        source_media = set(MediaModel.objects.filter(true_or_false_tasks__class_model__course=course).values_list('pk', flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = delete_courses([course.pk])
+        self.assertEqual((deleted['coursemodel'], deleted['classmodel'], deleted['classcontentmodel']), (1, 2, 4))
+        self.assertFalse(ClassModel.objects.filter(course_id=course.pk).exists())
+        self.assertFalse(TrueOrFalseModel.objects.filter(class_model__course_id=course.pk).exists())
+        self.assertFalse(SearchDocumentModel.objects.filter(course_id=course.pk).exists())
+        self.assertFalse(CourseOutlineModel.objects.filter(course_id=course.pk).exists())
+        # La media que solo usaban las tareas borradas se borra; la del duplicado queda
+        self.assertFalse(MediaModel.objects.filter(pk__in=source_media).exists())
+        self.assertTrue(MediaModel.objects.filter(true_or_false_tasks__class_model__course=clone).exists())
+
+        # El barrido restó las referencias del original; el duplicado conserva el blob
+        self.assertFalse(FileCleanupModel.objects.exists())
+        self.assertEqual(MediaBlobModel.objects.get(name=blob).ref_count, 2)
+        self.assertTrue(default_storage.exists(blob))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_courses([clone.pk])
+        self.assertFalse(MediaBlobModel.objects.filter(name=blob).exists())
+        self.assertFalse(default_storage.exists(blob))
+
+    def test_sweep_removes_variants_once_unused(self):
+        course = CourseModel.objects.create(course_name='Curso')
+        course.cover.save('portada.png', ContentFile(png_bytes(400, 200)))
+        variants = [item['name'] for item in generate_derivatives(CourseModel, course.pk, 'cover')['variants']]
+        clone, _copied = clone_course(course)
+
+        # El duplicado comparte blob y derivados: siguen en disco
+        delete_courses([course.pk])
+        sweep_files()
+        self.assertTrue(all(default_storage.exists(name) for name in variants))
+        self.assertFalse(MediaBlobModel.objects.filter(name__in=variants).exists())
+
+        clone.delete()
+        sweep_files()
+        self.assertFalse(any(default_storage.exists(name) for name in variants))
+        self.assertFalse(FileCleanupModel.objects.exists())
+
+    def test_sweep_keeps_blob_still_used_without_reference(self):
+        course, blob = self.build_course(size=1)
+        first, second = course.classes.order_by('pk')
+        # Filas que apuntan al blob sin haber sumado su referencia: el contador se queda corto
+        ClassContentModel.objects.filter(class_id=first).update(image=blob)
+
+        delete_classes([second.pk])
+        sweep_files()
+        self.assertTrue(default_storage.exists(blob))
+        self.assertEqual(MediaBlobModel.objects.get(name=blob).ref_count, ClassContentModel.objects.filter(image=blob).count())
+
+    def test_delete_queries_do_not_grow_with_size(self):
+        small, _blob = self.build_course(size=1)
+        large, _blob = self.build_course(size=6)
+        with CaptureQueriesContext(connection) as small_queries:
+            delete_courses([small.pk])
+        # Sin el trabajo de limpieza pendiente, que se reutilizaría en lugar de crearse
+        JobModel.objects.all().delete()
+        with CaptureQueriesContext(connection) as large_queries:
+            delete_courses([large.pk])
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_class_and_content_delete_endpoints_defer_files(self):
+        course, blob = self.build_course(size=1)
+        content = ClassContentModel.objects.get(image=blob)
+        get_outline(course.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/dashboard/api/class-contents/{content.pk}/').status_code, 200)
+        # La petición no toca el archivo: solo anota el campo image y la entrada de multimedia
+        self.assertEqual(list(FileCleanupModel.objects.values_list('name', flat=True)), [blob, blob])
+        self.assertTrue(default_storage.exists(blob))
+        self.assertEqual(sweep_files(), (2, 0))
+        self.assertFalse(default_storage.exists(blob))
+
+        class_instance = course.classes.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/dashboard/api/clases/delete/{class_instance.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['deleted']['classmodel'], 1)
+        outline, _version = get_outline(course.pk)
+        self.assertNotIn(class_instance.pk, [entry['id'] for entry in outline['classes']])
+        self.assertEqual(self.client.delete(f'/dashboard/api/clases/delete/{class_instance.pk}/').status_code, 404)
+
+    def test_orphan_scan_reports_unreferenced_files(self):
+        _course, blob = self.build_course(size=1)
+        derivative = variant_name(blob, 320)
+        default_storage.save_alongside(derivative, ContentFile(b'webp'))
+        orphan = os.path.join(self.media_root.name, 'content_images', 'perdida.png')
+        os.makedirs(os.path.dirname(orphan))
+        with open(orphan, 'wb') as target:
+            target.write(b'sin fila')
+        partial = os.path.join(self.upload_dir.name, 'abandonada.part')
+        with open(partial, 'wb') as target:
+            target.write(b'parcial')
+
+        report = find_orphan_files(timedelta(0))
+        self.assertEqual(report['orphans'], [('content_images/perdida.png', 8)])
+        self.assertEqual(report['partials'], [(partial, 7)])
+        self.assertIn('task_media/shared.png', report['missing'])
+        # Los archivos recientes pueden ser de una subida sin confirmar
+        self.assertEqual(find_orphan_files(timedelta(hours=1))['orphans'], [])
+
+        call_command('scan_orphan_files', '--delete', '--min-age-hours', '0', stdout=io.StringIO())
+        self.assertFalse(os.path.exists(orphan) or os.path.exists(partial))
+        self.assertTrue(default_storage.exists(blob) and default_storage.exists(derivative))
+
+
+class GradingTests(TestCase):
+    def test_samples_compile_and_score(self):
+        knowledge_checks = {content_type for content_type, _label in ClassContentModel.CONTENT_TYPES if content_type.endswith('_knowledge_check')}
+        self.assertLessEqual(knowledge_checks, set(CONTENT_SLOTS))
+        for content_type in CONTENT_SLOTS:
+            key = compile_content(content_type, SAMPLE_CONTENT_DETAILS[content_type])
+            correct = key.correct_answers()
+            self.assertEqual(key.score(correct)['score'], 1.0, content_type)
+            batch = key.score_batch([correct, [None] * len(key)])
+            self.assertEqual([result['score'] for result in batch['results']], [1.0, 0.0], content_type)
+            self.assertEqual(batch['slot_accuracy'], [0.5] * len(key))
+        with self.assertRaises(NotGradable):
+            compile_content('text_block', SAMPLE_CONTENT_DETAILS['text_block'])
+        with self.assertRaises(NotGradable):
+            compile_content('ordering_knowledge_check', {'ordering': [{'text': 'sin indice'}]})
+
+    def test_batch_matches_single_scoring(self):
+        rng = random.Random(3)
+        noise = [None, -1, 0, 1, 2, 3, True, False, 1.0, 2 ** 70, 'true', 'False', 'hidrogeno', ' Texto ', [], [0], [0, 1], {}]
+        for content_type in ('multiple_choice', 'true_false', 'fill_gaps', 'word_bank', 'ordering', 'matching'):
+            key = compile_content(content_type, SAMPLE_CONTENT_DETAILS[content_type])
+            correct = key.correct_answers()
+            submissions = [
+                [answer if rng.random() < 0.5 else rng.choice(noise) for answer in correct]
+                for _ in range(200)
+            ]
+            # Columnas de un solo tipo (enteros o textos), que toman el camino vectorizado
+            submissions += [list(correct) for _ in range(20)] + [[rng.randrange(4) for _ in correct] for _ in range(20)]
+            batch = key.score_batch(submissions, details=True)['results']
+            for submission, result in zip(submissions, batch):
+                self.assertEqual(key.score(submission), result, (content_type, submission))
+        with self.assertRaisesRegex(ValueError, r'^\[1\]'):
+            key.score_batch([correct, correct[:-1]])
+
+    def test_answer_rules_and_task_keys(self):
+        key = compile_content('fill_gaps', SAMPLE_CONTENT_DETAILS['fill_gaps'])
+        self.assertEqual([key.score([answer])['points'] for answer in (' HIDROGENO ', 'hidrógeno', 'helio')], [1, 0, 0])
+        key = compile_content('true_false', SAMPLE_CONTENT_DETAILS['true_false'])
+        self.assertEqual(key.score(['false', True, 3])['points'], 3)
+        self.assertEqual(key.score([False, 'TRUE', 'not_stated'])['points'], 3)
+        key = compile_content('multiple_choice', {'questions': [{'question': '?', 'answers': [
+            {'text': 'A', 'is_correct': True}, {'text': 'B', 'is_correct': False}, {'text': 'C', 'is_correct': True},
+        ]}]})
+        self.assertEqual([key.score([answer])['points'] for answer in ([0, 2], [2, 0], [0], [0, 1, 2])], [1, 1, 0, 0])
+
+        class_instance = create_class(size=1)
+        task_answers = [
+            (MultipleChoiceModel, [0]),
+            (TrueOrFalseModel, ['true']),
+            (OrderingTaskModel, [1, 2]),
+            (CategoriesTaskModel, [0, 0]),
+            (FillInTheGapsTaskModel, ['earth']),
+        ]
+        for model, answers in task_answers:
+            task = model.objects.get(class_model=class_instance)
+            self.assertEqual(load_key(model, task.pk).score(answers)['score'], 1.0, model.__name__)
+        self.assertIsNone(load_key(MultipleChoiceModel, 999))
+
+    def test_grading_endpoint(self):
+        class_instance = create_class(size=1)
+        content = ClassContentModel.objects.create(
+            class_id=class_instance, content_type='matching_knowledge_check', order=5,
+            content_details=SAMPLE_CONTENT_DETAILS['matching_knowledge_check'],
+        )
+        url = f'/dashboard/api/grading/class-contents/{content.pk}/'
+        response = self.client.post(url, {'submissions': [[0, 1], [1, 0], [0, 0]]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([result['points'] for result in data['results']], [2, 0, 1])
+        self.assertEqual((data['slots'], data['mean_score'], data['slot_accuracy']), (2, 0.5, [0.6667, 0.3333]))
+
+        response = self.client.post(url, {'answers': [0, 0]}, content_type='application/json')
+        self.assertEqual(response.json()['data']['correct'], [True, False])
+        task = MultipleChoiceModel.objects.get(class_model=class_instance)
+        response = self.client.post(
+            f'/dashboard/api/grading/multiplechoice/{task.pk}/', {'submissions': [[0], [1]], 'details': True},
+            content_type='application/json',
+        )
+        self.assertEqual([result['correct'] for result in response.json()['data']['results']], [[True], [False]])
+
+        response = self.client.post(url, {'submissions': [[0, 1], [0]]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('submissions', response.json()['campos_con_error'])
+        text_block = class_instance.contents.get(content_type='text_block')
+        self.assertEqual(self.client.post(f'/dashboard/api/grading/class-contents/{text_block.pk}/', {'answers': []}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post('/dashboard/api/grading/layouts/1/', {'answers': []}, content_type='application/json').status_code, 404)
@@ -0,0 +1,204 @@
+"""
+Subidas por partes y reanudables para los campos video, audio y pdf de ClassContentModel.
+
+Flujo:
+  1. start_upload crea la sesión (ChunkedUploadModel) y un archivo parcial vacío en CHUNKED_UPLOAD_DIR.
+  2. append_chunk escribe cada parte en su offset, copiando el cuerpo de la petición por bloques sin
+     cargarlo en memoria. Si la conexión se corta, el cliente consulta el offset y continúa desde ahí.
+  3. finish_upload verifica el SHA-256 y mueve el archivo parcial a su ruta definitiva en el storage
+     (un rename si están en el mismo disco; con ContentAddressedStorage, a su blob) antes de
+     asignarlo al campo del contenido.
+"""
+import hashlib
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import ChunkedUploadModel
+
+UPLOAD_FIELDS = dict(ChunkedUploadModel.FIELD_CHOICES)
+
+# Tamaño de bloque para copiar el cuerpo de la petición y calcular el checksum
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadConflict(APIException):
+    """El offset de la parte no coincide con lo recibido, o la subida no está en el estado esperado"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Conflicto con el estado de la subida'
+
+    def __init__(self, detail=None, offset=None):
+        super().__init__(detail)
+        self.offset = offset
+
+
+def partial_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def start_upload(content, field, filename, size, checksum=None):
+    """Crea la sesión de subida para content.<field>. Lanza ValidationError si los datos no son válidos."""
+    errors = {}
+    if field not in UPLOAD_FIELDS:
+        errors['field'] = [f'Debe ser uno de {sorted(UPLOAD_FIELDS)}']
+    filename = os.path.basename(str(filename or '')).strip()
+    if not filename:
+        errors['filename'] = ['Debe indicar el nombre del archivo']
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        errors['size'] = ['Debe ser un entero positivo']
+    elif size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        errors['size'] = [f'El tamaño máximo es {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes']
+    if checksum is not None and not _is_sha256(checksum):
+        errors['checksum'] = ['Debe ser un SHA-256 en hexadecimal']
+    if errors:
+        raise ValidationError(errors)
+
+    upload = ChunkedUploadModel.objects.create(
+        content=content, field=field, filename=filename, size=size,
+        checksum=checksum.lower() if checksum else None,
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload_id, offset, stream, length):
+    """
+    Escribe `length` bytes leídos de `stream` a partir de `offset`. El offset debe ser el que indica
+    la sesión (o uno anterior, para reenviar una parte que no se confirmó). Si el stream se corta
+    antes de tiempo se guarda lo recibido y el cliente puede continuar desde el nuevo offset.
+    """
+    if not isinstance(length, int) or length < 0:
+        raise ValidationError({'Content-Length': ['Debe indicar la longitud de la parte']})
+    if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise ValidationError({'Content-Length': [f'Cada parte admite como máximo {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes']})
+
+    upload = ChunkedUploadModel.objects.get(pk=upload_id)
+    if upload.status != 'uploading':
+        raise UploadConflict('La subida ya se completó', offset=upload.offset)
+    if offset is None or offset < 0 or offset > upload.offset:
+        raise UploadConflict(f'Offset esperado: {upload.offset}', offset=upload.offset)
+    if offset + length > upload.size:
+        raise ValidationError({'Content-Length': [f'La parte excede el tamaño declarado ({upload.size} bytes)']})
+
+    # El cuerpo (que puede llegar despacio) se copia sin transacción ni bloqueos en la base de datos
+    written = 0
+    with open(partial_path(upload), 'r+b') as target:
+        # Todo lo que hubiera después del offset se descarta: la parte lo reemplaza
+        target.seek(offset)
+        target.truncate()
+        while written < length:
+            block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            target.write(block)
+            written += len(block)
+
+    # Solo avanza si nadie cambió la sesión mientras tanto; si dos partes compiten, una recibe 409
+    # y reenvía desde el offset actual (finish_upload verifica el checksum del archivo completo)
+    advanced = ChunkedUploadModel.objects.filter(pk=upload.pk, status='uploading', offset=upload.offset).update(
+        offset=offset + written, updated_at=timezone.now(),
+    )
+    if not advanced:
+        current = ChunkedUploadModel.objects.filter(pk=upload.pk).values_list('offset', flat=True).first()
+        raise UploadConflict('La subida cambió mientras se recibía la parte', offset=current)
+    upload.offset = offset + written
+    return upload
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(COPY_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finish_upload(upload_id, checksum=None):
+    """
+    Verifica el checksum y asigna el archivo al campo del contenido. El checksum puede venir aquí
+    o al crear la sesión; si no hay ninguno se rechaza. Devuelve el ClassContentModel actualizado.
+    """
+    with transaction.atomic():
+        upload = ChunkedUploadModel.objects.select_for_update().select_related('content').get(pk=upload_id)
+        if upload.status != 'uploading':
+            raise UploadConflict('La subida ya se completó', offset=upload.offset)
+        if upload.offset != upload.size:
+            raise UploadConflict(f'Faltan {upload.size - upload.offset} bytes', offset=upload.offset)
+
+        expected = (checksum or upload.checksum or '').lower()
+        if not _is_sha256(expected):
+            raise ValidationError({'checksum': ['Debe indicar el SHA-256 del archivo en hexadecimal']})
+        # Lectura secuencial del disco local; el archivo no vuelve a pasar por la red ni por Django
+        if file_checksum(partial_path(upload)) != expected:
+            raise ValidationError({'checksum': ['El checksum no coincide con los datos recibidos']})
+
+        content = upload.content
+        field_file = getattr(content, upload.field)
+        field_file.name = _store(upload, field_file, expected)
+        # media_info: pre_save descartó el análisis del archivo anterior
+        content.save(update_fields=[upload.field, 'media_info', 'updated_at'])
+
+        upload.status = 'complete'
+        upload.save(update_fields=['status', 'updated_at'])
+    return content
+
+
+def _store(upload, field_file, sha256):
+    """Lleva el archivo parcial a su ruta definitiva en el storage del campo y devuelve el nombre"""
+    storage = field_file.storage
+    name = field_file.field.generate_filename(upload.content, upload.filename)
+    source = partial_path(upload)
+    if hasattr(storage, 'adopt'):
+        # Storage por contenido: el hash ya está calculado, el archivo se mueve a su blob
+        return storage.adopt(source, name, sha256=sha256)
+    try:
+        target = storage.path(storage.get_available_name(name))
+    except NotImplementedError:
+        # Storage remoto: se sube el archivo completo en una sola pasada
+        with open(source, 'rb') as data:
+            name = storage.save(name, File(data, name=upload.filename))
+        os.remove(source)
+        return name
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    return os.path.relpath(target, storage.location).replace(os.sep, '/')
+
+
+def abort_upload(upload):
+    """Elimina la sesión y su archivo parcial"""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def delete_expired_uploads(max_age=None):
+    """Elimina las subidas sin completar sin actividad desde hace `max_age`. Devuelve cuántas."""
+    if max_age is None:
+        max_age = timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRATION_HOURS)
+    expired = ChunkedUploadModel.objects.filter(status='uploading', updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for upload in expired.iterator():
+        abort_upload(upload)
+        count += 1
+    return count
+
+
+def _is_sha256(value):
+    if not isinstance(value, str) or len(value) != 64:
+        return False
+    try:
+        int(value, 16)
+    except ValueError:
+        return False
+    return True
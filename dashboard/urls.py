@@ -15,11 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 from . import api
-from .views import LayoutDetailView, ClasDeleteView, ClassTasksView, TaskLayoutDetailView
+from . import async_views
+from .views import LayoutDetailView, ClasDeleteView, ClassTasksView, ClassBundleView, TaskLayoutDetailView
 
 # Inicializa el router
 router = DefaultRouter()
@@ -36,7 +38,20 @@ router.register(r'fillinthegaps', api.FillInTheGapsTaskModelViewSet)
 router.register(r'multimediablockvideos', views.MultimediaBlockVideoViewSet, 'multimediablockvideos')
 router.register(r'class-contents', views.ClassContentModelViewSet, 'class-contents')
 
-urlpatterns = [
+# Con ASYNC_READ_VIEWS (servidor ASGI) los GET más frecuentes van a las vistas async, que delegan
+# los demás métodos en las vistas DRF de las mismas rutas
+async_urlpatterns = [
+    path('api/courses/', async_views.course_list, name='courses-list-async'),
+    path('api/class-contents/', async_views.class_content_list, name='class-contents-list-async'),
+    path('api/classes/<int:class_id>/bundle/', async_views.class_bundle, name='class-bundle-async'),
+]
+
+urlpatterns = (async_urlpatterns if settings.ASYNC_READ_VIEWS else []) + [
+    # Antes del router: 'bulk-import' coincidiría con la ruta de detalle class-contents/<pk>/
+    path('api/class-contents/bulk-import/', views.ClassContentBulkImportView.as_view(), name='class-contents-bulk-import'),
+    path('api/class-contents/<int:pk>/uploads/', views.ChunkedUploadStartView.as_view(), name='class-contents-upload-start'),
+    path('api/uploads/<uuid:upload_id>/', views.ChunkedUploadView.as_view(), name='chunked-upload'),
+    path('api/uploads/<uuid:upload_id>/complete/', views.ChunkedUploadCompleteView.as_view(), name='chunked-upload-complete'),
     path('api/', include(router.urls)),
     path('courses/', views.course_list, name='course_list'),
     path('courses/<int:course_id>/classes/<int:class_id>/', views.ClassDetailView.as_view(), name='class_detail'),
@@ -47,6 +62,15 @@ urlpatterns = [
     path('api/layouts/<int:pk>/', LayoutDetailView.as_view(), name='layout-detail'),
     path('api/clases/delete/<int:pk>/', ClasDeleteView.as_view(), name='clas-delete'),
     path('api/classes/<int:class_id>/tasks/', ClassTasksView.as_view(), name='class-tasks'),
+    path('api/classes/<int:class_id>/bundle/', ClassBundleView.as_view(), name='class-bundle'),
+    path('api/classes/<int:class_id>/reorder/<str:target>/', views.ClassReorderView.as_view(), name='class-reorder'),
+    path('api/courses/<int:course_id>/export/', views.CourseExportView.as_view(), name='course-export'),
+    path('api/courses/<int:course_id>/grades/', views.CourseGradesView.as_view(), name='course-grades'),
+    path('api/courses/<int:course_id>/outline/', views.CourseOutlineView.as_view(), name='course-outline'),
+    path('api/courses/<int:course_id>/clone/', views.CourseCloneView.as_view(), name='course-clone'),
+    path('api/classes/<int:class_id>/clone/', views.ClassCloneView.as_view(), name='class-clone'),
+    path('api/search/', views.SearchView.as_view(), name='search'),
+    path('api/grading/<str:target>/<int:pk>/', views.GradingView.as_view(), name='grading'),
     path('api/task_layout/<int:layout_id>/', TaskLayoutDetailView.as_view(), name='task-layout-detail'),
     path('api/class-contents/', views.ClassContentModelViewSet.as_view({
         'get': 'list',
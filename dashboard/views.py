@@ -1,8 +1,23 @@
 from django.shortcuts import render, redirect
 from rest_framework import viewsets
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from .serializers import CourseModelSerializer, ClassModelSerializer, LayoutModelSerializer, MultipleChoiceModelSerializer,  TrueOrFalseModelSerializer, OrderingTaskModelSerializer, CategoriesTaskModelSerializer, FillInTheGapsTaskModelSerializer, VideoLayoutModelSerializer, TextBlockLayoutModelSerializer, MediaModelSerializer, MultimediaBlockVideoModelSerializer, ClassContentModelSerializer
-from .models import CourseModel, ClassModel, LayoutModel, MultipleChoiceModel,TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel, MediaModel, MultimediaBlockVideoModel, ClassContentModel
+from .models import CourseModel, ClassModel, LayoutModel, MultipleChoiceModel,TrueOrFalseModel, OrderingTaskModel, CategoriesTaskModel, FillInTheGapsTaskModel, VideoLayoutModel, TextBlockLayoutModel, MediaModel, MultimediaBlockVideoModel, ClassContentModel, ChunkedUploadModel
+from .bundles import load_class_bundle, serialize_class_bundle, build_class_bundle
+from .content_cache import CLASS_SCOPE, COURSE_SCOPE, CATALOG_SCOPE, cached_payload
+from .conditional import conditional_response, versioned_response
+from .pagination import KeysetPagination, CreatedAtKeysetPagination
+from .export import DEFAULT_CHUNK_SIZE, iter_course_ndjson, iter_course_zip
+from .importer import DEFAULT_BATCH_SIZE, import_class_contents
+from .reorder import REORDER_TARGETS, parse_reorder_payload, reorder
+from .uploads import UploadConflict, abort_upload, append_chunk, finish_upload, start_upload
+from .grades import CourseNotSynced, get_report, invalidate_grades, schedule_refresh
+from .cloning import clone_class, clone_course
+from .deletion import delete_classes, delete_courses
+from .outline import get_outline
+from .search import SEARCH_SOURCES, parse_query, search
+from .grading import GRADING_TARGETS, NotGradable, load_key
+from datetime import datetime, timezone as dt_timezone
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from rest_framework.response import Response
@@ -13,7 +28,6 @@ from rest_framework.views import APIView
 from rest_framework.generics import RetrieveAPIView
 from rest_framework import generics
 import logging
-from django.core.files.storage import default_storage
 import json
 
 # Configurar el logger
@@ -22,6 +36,44 @@ logger = logging.getLogger(__name__)
 # Create your views here.
 
 
+class SparseListMixin:
+    """
+    Listados con ?fields= (campos a serializar, solo se leen esas columnas) y paginación por
+    cursor opcional (ver pagination.KeysetPagination).
+    """
+
+    def get_requested_fields(self):
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        return [name.strip() for name in raw.split(',') if name.strip()]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.get_requested_fields()
+        if fields:
+            context['fields'] = fields
+        return context
+
+    def restrict_columns(self, queryset):
+        fields = self.get_requested_fields()
+        if not fields:
+            return queryset
+        model_fields = self.get_serializer_class().model_fields_for(fields)
+        if not model_fields:
+            return queryset
+        ordering = getattr(self.pagination_class, 'ordering', ())
+        return queryset.only('id', *model_fields, *ordering)
+
+    def list_data(self, queryset):
+        """Devuelve (datos serializados, datos de paginación)"""
+        queryset = self.restrict_columns(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_serializer(page, many=True).data, self.paginator.get_pagination_data()
+        return self.get_serializer(queryset, many=True).data, {}
+
+
 class BaseModelViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         try:
@@ -107,6 +159,9 @@ class BaseModelViewSet(viewsets.ModelViewSet):
     def partial_update(self, request, *args, **kwargs):
         try:
             response = super().partial_update(request, *args, **kwargs)
+            if response.status_code >= 400:
+                # partial_update delega en update, que ya formatea sus errores
+                return response
             return Response({
                 'status': 'success',
                 'message': f'{self.model_name} actualizado parcialmente con éxito',
@@ -134,11 +189,12 @@ class BaseModelViewSet(viewsets.ModelViewSet):
                 'tipo_error': 'sistema'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class CourseView(BaseModelViewSet):
+class CourseView(SparseListMixin, BaseModelViewSet):
     serializer_class = CourseModelSerializer
     queryset = CourseModel.objects.all()
     model_name = 'curso'
     parser_classes = (MultiPartParser, FormParser)
+    pagination_class = CreatedAtKeysetPagination
 
     def create(self, request, *args, **kwargs):
         try:
@@ -156,10 +212,36 @@ class CourseView(BaseModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class ClassModelViewSet(BaseModelViewSet):
+    def list(self, request, *args, **kwargs):
+        # La lista de cursos se sirve desde caché hasta que cambie algún curso
+        return conditional_response(request, self.get_queryset(), lambda: Response(
+            cached_payload(request, CATALOG_SCOPE, None, self.build_list)
+        ))
+
+    def build_list(self):
+        data, pagination = self.list_data(self.get_queryset())
+        if pagination:
+            return {'data': data, **pagination}
+        return data
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.get_queryset().filter(pk=kwargs['pk']), lambda: self.build_detail(request), with_last_modified=True,
+        )
+
+    def build_detail(self, request):
+        instance = self.get_object()
+        return Response(cached_payload(request, COURSE_SCOPE, instance.pk, lambda: self.get_serializer(instance).data))
+
+    def perform_destroy(self, instance):
+        # Un DELETE por tabla en lugar del cascade fila a fila (ver deletion.py)
+        delete_courses([instance.pk])
+
+class ClassModelViewSet(SparseListMixin, BaseModelViewSet):
     queryset = ClassModel.objects.all()
     serializer_class = ClassModelSerializer
     model_name = 'clase'
+    pagination_class = CreatedAtKeysetPagination
 
     def get_queryset(self):
         """Filtra las clases por el course_id proporcionado en la URL o query params"""
@@ -177,15 +259,17 @@ class ClassModelViewSet(BaseModelViewSet):
         return queryset
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        
-        return Response({
+        data, pagination = self.list_data(self.get_queryset())
+        body = {
             'status': 'success',
             'message': 'Lista de clases obtenida exitosamente',
-            'data': serializer.data,
-            'total': queryset.count()  # Agregamos el total para verificación
-        })
+            'data': data,
+        }
+        if pagination:
+            body.update(pagination)
+        else:
+            body['total'] = len(data)  # Agregamos el total para verificación, sin un COUNT aparte
+        return Response(body)
 
     def create(self, request, *args, **kwargs):
         """Asegura que la clase se cree asociada al curso correcto"""
@@ -194,6 +278,9 @@ class ClassModelViewSet(BaseModelViewSet):
             request.data['course_id'] = course_id
         return super().create(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        delete_classes([instance.pk])
+
 class LayoutModelViewSet(BaseModelViewSet):
     queryset = LayoutModel.objects.all()
     serializer_class = LayoutModelSerializer
@@ -343,13 +430,14 @@ class ClasDeleteView(APIView):
     def delete(self, request, pk, format=None):
         try:
             class_instance = ClassModel.objects.get(pk=pk)
-            class_instance.delete()
+            deleted = delete_classes([class_instance.pk])
             return Response({
                 'status': 'success',
                 'message': 'Clase eliminada exitosamente',
                 'data': {
                     'id': class_instance.id,
                     'class_name': class_instance.class_name,
+                    'deleted': deleted,
                 }
             }, status=status.HTTP_200_OK)
         except ClassModel.DoesNotExist:
@@ -367,55 +455,52 @@ class ClasDeleteView(APIView):
 class ClassTasksView(APIView):
     def get(self, request, class_id, format=None):
         try:
-            class_instance = ClassModel.objects.get(id=class_id)
-            layouts = class_instance.layouts.all()
-            videos = class_instance.videos.all()
-            text_blocks = class_instance.text_blocks.all()
-
-            # Inicializar listas para las tareas y contenido
-            multiple_choice_tasks = []
-            true_or_false_tasks = []
-            ordering_tasks = []
-            categories_tasks = []
-            fill_in_the_gaps_tasks = []
-            media_items = set()  # Usamos un set para evitar duplicados
-
-            # Serializar los layouts
-            layouts_data = []
-            for layout in layouts:
-                layout_data = LayoutModelSerializer(layout).data
-                layout_data.update({
-                    'multiple_choice': MultipleChoiceModelSerializer(layout.questions.all(), many=True).data,
-                    'true_or_false': TrueOrFalseModelSerializer(layout.true_or_false_tasks.all(), many=True).data,
-                    'ordering': OrderingTaskModelSerializer(layout.ordering_tasks.all(), many=True).data,
-                    'categories': CategoriesTaskModelSerializer(layout.categories_tasks.all(), many=True).data,
-                    'fill_in_the_gaps': FillInTheGapsTaskModelSerializer(layout.fill_in_the_gaps_tasks.all(), many=True).data,
-                })
-                layouts_data.append(layout_data)
-
-                # Recopilar multimedia de las tareas
-                for task in layout.questions.all():
-                    media_items.update(task.media.all())
-                for task in layout.true_or_false_tasks.all():
-                    media_items.update(task.media.all())
-                for task in layout.ordering_tasks.all():
-                    media_items.update(task.media.all())
-                for task in layout.categories_tasks.all():
-                    media_items.update(task.media.all())
-                for task in layout.fill_in_the_gaps_tasks.all():
-                    media_items.update(task.media.all())
+            return Response(cached_payload(request, CLASS_SCOPE, class_id, lambda: self.build_payload(request, class_id)), status=status.HTTP_200_OK)
+        except ClassModel.DoesNotExist:
+            return Response({
+                'status': 'error',
+                'message': 'Clase no encontrada',
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({
+                'status': 'error',
+                'message': 'Error al obtener las tareas',
+                'detalle_error': str(e),
+            }, status=status.HTTP_400_BAD_REQUEST)
 
+    def build_payload(self, request, class_id):
+        # Toda la clase se carga en un número fijo de consultas (ver bundles.load_class_bundle)
+        bundle = load_class_bundle(class_id)
+        data = serialize_class_bundle(bundle, context={'request': request})
+        class_instance = bundle['class']
+
+        return {
+            'status': 'success',
+            'class_id': class_instance.id,
+            'class_name': class_instance.class_name,
+            'cover': class_instance.cover.url if class_instance.cover else None,
+            'description': class_instance.description,
+            'bullet_points': class_instance.bullet_points,
+            'task_layouts': data['layouts'],
+            'multiple_choice': data['multiple_choice_tasks'],
+            'true_or_false': data['true_or_false_tasks'],
+            'ordering': data['ordering_tasks'],
+            'categories': data['categories_tasks'],
+            'fill_in_the_gaps': data['fill_in_the_gaps_tasks'],
+            'video_layouts': data['video_layouts'],  # Videos separados
+            'text_blocks_layouts': data['text_blocks_layouts'],  # Textos separados
+            'media': data['media']
+        }
+
+class ClassBundleView(APIView):
+    """Devuelve la clase completa (layouts, tareas, bloques, contenidos y media) en una sola respuesta"""
+
+    def get(self, request, class_id, format=None):
+        try:
+            data = cached_payload(request, CLASS_SCOPE, class_id, lambda: build_class_bundle(class_id, context={'request': request}))
             return Response({
                 'status': 'success',
-                'class_id': class_instance.id,
-                'class_name': class_instance.class_name,
-                'cover': class_instance.cover.url if class_instance.cover else None,
-                'description': class_instance.description,
-                'bullet_points': class_instance.bullet_points,
-                'task_layouts': layouts_data,
-                'video_layouts': VideoLayoutModelSerializer(videos, many=True).data,  # Videos separados
-                'text_blocks_layouts': TextBlockLayoutModelSerializer(text_blocks, many=True).data,  # Textos separados
-                'media': MediaModelSerializer(list(media_items), many=True).data
+                'data': data
             }, status=status.HTTP_200_OK)
         except ClassModel.DoesNotExist:
             return Response({
@@ -425,7 +510,7 @@ class ClassTasksView(APIView):
         except Exception as e:
             return Response({
                 'status': 'error',
-                'message': 'Error al obtener las tareas',
+                'message': 'Error al obtener la clase completa',
                 'detalle_error': str(e),
             }, status=status.HTTP_400_BAD_REQUEST)
 
@@ -481,17 +566,18 @@ class TaskLayoutDetailView(APIView):
                 'detalle_error': str(e),
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class MultimediaBlockVideoViewSet(viewsets.ModelViewSet):
-    queryset = MultimediaBlockVideoModel.objects.all()
+class MultimediaBlockVideoViewSet(SparseListMixin, viewsets.ModelViewSet):
+    queryset = MultimediaBlockVideoModel.objects.order_by('order', 'id')
     serializer_class = MultimediaBlockVideoModelSerializer
+    pagination_class = KeysetPagination
 
     # Método para listar todos los videos
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        data, pagination = self.list_data(self.get_queryset())
         return Response({
             'status': 'success',
-            'data': serializer.data
+            'data': data,
+            **pagination
         }, status=status.HTTP_200_OK)
 
     def create(self, request, *args, **kwargs):
@@ -524,11 +610,12 @@ class MultimediaBlockVideoViewSet(viewsets.ModelViewSet):
                 'detalle_error': str(e),
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class ClassContentModelViewSet(BaseModelViewSet):
+class ClassContentModelViewSet(SparseListMixin, BaseModelViewSet):
     queryset = ClassContentModel.objects.all()
     serializer_class = ClassContentModelSerializer
     model_name = 'contenido de clase'
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Permite filtrar por class_id si se proporciona en la URL"""
@@ -536,7 +623,7 @@ class ClassContentModelViewSet(BaseModelViewSet):
         class_id = self.request.query_params.get('class_id', None)
         if class_id is not None:
             queryset = queryset.filter(class_id=class_id)
-        return queryset.order_by('order')
+        return queryset.order_by('order', 'id')
 
     def create(self, request, *args, **kwargs):
         try:
@@ -560,6 +647,9 @@ class ClassContentModelViewSet(BaseModelViewSet):
             
             # Crear el contenido usando el método de la clase padre
             response = super().create(request, *args, **kwargs)
+            if response.status_code >= 400:
+                # Errores de validación ya formateados por BaseModelViewSet
+                return response
             
             # Si llegamos aquí, la creación fue exitosa
             return Response({
@@ -589,6 +679,8 @@ class ClassContentModelViewSet(BaseModelViewSet):
             
             # Actualizar el contenido
             response = super().update(request, *args, **kwargs)
+            if response.status_code >= 400:
+                return response
             
             return Response({
                 'status': 'success',
@@ -612,6 +704,8 @@ class ClassContentModelViewSet(BaseModelViewSet):
     def partial_update(self, request, *args, **kwargs):
         try:
             response = super().partial_update(request, *args, **kwargs)
+            if response.status_code >= 400:
+                return response
             return Response({
                 'status': 'success',
                 'message': 'Contenido de clase actualizado parcialmente con éxito',
@@ -628,13 +722,7 @@ class ClassContentModelViewSet(BaseModelViewSet):
         try:
             instance = self.get_object()
             instance_id = instance.id
-            
-            # Eliminar archivos multimedia asociados si existen
-            if instance.multimedia:
-                for media_item in instance.multimedia:
-                    if media_item.get('file_info', {}).get('path'):
-                        default_storage.delete(media_item['file_info']['path'])
-            
+            # Los archivos (multimedia y campos de archivo) se borran después, ver file_cleanup.py
             super().destroy(request, *args, **kwargs)
             
             return Response({
@@ -652,18 +740,525 @@ class ClassContentModelViewSet(BaseModelViewSet):
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-            
+            # 304 si el cliente ya tiene la última versión de los contenidos
+            return conditional_response(request, self.get_queryset(), lambda: self.build_list(request))
+
+        except DRFValidationError as e:
             return Response({
-                'status': 'success',
-                'message': 'Lista de contenidos obtenida exitosamente',
-                'data': serializer.data
-            }, status=status.HTTP_200_OK)
-            
+                'status': 'error',
+                'message': 'Error en los parámetros de la lista',
+                'campos_con_error': e.detail,
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({
                 'status': 'error',
                 'message': 'Error al obtener la lista de contenidos',
                 'detalle_error': str(e),
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def build_list(self, request):
+        class_id = request.query_params.get('class_id')
+        if class_id is not None and class_id.isdigit():
+            # Los contenidos de una clase se sirven desde caché hasta que la clase cambie
+            body = cached_payload(request, CLASS_SCOPE, int(class_id), self.build_list_body)
+        else:
+            body = self.build_list_body()
+        return Response(body, status=status.HTTP_200_OK)
+
+    def build_list_body(self):
+        data, pagination = self.list_data(self.get_queryset())
+        return {
+            'status': 'success',
+            'message': 'Lista de contenidos obtenida exitosamente',
+            'data': data,
+            **pagination
+        }
+
+class CourseExportView(APIView):
+    """Exporta un curso completo en streaming (?export_format=zip por defecto, o ndjson)"""
+
+    def get(self, request, course_id, format=None):
+        if not CourseModel.objects.filter(pk=course_id).exists():
+            return Response({
+                'status': 'error',
+                'message': 'Curso no encontrado',
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        export_format = request.query_params.get('export_format', 'zip')
+        if export_format == 'ndjson':
+            response = StreamingHttpResponse(iter_course_ndjson(course_id, chunk_size=DEFAULT_CHUNK_SIZE), content_type='application/x-ndjson')
+            response['Content-Disposition'] = f'attachment; filename="course_{course_id}.ndjson"'
+        elif export_format == 'zip':
+            response = StreamingHttpResponse(iter_course_zip(course_id, chunk_size=DEFAULT_CHUNK_SIZE), content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="course_{course_id}.zip"'
+        else:
+            return Response({
+                'status': 'error',
+                'message': 'Formato de exportación no válido',
+                'campos_con_error': {'export_format': ['Debe ser zip o ndjson']},
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return response
+
+class CourseOutlineView(APIView):
+    """
+    Índice del curso para la navegación: clases y sus contenidos (id, título, tipo, orden y media),
+    leído de una sola fila (ver outline.py). El ETag es la versión del índice.
+    """
+
+    def get(self, request, course_id, format=None):
+        found = get_outline(course_id)
+        if found is None:
+            return Response({
+                'status': 'error',
+                'message': 'Curso no encontrado',
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        outline, version = found
+        return versioned_response(request, f'outline-{course_id}-{version}', lambda: Response({
+            'status': 'success',
+            'message': 'Índice del curso obtenido exitosamente',
+            'data': outline,
+        }))
+
+class CourseGradesView(APIView):
+    """
+    Informe de calificaciones del curso en Moodle (ver grades.py). Se sirve desde caché; si está
+    desactualizado se actualiza en segundo plano. Si todavía no hay informe responde 202 mientras se
+    construye. ?refresh=1 fuerza la actualización y DELETE descarta el informe cacheado.
+    """
+
+    def get(self, request, course_id, format=None):
+        if not CourseModel.objects.filter(pk=course_id).exists():
+            return Response({
+                'status': 'error',
+                'message': 'Curso no encontrado',
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            entry, stale = get_report(course_id)
+        except CourseNotSynced:
+            return Response({
+                'status': 'error',
+                'message': 'El curso no está sincronizado con Moodle',
+            }, status=status.HTTP_409_CONFLICT)
+
+        if entry is None:
+            return Response({
+                'status': 'success',
+                'message': 'El informe de calificaciones se está preparando',
+                'data': None,
+                'fetched_at': None,
+                'refreshing': True,
+            }, status=status.HTTP_202_ACCEPTED)
+        if request.query_params.get('refresh') == '1' and not stale:
+            schedule_refresh(course_id)
+            stale = True
+        return Response({
+            'status': 'success',
+            'message': 'Informe de calificaciones obtenido exitosamente',
+            'data': entry['report'],
+            'fetched_at': datetime.fromtimestamp(entry['fetched_at'], tz=dt_timezone.utc).isoformat(),
+            'refreshing': stale,
+        })
+
+    def delete(self, request, course_id, format=None):
+        invalidate_grades(course_id)
+        return Response({
+            'status': 'success',
+            'message': 'Informe de calificaciones descartado',
+        })
+
+class SearchView(APIView):
+    """
+    Búsqueda de texto completo en el contenido de las clases (ver search.py). Parámetros: q
+    (obligatorio), course_id, class_id, kind, limit y offset. Resultados ordenados por relevancia.
+    """
+
+    def get(self, request, format=None):
+        params = request.query_params
+        errors = {}
+        query = params.get('q', '').strip()
+        if not parse_query(query):
+            errors['q'] = ['Indique al menos una palabra a buscar']
+        filters = {}
+        for name in ('course_id', 'class_id', 'limit', 'offset'):
+            value = params.get(name)
+            if value is None:
+                continue
+            if not value.isdigit():
+                errors[name] = ['Debe ser un entero no negativo']
+            else:
+                filters[name] = int(value)
+        kind = params.get('kind')
+        if kind is not None and kind not in SEARCH_SOURCES:
+            errors['kind'] = [f"Debe ser uno de: {', '.join(SEARCH_SOURCES)}"]
+        if errors:
+            return Response({
+                'status': 'error',
+                'message': 'Error en la validación de datos',
+                'campos_con_error': errors,
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = min(filters.pop('limit', settings.SEARCH_DEFAULT_LIMIT), settings.SEARCH_MAX_LIMIT) or 1
+        # Se pide un resultado de más para saber si hay otra página sin contar el total
+        hits = search(query, kind=kind, limit=limit + 1, **filters)
+        return Response({
+            'status': 'success',
+            'message': 'Resultados de la búsqueda',
+            'data': hits[:limit],
+            'has_more': len(hits) > limit,
+        })
+
+class ClassContentBulkImportView(APIView):
+    """
+    Importa contenidos de clase en lote desde NDJSON: cuerpo application/x-ndjson o archivo
+    multipart en el campo 'file'. ?class_id= se usa para las filas que no indican clase.
+    """
+
+    def post(self, request, format=None):
+        default_class_id = request.query_params.get('class_id')
+        try:
+            batch_size = int(request.query_params.get('batch_size', DEFAULT_BATCH_SIZE))
+        except ValueError:
+            batch_size = 0
+        if batch_size < 1:
+            return Response({
+                'status': 'error',
+                'message': 'Error en la validación de datos',
+                'campos_con_error': {'batch_size': ['Debe ser un entero positivo']},
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({
+                    'status': 'error',
+                    'message': 'Error en la validación de datos',
+                    'campos_con_error': {'file': ['Debe adjuntar un archivo NDJSON']},
+                    'tipo_error': 'validación'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            lines = upload
+        else:
+            # El cuerpo se lee línea a línea, sin cargarlo entero en memoria
+            lines = request.stream or []
+
+        report = import_class_contents(lines, batch_size=batch_size, default_class_id=default_class_id)
+        return Response({
+            'status': 'success' if report.created or not report.errors else 'error',
+            'message': f'{report.created} contenidos importados, {len(report.errors)} con errores',
+            'data': report.as_dict()
+        }, status=status.HTTP_200_OK if report.created or not report.errors else status.HTTP_400_BAD_REQUEST)
+
+class ClassReorderView(APIView):
+    """
+    Reordena en una sola operación los contenidos o un tipo de tarea de la clase.
+    Cuerpo: [{"id": 1, "order": 0}, ...] o [[1, 0], ...]
+    """
+    parser_classes = (JSONParser,)
+
+    def post(self, request, class_id, target, format=None):
+        if target not in REORDER_TARGETS:
+            return Response({
+                'status': 'error',
+                'message': f'No se puede reordenar {target}',
+            }, status=status.HTTP_404_NOT_FOUND)
+        if not ClassModel.objects.filter(pk=class_id).exists():
+            return Response({
+                'status': 'error',
+                'message': 'Clase no encontrada',
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            updated = reorder(target, class_id, parse_reorder_payload(request.data))
+        except DRFValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': 'Error en la validación de datos',
+                'campos_con_error': e.detail,
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'message': 'Orden actualizado exitosamente',
+            'data': {'updated': updated}
+        }, status=status.HTTP_200_OK)
+
+    patch = post
+
+
+def clone_name(request, field, max_length):
+    """Nombre opcional de la copia en el cuerpo; lanza ValidationError si no es válido"""
+    value = request.data.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str) or not value.strip() or len(value) > max_length:
+        raise DRFValidationError({field: [f'Debe ser un texto de 1 a {max_length} caracteres']})
+    return value.strip()
+
+
+class CourseCloneView(APIView):
+    """
+    Duplica el curso con todas sus clases, contenidos, tareas y media (ver cloning.py).
+    Cuerpo opcional: {"course_name": "..."}; por defecto el nombre original con " (copia)".
+    """
+    parser_classes = (JSONParser,)
+
+    def post(self, request, course_id, format=None):
+        course = CourseModel.objects.filter(pk=course_id).first()
+        if course is None:
+            return Response({
+                'status': 'error',
+                'message': 'Curso no encontrado',
+            }, status=status.HTTP_404_NOT_FOUND)
+        try:
+            course_name = clone_name(request, 'course_name', CourseModel._meta.get_field('course_name').max_length)
+        except DRFValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': 'Error en la validación de datos',
+                'campos_con_error': e.detail,
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        clone, copied = clone_course(course, course_name=course_name)
+        return Response({
+            'status': 'success',
+            'message': 'Curso duplicado exitosamente',
+            'data': {'id': clone.id, 'course_name': clone.course_name, 'copied': copied},
+        }, status=status.HTTP_201_CREATED)
+
+
+class ClassCloneView(APIView):
+    """
+    Duplica una clase con todo su contenido. Cuerpo opcional: {"course_id": 2, "class_name": "..."};
+    por defecto la copia queda en el mismo curso.
+    """
+    parser_classes = (JSONParser,)
+
+    def post(self, request, class_id, format=None):
+        class_instance = ClassModel.objects.filter(pk=class_id).first()
+        if class_instance is None:
+            return Response({
+                'status': 'error',
+                'message': 'Clase no encontrada',
+            }, status=status.HTTP_404_NOT_FOUND)
+        try:
+            class_name = clone_name(request, 'class_name', ClassModel._meta.get_field('class_name').max_length)
+            course = None
+            course_id = request.data.get('course_id')
+            if course_id is not None:
+                if str(course_id).isdigit():
+                    course = CourseModel.objects.filter(pk=course_id).first()
+                if course is None:
+                    raise DRFValidationError({'course_id': ['El curso no existe']})
+        except DRFValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': 'Error en la validación de datos',
+                'campos_con_error': e.detail,
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        clone, copied = clone_class(class_instance, course=course, class_name=class_name)
+        return Response({
+            'status': 'success',
+            'message': 'Clase duplicada exitosamente',
+            'data': {'id': clone.id, 'class_name': clone.class_name, 'course_id': clone.course_id, 'copied': copied},
+        }, status=status.HTTP_201_CREATED)
+
+
+class GradingView(APIView):
+    """
+    Corrige entregas de una actividad (ver grading.py): un contenido de clase o una tarea.
+    Cuerpo: {"answers": [...]} para una entrega o {"submissions": [[...], ...], "details": false}
+    para un lote; cada entrega es la lista de respuestas en el orden de los huecos de la actividad.
+    """
+    parser_classes = (JSONParser,)
+
+    def post(self, request, target, pk, format=None):
+        model = GRADING_TARGETS.get(target)
+        try:
+            key = load_key(model, pk) if model is not None else None
+        except NotGradable as e:
+            return Response({
+                'status': 'error',
+                'message': 'La actividad no se puede corregir',
+                'detalle_error': str(e),
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if key is None:
+            return Response({
+                'status': 'error',
+                'message': 'Actividad no encontrada',
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        single = 'answers' in request.data
+        submissions = [request.data['answers']] if single else request.data.get('submissions')
+        field = 'answers' if single else 'submissions'
+        errors = {}
+        if not isinstance(submissions, list) or not submissions:
+            errors[field] = ['Debe ser una lista de respuestas' if single else 'Debe ser una lista de entregas no vacía']
+        elif len(submissions) > settings.GRADING_MAX_SUBMISSIONS:
+            errors[field] = [f'Como máximo {settings.GRADING_MAX_SUBMISSIONS} entregas por llamada']
+        else:
+            try:
+                if single:
+                    result = key.score(submissions[0])
+                else:
+                    batch = key.score_batch(submissions, details=bool(request.data.get('details')))
+            except ValueError as e:
+                errors[field] = [str(e)]
+        if errors:
+            return Response({
+                'status': 'error',
+                'message': 'Error en la validación de datos',
+                'campos_con_error': errors,
+                'tipo_error': 'validación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'message': 'Entregas corregidas',
+            'data': {'slots': len(key), **(result if single else batch)},
+        })
+
+
+def upload_response(upload, http_status=status.HTTP_200_OK, message='Estado de la subida'):
+    response = Response({
+        'status': 'success',
+        'message': message,
+        'data': {
+            'upload_id': str(upload.pk),
+            'content_id': upload.content_id,
+            'field': upload.field,
+            'filename': upload.filename,
+            'size': upload.size,
+            'offset': upload.offset,
+            'status': upload.status,
+            'max_chunk_size': settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE,
+        }
+    }, status=http_status)
+    response['Upload-Offset'] = str(upload.offset)
+    return response
+
+
+def upload_error_response(error):
+    if isinstance(error, UploadConflict):
+        response = Response({
+            'status': 'error',
+            'message': str(error.detail),
+            'data': {'offset': error.offset},
+        }, status=status.HTTP_409_CONFLICT)
+        if error.offset is not None:
+            response['Upload-Offset'] = str(error.offset)
+        return response
+    return Response({
+        'status': 'error',
+        'message': 'Error en la validación de datos',
+        'campos_con_error': error.detail,
+        'tipo_error': 'validación'
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ChunkedUploadStartView(APIView):
+    """
+    Inicia una subida por partes para el video, audio o pdf de un contenido.
+    Cuerpo: {"field": "video", "filename": "clase1.mp4", "size": 1073741824, "checksum": "<sha256 opcional>"}
+    """
+    parser_classes = (JSONParser,)
+
+    def post(self, request, pk, format=None):
+        try:
+            content = ClassContentModel.objects.get(pk=pk)
+        except ClassContentModel.DoesNotExist:
+            return Response({
+                'status': 'error',
+                'message': 'Contenido no encontrado',
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            upload = start_upload(
+                content, request.data.get('field'), request.data.get('filename'),
+                request.data.get('size'), request.data.get('checksum'),
+            )
+        except DRFValidationError as e:
+            return upload_error_response(e)
+        return upload_response(upload, status.HTTP_201_CREATED, 'Subida iniciada')
+
+
+class ChunkedUploadView(APIView):
+    """
+    GET: offset actual (para reanudar). PUT/PATCH: añade una parte; el cuerpo son los bytes crudos y el
+    offset va en la cabecera Upload-Offset (o ?offset=). DELETE: cancela la subida.
+    """
+    # El cuerpo no se parsea: se copia por bloques directamente al archivo parcial
+    parser_classes = ()
+
+    def get_upload(self, upload_id):
+        try:
+            return ChunkedUploadModel.objects.get(pk=upload_id)
+        except ChunkedUploadModel.DoesNotExist:
+            return None
+
+    def not_found(self):
+        return Response({
+            'status': 'error',
+            'message': 'Subida no encontrada',
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    def get(self, request, upload_id, format=None):
+        upload = self.get_upload(upload_id)
+        if upload is None:
+            return self.not_found()
+        return upload_response(upload)
+
+    def put(self, request, upload_id, format=None):
+        raw_offset = request.headers.get('Upload-Offset', request.query_params.get('offset'))
+        try:
+            offset = int(raw_offset)
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return upload_error_response(DRFValidationError({'Upload-Offset': ['Debe indicar el offset de la parte']}))
+
+        try:
+            upload = append_chunk(upload_id, offset, request.stream, length)
+        except ChunkedUploadModel.DoesNotExist:
+            return self.not_found()
+        except (UploadConflict, DRFValidationError) as e:
+            return upload_error_response(e)
+        return upload_response(upload, message='Parte recibida')
+
+    patch = put
+
+    def delete(self, request, upload_id, format=None):
+        upload = self.get_upload(upload_id)
+        if upload is None:
+            return self.not_found()
+        abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChunkedUploadCompleteView(APIView):
+    """Finaliza la subida: verifica el SHA-256 ({"checksum": "..."}) y asigna el archivo al contenido"""
+    parser_classes = (JSONParser,)
+
+    def post(self, request, upload_id, format=None):
+        try:
+            content = finish_upload(upload_id, request.data.get('checksum'))
+        except ChunkedUploadModel.DoesNotExist:
+            return Response({
+                'status': 'error',
+                'message': 'Subida no encontrada',
+            }, status=status.HTTP_404_NOT_FOUND)
+        except (UploadConflict, DRFValidationError) as e:
+            return upload_error_response(e)
+
+        return Response({
+            'status': 'success',
+            'message': 'Archivo subido exitosamente',
+            'data': ClassContentModelSerializer(content, context={'request': request}).data
+        }, status=status.HTTP_200_OK)
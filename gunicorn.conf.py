@@ -0,0 +1,26 @@
+"""
+Configuración de gunicorn (Procfile: `gunicorn -c gunicorn.conf.py`).
+
+SERVER_MODE elige cómo se sirve la aplicación:
+  - 'wsgi' (por defecto): pmback.wsgi con workers síncronos. Cada worker atiende una petición a la
+    vez, también mientras un cliente lento envía la petición o lee la respuesta.
+  - 'asgi': pmback.asgi con workers de uvicorn (uvicorn-worker). Cada worker mantiene muchas
+    conexiones abiertas en su bucle de eventos y las lecturas frecuentes usan las vistas async de
+    dashboard/async_views.py (ASYNC_READ_VIEWS).
+El número de workers es WEB_CONCURRENCY (lo lee gunicorn directamente).
+Comparativa de ambos modos con clientes lentos: `python manage.py bench_servers`.
+"""
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'pmback.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'pmback.wsgi:application'
+    worker_class = 'sync'
@@ -1,9 +1,83 @@
+"""
+Cliente del servicio web REST de Moodle.
+
+- Una sola requests.Session con un pool de conexiones del tamaño del pool de hilos: las llamadas
+  reutilizan conexiones TCP/TLS abiertas en lugar de abrir una por petición.
+- Timeouts de conexión y lectura en todas las llamadas, y reintentos con espera exponencial. Las
+  consultas (GET) se reintentan también ante 429/502/503/504; las escrituras (POST) solo si la
+  conexión falló antes de enviarse, para no crear dos veces el mismo usuario.
+- create_users / enrol_users envían muchos elementos por llamada (users[0..n], enrolments[0..n]).
+- map() y call_many() ejecutan llamadas independientes en paralelo, limitadas por rate_limit
+  (llamadas por segundo) para no saturar Moodle.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class MoodleError(Exception):
+    """Error devuelto por Moodle (respuesta con `exception` / `errorcode`)"""
+
+    def __init__(self, message, errorcode=None, wsfunction=None, debuginfo=None):
+        super().__init__(message)
+        self.errorcode = errorcode
+        self.wsfunction = wsfunction
+        self.debuginfo = debuginfo
+
+
+class RateLimiter:
+    """Espacia las llamadas para no superar `rate` por segundo, repartido entre todos los hilos"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def encode_params(prefix, value, params=None):
+    """
+    Aplana listas y diccionarios al formato de Moodle:
+    encode_params('users', [{'username': 'a'}]) -> {'users[0][username]': 'a'}
+    """
+    params = {} if params is None else params
+    if isinstance(value, dict):
+        for key, item in value.items():
+            encode_params(f'{prefix}[{key}]', item, params)
+    elif isinstance(value, (list, tuple)):
+        for index, item in enumerate(value):
+            encode_params(f'{prefix}[{index}]', item, params)
+    elif isinstance(value, bool):
+        params[prefix] = int(value)
+    elif value is not None:
+        params[prefix] = value
+    return params
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 
 class MoodleAPI:
-    def __init__(self, base_url, token):
+    def __init__(self, base_url, token, timeout=(5, 30), retries=3, backoff_factor=0.5,
+                 max_workers=8, rate_limit=None, batch_size=100):
         """
-        Inicializa la conexión con Moodle
+        Inicializa la conexión con Moodle.
+        timeout: (conexión, lectura) en segundos. rate_limit: llamadas por segundo (None = sin límite).
+        batch_size: elementos por llamada en create_users / enrol_users.
         """
         self.base_url = base_url
         self.token = token
@@ -11,114 +85,228 @@ class MoodleAPI:
             'wstoken': self.token,
             'moodlewsrestformat': 'json'
         }
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({'GET'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Llamadas genéricas
+    def call(self, wsfunction, params=None, write=False):
+        """
+        Llama a `wsfunction` y devuelve el JSON de la respuesta. `params` puede traer listas y
+        diccionarios anidados (se aplanan con encode_params). Las escrituras van por POST: los lotes
+        grandes no caben en la URL. Lanza MoodleError si Moodle devuelve una excepción.
+        """
+        data = {**self.base_params, 'wsfunction': wsfunction}
+        for key, value in (params or {}).items():
+            encode_params(key, value, data)
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait()
+        if write:
+            response = self.session.post(self.base_url, data=data, timeout=self.timeout)
+        else:
+            response = self.session.get(self.base_url, params=data, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        if isinstance(result, dict) and 'exception' in result:
+            raise MoodleError(
+                result.get('message', 'Error de Moodle'),
+                errorcode=result.get('errorcode'),
+                wsfunction=wsfunction,
+                debuginfo=result.get('debuginfo'),
+            )
+        return result
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='moodle')
+            return self._executor
+
+    def map(self, func, items):
+        """Aplica `func` a cada elemento en paralelo y devuelve los resultados en el mismo orden"""
+        items = list(items)
+        # Dentro de un hilo del pool (p. ej. create_users desde map) se ejecuta en serie: esperar
+        # a otras tareas del mismo pool podría bloquearlo
+        if len(items) <= 1 or threading.current_thread().name.startswith('moodle'):
+            return [func(item) for item in items]
+        return list(self._get_executor().map(func, items))
+
+    def call_many(self, calls):
+        """Ejecuta en paralelo una lista de (wsfunction, params[, write]) y devuelve sus resultados en orden"""
+        return self.map(lambda call: self.call(*call), calls)
 
     def get_site_info(self):
         """
         Obtiene información del sitio y verifica la conexión
         """
-        params = {
-            **self.base_params,
-            'wsfunction': 'core_webservice_get_site_info'
-        }
-        response = requests.get(self.base_url, params=params)
-        return response.json()
+        return self.call('core_webservice_get_site_info')
+
+    # Funciones de Usuarios
+    def create_users(self, users, batch_size=None):
+        """
+        Crea muchos usuarios con core_user_create_users, `batch_size` por llamada y los lotes en
+        paralelo. `users`: diccionarios con username, firstname, lastname, email, password...
+        (auth = 'manual' por defecto). Devuelve [{'id', 'username'}, ...] en el orden recibido.
+        """
+        users = [{'auth': 'manual', **user} for user in users]
+        batches = chunks(users, batch_size or self.batch_size)
+        results = self.map(lambda batch: self.call('core_user_create_users', {'users': batch}, write=True), batches)
+        return [user for batch in results for user in batch]
 
     def create_user(self, username, firstname, lastname, email, password):
         """
         Crea un nuevo usuario en Moodle
         """
-        params = {
-            **self.base_params,
-            'wsfunction': 'core_user_create_users',
-            'users[0][username]': username,
-            'users[0][firstname]': firstname,
-            'users[0][lastname]': lastname,
-            'users[0][email]': email,
-            'users[0][password]': password,
-            'users[0][auth]': 'manual'
-        }
-        response = requests.get(self.base_url, params=params)
-        return response.json()
+        return self.create_users([{
+            'username': username,
+            'firstname': firstname,
+            'lastname': lastname,
+            'email': email,
+            'password': password,
+        }])
 
     def get_user_by_field(self, field, value):
         """
         Busca usuarios por un campo específico (email, username, etc)
         """
-        params = {
-            **self.base_params,
-            'wsfunction': 'core_user_get_users_by_field',
-            'field': field,
-            'values[0]': value
-        }
-        response = requests.get(self.base_url, params=params)
-        return response.json()
+        return self.get_users_by_field(field, [value])
+
+    def get_users_by_field(self, field, values):
+        """
+        Busca muchos usuarios por un mismo campo en una sola llamada
+        """
+        return self.call('core_user_get_users_by_field', {'field': field, 'values': list(values)})
 
     def get_users(self, criteria_key, criteria_value):
         """
         Obtiene usuarios basado en criterios
         """
-        params = {
-            **self.base_params,
-            'wsfunction': 'core_user_get_users',
-            'criteria[0][key]': criteria_key,
-            'criteria[0][value]': criteria_value
-        }
-        response = requests.get(self.base_url, params=params)
-        return response.json()
+        return self.call('core_user_get_users', {'criteria': [{'key': criteria_key, 'value': criteria_value}]})
 
     def update_user(self, user_id, **user_data):
         """
         Actualiza la información de un usuario
         """
-        params = {
-            **self.base_params,
-            'wsfunction': 'core_user_update_users',
-            'users[0][id]': user_id
-        }
-        
-        # Agregar campos a actualizar
-        for key, value in user_data.items():
-            params[f'users[0][{key}]'] = value
+        return self.update_users([{'id': user_id, **user_data}])
 
-        response = requests.get(self.base_url, params=params)
-        return response.json()
+    def update_users(self, users, batch_size=None):
+        """
+        Actualiza muchos usuarios (diccionarios con `id` y los campos a cambiar), por lotes
+        """
+        batches = chunks(users, batch_size or self.batch_size)
+        self.map(lambda batch: self.call('core_user_update_users', {'users': batch}, write=True), batches)
 
     # Funciones de Cursos
     def create_course(self, fullname, shortname, categoryid):
-        params = {
-            **self.base_params,
-            'wsfunction': 'core_course_create_courses',
-            'courses[0][fullname]': fullname,
-            'courses[0][shortname]': shortname,
-            'courses[0][categoryid]': categoryid
-        }
-        return self._make_request(params)
+        return self.create_courses([{'fullname': fullname, 'shortname': shortname, 'categoryid': categoryid}])
+
+    def create_courses(self, courses, batch_size=None):
+        """
+        Crea muchos cursos por lotes. Devuelve [{'id', 'shortname'}, ...] en el orden recibido.
+        """
+        batches = chunks(courses, batch_size or self.batch_size)
+        results = self.map(lambda batch: self.call('core_course_create_courses', {'courses': batch}, write=True), batches)
+        return [course for batch in results for course in batch]
+
+    def update_courses(self, courses, batch_size=None):
+        """
+        Actualiza muchos cursos (diccionarios con `id` y los campos a cambiar), por lotes
+        """
+        batches = chunks(courses, batch_size or self.batch_size)
+        self.map(lambda batch: self.call('core_course_update_courses', {'courses': batch}, write=True), batches)
+
+    def get_courses_by_field(self, field, value):
+        """
+        Busca cursos por id, shortname, idnumber...
+        """
+        return self.call('core_course_get_courses_by_field', {'field': field, 'value': value})['courses']
+
+    def get_course_contents(self, course_id):
+        """
+        Secciones (con sus módulos) de un curso
+        """
+        return self.call('core_course_get_contents', {'courseid': course_id})
+
+    # Funciones de Secciones (plugin local_wsmanagesections)
+    def create_sections(self, course_id, number, position=0):
+        """
+        Crea `number` secciones al final del curso (position = 0). Devuelve [{'sectionid', 'sectionnumber'}, ...]
+        """
+        return self.call('local_wsmanagesections_create_sections', {
+            'courseid': course_id, 'position': position, 'number': number,
+        }, write=True)
+
+    def update_sections(self, course_id, sections):
+        """
+        Actualiza varias secciones de un curso en una llamada. `sections`: diccionarios con
+        section (id), name, summary... (type = 'id' por defecto)
+        """
+        sections = [{'type': 'id', **section} for section in sections]
+        return self.call('local_wsmanagesections_update_sections', {'courseid': course_id, 'sections': sections}, write=True)
 
     # Funciones de Inscripción
     def enrol_user(self, user_id, course_id, role_id=5):  # 5 es el rol de estudiante por defecto
-        params = {
-            **self.base_params,
-            'wsfunction': 'enrol_manual_enrol_users',
-            'enrolments[0][userid]': user_id,
-            'enrolments[0][courseid]': course_id,
-            'enrolments[0][roleid]': role_id
-        }
-        return self._make_request(params)
+        return self.enrol_users([{'userid': user_id, 'courseid': course_id, 'roleid': role_id}])
+
+    def enrol_users(self, enrolments, batch_size=None):
+        """
+        Inscribe por lotes con enrol_manual_enrol_users. `enrolments`: diccionarios con userid,
+        courseid y opcionalmente roleid (5, estudiante, por defecto).
+        """
+        enrolments = [{'roleid': 5, **enrolment} for enrolment in enrolments]
+        batches = chunks(enrolments, batch_size or self.batch_size)
+        self.map(lambda batch: self.call('enrol_manual_enrol_users', {'enrolments': batch}, write=True), batches)
+
+    def get_enrolled_users(self, course_id):
+        """
+        Usuarios inscritos en un curso
+        """
+        return self.call('core_enrol_get_enrolled_users', {'courseid': course_id})
 
     # Funciones de Calificaciones
     def get_course_grades(self, user_id, course_id):
-        params = {
-            **self.base_params,
-            'wsfunction': 'gradereport_user_get_grade_items',
-            'userid': user_id,
-            'courseid': course_id
-        }
-        return self._make_request(params)
+        return self.call('gradereport_user_get_grade_items', {'userid': user_id, 'courseid': course_id})
 
-    # Función auxiliar para hacer requests
-    def _make_request(self, params):
-        response = requests.get(self.base_url, params=params)
-        return response.json()
+    def get_course_grades_bulk(self, course_id, user_ids):
+        """
+        Calificaciones de muchos usuarios de un curso, una llamada por usuario en paralelo (como
+        máximo max_workers a la vez). Devuelve {user_id: usergrade} con los usuarios que Moodle devolvió.
+        """
+        results = self.map(lambda user_id: self.get_course_grades(user_id, course_id), list(user_ids))
+        return {
+            usergrade['userid']: usergrade
+            for result in results
+            for usergrade in result.get('usergrades', [])
+        }
 
 
 # Ejemplo de uso:
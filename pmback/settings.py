@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -78,11 +80,9 @@ WSGI_APPLICATION = 'pmback.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DATABASE_URL (PostgreSQL o SQLite) y opciones de conexión, ver pmback/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(os.environ, BASE_DIR / 'db.sqlite3'),
 }
 
 
@@ -133,6 +133,17 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Define la URL base para acceder a los archivos cargados
 MEDIA_URL = '/media/'
 
+# Los archivos subidos se guardan una sola vez por contenido (hash) con conteo de referencias,
+# ver dashboard/storage.py
+STORAGES = {
+    'default': {
+        'BACKEND': 'dashboard.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -159,4 +170,110 @@ LOGGING = {
     },
 }
 
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
\ No newline at end of file
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Caché de respuestas de lectura (clases, contenidos y cursos), ver dashboard/content_cache.py
+# CONTENT_CACHE_BACKEND: 'file' (por defecto), 'redis' (cualquier servidor compatible con Redis, p. ej.
+# uno local en 127.0.0.1:6379; requiere el paquete redis) o 'locmem'. La caché debe ser compartida
+# por todos los procesos: los workers de gunicorn (WEB_CONCURRENCY) y run_jobs invalidan y leen las
+# mismas versiones. 'locmem' es privada de cada proceso y solo sirve con uno (desarrollo, tests).
+CONTENT_CACHE_BACKEND = os.environ.get('CONTENT_CACHE_BACKEND', 'file')
+CONTENT_CACHE_ALIAS = 'content'
+CONTENT_CACHE_TIMEOUT = int(os.environ.get('CONTENT_CACHE_TIMEOUT', 60 * 60 * 24))
+
+CONTENT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'poly-academy-content',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CONTENT_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache', 'content')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CONTENT_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    CONTENT_CACHE_ALIAS: CONTENT_CACHE_BACKENDS[CONTENT_CACHE_BACKEND],
+}
+
+# Subidas por partes de video / audio / pdf de ClassContentModel, ver dashboard/uploads.py.
+# Los archivos parciales quedan fuera de MEDIA_ROOT (que se sirve públicamente) hasta completarse.
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads_tmp'))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 5 * 1024 ** 3))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 ** 2))
+# Las subidas sin actividad durante este tiempo se eliminan con `manage.py cleanup_uploads`
+CHUNKED_UPLOAD_EXPIRATION_HOURS = int(os.environ.get('CHUNKED_UPLOAD_EXPIRATION_HOURS', 24))
+
+# Derivados de portadas e imágenes (WebP por ancho, para srcset), ver dashboard/derivatives.py.
+# Se generan en la cola de trabajos.
+IMAGE_DERIVATIVE_WIDTHS = [160, 320, 640, 1280]
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', 80))
+
+# Servicio de MEDIA_ROOT, ver dashboard/media_serving.py. 'django' entrega los archivos con
+# FileResponse (Range, sendfile vía wsgi.file_wrapper); 'x-accel' delega la entrega en nginx con
+# X-Accel-Redirect hacia una location `internal` con alias a MEDIA_ROOT.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# max-age de los archivos que no son blobs (los blobs se cachean un año como immutable)
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', 60 * 60))
+
+# Cola de trabajos en base de datos (derivados, análisis y transcripción de media), ver
+# dashboard/jobs.py. `manage.py run_jobs` los procesa; con JOB_QUEUE_EAGER = True se ejecutan en el
+# mismo proceso al confirmar la transacción, sin worker.
+JOB_QUEUE_EAGER = os.environ.get('JOB_QUEUE_EAGER', '') == '1'
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+# Segundos que un worker tiene para terminar un trabajo antes de que otro lo retome
+JOB_VISIBILITY_TIMEOUT = int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 10 * 60))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+# Espera antes del reintento n: JOB_RETRY_BACKOFF * 2^(n-1) segundos, como máximo JOB_RETRY_BACKOFF_MAX
+JOB_RETRY_BACKOFF = int(os.environ.get('JOB_RETRY_BACKOFF', 10))
+JOB_RETRY_BACKOFF_MAX = int(os.environ.get('JOB_RETRY_BACKOFF_MAX', 60 * 60))
+
+# Función `modulo.funcion(ruta, media_type) -> texto` que transcribe audio y video, ver
+# dashboard/media_processing.py. Vacío: no se transcribe.
+MEDIA_TRANSCRIPTION_BACKEND = os.environ.get('MEDIA_TRANSCRIPTION_BACKEND', '')
+MEDIA_PROBE_TIMEOUT = int(os.environ.get('MEDIA_PROBE_TIMEOUT', 60))
+
+# Servicio web de Moodle (pmback/apiMoodle.py) y sincronización de cursos, ver dashboard/moodle_sync.py
+MOODLE_BASE_URL = os.environ.get('MOODLE_BASE_URL', '')
+MOODLE_TOKEN = os.environ.get('MOODLE_TOKEN', '')
+# Categoría de Moodle en la que se crean los cursos
+MOODLE_COURSE_CATEGORY_ID = int(os.environ.get('MOODLE_COURSE_CATEGORY_ID', 1))
+MOODLE_MAX_WORKERS = int(os.environ.get('MOODLE_MAX_WORKERS', 4))
+# Llamadas por segundo a Moodle (0 = sin límite)
+MOODLE_RATE_LIMIT = float(os.environ.get('MOODLE_RATE_LIMIT', 10))
+MOODLE_SYNC_BATCH_SIZE = int(os.environ.get('MOODLE_SYNC_BATCH_SIZE', 50))
+# Informe de calificaciones por curso (dashboard/grades.py): se actualiza en segundo plano pasados
+# GRADES_REFRESH_AFTER segundos y se descarta a los GRADES_CACHE_TTL
+GRADES_REFRESH_AFTER = int(os.environ.get('GRADES_REFRESH_AFTER', 5 * 60))
+GRADES_CACHE_TTL = int(os.environ.get('GRADES_CACHE_TTL', 24 * 60 * 60))
+
+# Modo del servidor (gunicorn.conf.py): 'wsgi' con workers síncronos o 'asgi' con workers de uvicorn.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+# Vistas async de las lecturas más frecuentes (dashboard/async_views.py). Por defecto solo en ASGI:
+# con WSGI cada petición a una vista async necesita su propio bucle de eventos.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', '1' if SERVER_MODE == 'asgi' else '0') == '1'
+
+# Búsqueda de texto completo (dashboard/search.py): resultados por página en /api/search/
+SEARCH_DEFAULT_LIMIT = int(os.environ.get('SEARCH_DEFAULT_LIMIT', 20))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', 100))
+# Coincidencias que se ordenan por relevancia (las más recientes): acota el coste de las palabras
+# muy comunes en índices grandes
+SEARCH_RANK_CANDIDATES = int(os.environ.get('SEARCH_RANK_CANDIDATES', 10000))
+
+# Limpieza diferida de archivos de filas borradas (dashboard/file_cleanup.py): rutas por lote del
+# barrido y reintentos de una ruta que no se pudo borrar antes de dejarla para revisión manual
+FILE_CLEANUP_BATCH_SIZE = int(os.environ.get('FILE_CLEANUP_BATCH_SIZE', 500))
+FILE_CLEANUP_MAX_ATTEMPTS = int(os.environ.get('FILE_CLEANUP_MAX_ATTEMPTS', 5))
+
+# Corrección de actividades (dashboard/grading.py): entregas por llamada a /api/grading/
+GRADING_MAX_SUBMISSIONS = int(os.environ.get('GRADING_MAX_SUBMISSIONS', 10000))